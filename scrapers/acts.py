@@ -5,106 +5,106 @@ Fetches Acts from 2018 onwards.
 """
 import re
 from typing import List
-from scrapers.common.http import soup
-from scrapers.common.model import Item
+from scrapers.common.html import table_rows
+from scrapers.common.http import get
+from scrapers.common.metrics import METRICS
+from scrapers.common.model import Item, ItemRecord, validate_items, dump_items
 from scrapers.common.io import write_catalog_and_latest, dedupe_by_url
 
 BASE = "https://documents.gov.lk"
+ACT_NO = re.compile(r'(\d+)/(\d{4})')
 
-def parse_acts_page(year: int) -> List[Item]:
-    """Parse a single year's Acts page."""
-    url = f"{BASE}/view/acts/acts_{year}.html"
-    print(f"Scraping {url}...")
+LANG_LINKS = (("english", "en"), ("sinhala", "si"), ("tamil", "ta"))
+
+def parse_acts_html(html: str, year: int, parser: str = None) -> List[Item]:
+    """Parse the Acts table of a year page into items."""
+    items = []
     
-    try:
-        doc = soup(url)
-        items = []
+    rows = table_rows(html, parser)
+    if not rows:
+        print(f"  No table found for {year}")
+        return []
+    
+    for cols in rows[1:]:  # Skip header row
+        if len(cols) < 4:
+            continue
         
-        # Find the table with acts
-        table = doc.find('table')
-        if not table:
-            print(f"  No table found for {year}")
-            return []
+        # Extract act number and year from first column
+        act_match = ACT_NO.match(cols[0][0])
+        if not act_match:
+            continue
         
-        rows = table.find_all('tr')[1:]  # Skip header row
+        act_num = act_match.group(1)
+        act_year = act_match.group(2)
         
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) < 4:
-                continue
-            
-            # Extract act number and year from first column
-            act_num_text = cols[0].get_text(strip=True)
-            act_match = re.match(r'(\d+)/(\d{4})', act_num_text)
-            if not act_match:
-                continue
-            
-            act_num = act_match.group(1)
-            act_year = act_match.group(2)
-            
-            # Extract date
-            date_text = cols[1].get_text(strip=True)
-            
-            # Extract description/title
-            title = cols[2].get_text(strip=True)
-            
-            # Extract PDF links
-            links = cols[3].find_all('a')
-            languages = []
-            pdf_url = None
-            
-            for link in links:
-                link_text = link.get_text(strip=True).lower()
-                href = link.get('href', '')
-                
-                if 'english' in link_text:
-                    languages.append('en')
-                    if not pdf_url:  # Use English as primary
-                        pdf_url = BASE + href if href.startswith('/') else href
-                elif 'sinhala' in link_text:
-                    languages.append('si')
-                    if not pdf_url:
-                        pdf_url = BASE + href if href.startswith('/') else href
-                elif 'tamil' in link_text:
-                    languages.append('ta')
+        # Extract date
+        date_text = cols[1][0]
+        
+        # Extract description/title
+        title = cols[2][0]
+        
+        # Extract PDF links; the first language found is the primary PDF
+        languages = []
+        pdf_url = None
+        
+        for href, text in cols[3][1]:
+            link_text = text.lower()
+            for needle, lang in LANG_LINKS:
+                if needle in link_text:
+                    languages.append(lang)
                     if not pdf_url:
                         pdf_url = BASE + href if href.startswith('/') else href
-            
-            if not pdf_url:
-                continue
-            
-            # Create normalized item
-            item = Item.make(
-                type="Act",
-                date=date_text,
-                title=f"Act {act_num}/{act_year} - {title}",
-                url=pdf_url,
-                languages=languages,
-                summary=title,
-                raw=f"acts_{year}"
-            )
-            
-            items.append(item)
+                    break
+        
+        if not pdf_url:
+            continue
         
+        # Create normalized item
+        item = ItemRecord.make(
+            type="Act",
+            date=date_text,
+            title=f"Act {act_num}/{act_year} - {title}",
+            url=pdf_url,
+            languages=languages,
+            summary=title,
+            raw=f"acts_{year}"
+        )
+        
+        items.append(item)
+    
+    # One batch validation for the whole page
+    return validate_items(items)
+
+def parse_acts_page(year: int, failed: set = None) -> List[Item]:
+    """Parse a single year's Acts page; a year that fails is added to `failed`."""
+    url = f"{BASE}/view/acts/acts_{year}.html"
+    print(f"Scraping {url}...")
+    
+    try:
+        html = get(url).text
+        with METRICS.timed("parse_seconds", url=url, source="acts"):
+            items = parse_acts_html(html, year)
         print(f"  Found {len(items)} acts for {year}")
         return items
     
     except Exception as e:
         print(f"  Error scraping {year}: {e}")
+        if failed is not None:
+            failed.add(year)
         return []
 
-def scrape_all_acts() -> List[dict]:
-    """Scrape all acts from 2018 onwards."""
+def scrape_all_acts(failed: set = None) -> List[dict]:
+    """Scrape all acts from 2018 onwards; years that fail are added to `failed`."""
     all_items = []
     
     # Scrape from 2018 to current year
     current_year = 2025
     for year in range(2018, current_year + 1):
-        year_items = parse_acts_page(year)
+        year_items = parse_acts_page(year, failed)
         all_items.extend(year_items)
     
     # Deduplicate and convert to dict
-    unique_items = dedupe_by_url([item.dict() for item in all_items])
+    unique_items = dedupe_by_url(dump_items(all_items))
     
     print(f"\nTotal unique acts: {len(unique_items)}")
     return unique_items
@@ -0,0 +1,236 @@
+"""
+Resumable historical backfill of the documents.gov.lk gazettes.
+
+The crawl is split into tasks in a persistent queue (scrapers.common.jobs):
+one per gazette year index, per gazette date page, per extraordinary gazette
+year index and, with a PDF store, per PDF. Year tasks enqueue their date
+pages, page tasks store their parsed records and enqueue their PDFs, all in
+the task's own commit, so a crash or Ctrl-C loses at most the tasks in
+flight and the next run picks up where this one stopped.
+
+Work is spread over `processes` worker processes (parsing is CPU-bound) of
+`threads` fetching threads each. The allowed request rate is split evenly
+between the processes' shared http.LIMITER, so adding workers never exceeds
+it. Each process
+renews the leases of its running tasks, since a fetch can wait out a
+circuit breaker for longer than a lease. Leases of workers on this host
+that are no longer running are ended at start-up; others run out after
+jobs.LEASE_SECONDS. Workers are spawned, not forked, so they share no
+SQLite connection or thread with the parent.
+"""
+import os, signal, socket, time, threading, multiprocessing
+from datetime import datetime, timezone
+from typing import Dict, List
+from urllib.parse import urljoin
+from . import gazettes, extra_gazettes
+from .common.http import LIMITER, CircuitOpenError, get, retryable
+from .common.io import dedupe_by_url
+from .common.jobs import JobQueue
+from .common.pdfstore import PdfStore
+
+DEFAULT_QUEUE = ".cache/backfill.sqlite"
+YEAR, DATE, EGZ, PDF = "gazette-year", "gazette-date", "egz-year", "pdf"
+# Page tasks run before PDFs, so the catalogs are complete early
+PRIORITY = {YEAR: 0, EGZ: 0, DATE: 1, PDF: 2}
+# store source -> task kind whose results are its records
+SOURCE_KINDS = {"gazettes": DATE, "extra-gazettes": EGZ}
+
+def _task(kind, key, **payload):
+    return kind, key, payload, PRIORITY[kind]
+
+def seed(queue: JobQueue, from_year: int, to_year: int, sources=tuple(SOURCE_KINDS)) -> int:
+    """Enqueue the year index tasks; returns how many were not queued yet."""
+    tasks = []
+    for y in range(from_year, to_year + 1):
+        if "gazettes" in sources:
+            tasks.append(_task(YEAR, gazettes._year_url(y), year=y))
+        if "extra-gazettes" in sources:
+            tasks.append(_task(EGZ, extra_gazettes._index_url(y), year=y))
+    return queue.add(tasks)
+
+class _Worker:
+    """Per-process state shared by the process's threads."""
+    def __init__(self, rate, pdf_root):
+        # Every fetch in this process, including PdfStore's, takes from LIMITER
+        LIMITER.configure(rate, burst=1)
+        self.pdfs = PdfStore(pdf_root) if pdf_root else None
+
+    def pdf_tasks(self, rows):
+        if self.pdfs is None:
+            return []
+        return [_task(PDF, url) for url in dict.fromkeys(d["pdf_url"] for d in rows if d.get("pdf_url"))]
+
+    def gazette_year(self, task):
+        html = get(task.key).text
+        return None, [_task(DATE, urljoin(task.key, dp)) for dp in gazettes.parse_year_index(html)]
+
+    def gazette_date(self, task):
+        date = gazettes.DATE_PAGE_DATE.search(task.key).group(1)
+        rows = gazettes.parse_date_page(get(task.key).text, date)
+        return rows, self.pdf_tasks(rows)
+
+    def egz_year(self, task):
+        rows = dedupe_by_url(extra_gazettes.parse_index(get(task.key).text))
+        return rows, self.pdf_tasks(rows)
+
+    def pdf(self, task):
+        sha = self.pdfs.fetch(task.key)
+        return {"sha256": sha, "size": os.path.getsize(self.pdfs.path(sha))}, []
+
+    HANDLERS = {YEAR: gazette_year, DATE: gazette_date, EGZ: egz_year, PDF: pdf}
+
+def _worker_name(thread):
+    return f"{socket.gethostname()}:{os.getpid()}:{thread}"
+
+def _work(queue_path, rate, threads, pdf_root):
+    """One worker process: `threads` threads lease and run tasks until the queue is finished.
+
+    On Ctrl-C the threads finish (and checkpoint) their current task and stop.
+    """
+    queue, worker, stop = JobQueue(queue_path), _Worker(rate, pdf_root), threading.Event()
+    running = {}   # thread -> leased task
+
+    def heartbeat():
+        while not stop.wait(queue.lease_seconds / 3):
+            tasks = list(running.values())
+            if tasks:
+                queue.renew(tasks)
+
+    def loop(thread):
+        name = _worker_name(thread)
+        while not stop.is_set():
+            task = queue.lease(name)
+            if task is None:
+                wait = queue.idle_for()
+                if wait is None:
+                    return
+                # Other workers' tasks may still add children
+                stop.wait(min(max(wait, 0.5), 5.0))
+                continue
+            running[thread] = task
+            try:
+                result, children = _Worker.HANDLERS[task.kind](worker, task)
+            except Exception as e:
+                # http.get already retried transient errors; the queue retries them later
+                retry = retryable(e) or isinstance(e, CircuitOpenError)
+                held = queue.fail(task, f"{type(e).__name__}: {e}", retry=retry)
+                if held and not retry:
+                    print(f"  {task.kind} {task.key} failed: {e}")
+            except BaseException:
+                queue.release(task)
+                raise
+            else:
+                held = queue.complete(task, result, children)
+            finally:
+                del running[thread]
+            if not held:
+                print(f"  {task.kind} {task.key}: lease lost to another worker, result dropped")
+
+    previous = signal.signal(signal.SIGINT, lambda *_: stop.set())
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    try:
+        pool = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    finally:
+        stop.set()
+        signal.signal(signal.SIGINT, previous)
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def reclaim(queue: JobQueue) -> int:
+    """End the leases of workers on this host whose process has exited."""
+    n, host = 0, socket.gethostname()
+    for name in queue.workers():
+        h, pid, _ = name.rsplit(":", 2)
+        if h == host and not _alive(int(pid)):
+            n += queue.expire(name)
+    return n
+
+def status(queue: JobQueue) -> str:
+    lines = [f"{'task':<14}{'done':>8}{'pending':>9}{'leased':>8}{'failed':>8}"]
+    for kind, c in sorted(queue.counts().items()):
+        lines.append(f"{kind:<14}{c.get('done', 0):>8}{c.get('pending', 0):>9}{c.get('leased', 0):>8}"
+                     f"{c.get('failed', 0):>8}")
+    return "\n".join(lines)
+
+def _progress(queue, stop, every):
+    while not stop.wait(every):
+        c = queue.counts()
+        done, total = sum(s.get("done", 0) for s in c.values()), sum(sum(s.values()) for s in c.values())
+        print(f"  backfill: {done}/{total} tasks done")
+
+def run(queue: JobQueue, *, processes: int = None, threads: int = 4, rate: float = None,
+        pdf_root: str = None, progress_every: float = 60.0) -> bool:
+    """Run workers until every task is done or failed; False if interrupted first.
+
+    rate is the total requests/second per host (default: http.LIMITER's).
+    """
+    processes = processes or os.cpu_count() or 1
+    rate = rate or LIMITER.rate
+    reclaimed = reclaim(queue)
+    if reclaimed:
+        print(f"Reclaimed {reclaimed} tasks from stopped workers")
+    print(f"Backfill: {processes} processes x {threads} threads, {rate:g} requests/s in total")
+    args = (queue.path, rate / processes, threads, pdf_root)
+    before = sum(c.get("done", 0) for c in queue.counts().values())
+    stop = threading.Event()
+    progress = threading.Thread(target=_progress, args=(queue, stop, progress_every), daemon=True)
+    t0 = time.perf_counter()
+    try:
+        if processes == 1:
+            progress.start()
+            _work(*args)
+        else:
+            spawn = multiprocessing.get_context("spawn")
+            procs = [spawn.Process(target=_work, args=args) for _ in range(processes)]
+            for p in procs:
+                p.start()
+            progress.start()
+            try:
+                for p in procs:
+                    p.join()
+            except KeyboardInterrupt:
+                # A terminal's Ctrl-C reaches the workers too; forwarding it again is harmless
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                print("Stopping workers after their current tasks")
+                for p in procs:
+                    if p.is_alive():
+                        os.kill(p.pid, signal.SIGINT)
+                for p in procs:
+                    p.join()
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+    finally:
+        stop.set()
+    done = sum(c.get("done", 0) for c in queue.counts().values()) - before
+    print(f"Backfill ran {done} tasks in {time.perf_counter() - t0:.0f}s")
+    return queue.idle_for() is None
+
+def documents(queue: JobQueue, sources=tuple(SOURCE_KINDS)) -> Dict[str, List[dict]]:
+    """{source: records} from the finished page tasks."""
+    return {s: dedupe_by_url([d for _, rows, _ in queue.results(SOURCE_KINDS[s]) for d in rows or ()])
+            for s in sources}
+
+def record_pdfs(queue: JobQueue, pdfs: PdfStore, docs: List[dict]) -> int:
+    """Add the downloaded PDFs to the store's URL and document indexes."""
+    n = 0
+    for url, res, finished in queue.results(PDF):
+        seen = datetime.fromtimestamp(finished, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        pdfs.urls[url] = {"sha256": res["sha256"], "size": res["size"], "last_seen": seen}
+        n += 1
+    for d in docs:
+        url = d.get("pdf_url")
+        if url in pdfs.urls and d.get("id"):
+            pdfs.documents[d["id"]] = dict(pdfs.urls[url], pdf_url=url)
+    pdfs.save()
+    return n
@@ -0,0 +1,333 @@
+"""
+Command line entry point for the scrapers.
+
+    python -m scrapers.cli all --root public/data --from-year 2025 --to-year 2025
+    python -m scrapers.cli gazettes --from-year 2004 --to-year 2025 --out public/data/gazettes
+    python -m scrapers.cli extra-gazettes --from-year 2004 --to-year 2025 --out public/data/extra-gazettes
+    python -m scrapers.cli acts --out public/data/acts
+    python -m scrapers.cli lk-legal-docs --out public/data
+    python -m scrapers.cli merge-latest --root public/data
+    python -m scrapers.cli backfill --from-year 2004 --processes 4 --rate 4
+    python -m scrapers.cli mirror --source public/data/acts public/data/gazettes
+    python -m scrapers.cli text --source public/data/acts
+    python -m scrapers.cli export --out exports/catalog
+    python -m scrapers.cli fulltext --source public/data/hf-acts-full
+    python -m scrapers.cli search '"land acquisition" compensation' --type Act --from 2000
+    python -m scrapers.cli search --serve 8080
+    python -m scrapers.cli --report run.json --metrics run.prom --profile gazettes gazettes
+
+`all` runs every source concurrently in one process (sharing the HTTP
+connection pool in scrapers.common.http) and then does a single merge into
+<root>/all, so sources no longer overwrite each other's merged feed.
+
+Every source upserts into the SQLite document store (--db, see
+scrapers.common.store) and its catalog.json/latest.json/shards are exported
+from there; the merge reads each source's newest documents from the store.
+
+`backfill` crawls a range of years through a persistent task queue with
+worker processes (see scrapers.backfill); rerunning it after an
+interruption resumes the queue, then upserts everything it found.
+
+--report and --metrics write the run's stage/HTTP/parse/validation/write
+timings (scrapers.common.metrics) as JSON and Prometheus text; --profile
+runs one stage (a source name, merge, search-index, mirror, export or text)
+under cProfile.
+"""
+import argparse, os, sys, traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from . import gazettes, extra_gazettes, acts, lk_legal_docs, pdf_text, backfill
+from .common.columnar import write_columnar
+from .common.fulltext import FullTextIndex, serve
+from .common.http import LIMITER
+from .common.pdfstore import PdfStore
+from .common.metrics import METRICS
+from .common.io import dedupe_by_url, iter_catalog, read_catalog, write_all_latest
+from .common.jobs import JobQueue
+from .common.search_index import write_ngram_index, write_search_index
+from .common.state import CrawlState, state_path
+from .common.store import DEFAULT_PATH, DocumentStore
+
+# source name -> output sub-directory of the data root ("" = the root itself)
+SOURCES = {
+    "gazettes": "gazettes",
+    "extra-gazettes": "extra-gazettes",
+    "acts": "acts",
+    "lk-legal-docs": "",
+}
+
+def _state(args, out):
+    return CrawlState.load(state_path(out, "crawl_state.json")) if args.incremental else None
+
+def store_documents(store, name, out, docs, prune=None, latest_n=500):
+    """Upsert a source's documents into the store and export its JSON to out.
+
+    The store keeps every earlier record, including years this run did not
+    crawl. prune=(date_from, date_to) also deletes the source's stored
+    records in that range that docs do not contain. Returns the source's
+    document count.
+    """
+    store.seed(name, out)
+    if prune:
+        store.replace(name, docs, *prune)
+    else:
+        store.upsert(name, docs)
+    store.export(name, out, latest_n=latest_n)
+    return store.count(name)
+
+def _years(args):
+    return f"{args.from_year}-01-01", f"{args.to_year}-12-31"
+
+def _finish(args, store, name, out, docs, state, years=None, failed=()):
+    prune = (years or ("", "")) if args.prune else None
+    if prune and failed:
+        # A failed page looks the same as records removed upstream
+        print(f"[{name}] not pruning: could not crawl {', '.join(map(str, sorted(failed)))}", file=sys.stderr)
+        prune = None
+    count = store_documents(store, name, out, docs, prune, args.latest_n)
+    if state is not None:
+        state.save()
+    return count
+
+def run_gazettes(args, store, out):
+    state, failed = _state(args, out), set()
+    docs = gazettes.crawl(args.from_year, args.to_year, workers=args.workers, state=state, failed=failed)
+    return _finish(args, store, "gazettes", out, docs, state, _years(args), failed)
+
+def run_extra_gazettes(args, store, out):
+    state, failed, docs = _state(args, out), set(), []
+    for y in range(args.from_year, args.to_year + 1):
+        docs.extend(extra_gazettes.crawl(y, state=state, failed=failed))
+    return _finish(args, store, "extra-gazettes", out, dedupe_by_url(docs), state, _years(args), failed)
+
+def run_acts(args, store, out):
+    failed = set()
+    return _finish(args, store, "acts", out, acts.scrape_all_acts(failed), None, failed=failed)
+
+def run_lk_legal_docs(args, store, out):
+    # lk_legal_docs writes its own catalog (streamed or delta-merged) and
+    # latest.json (the upstream latest window), then upserts into the store
+    lk_legal_docs.sync(out, stream=args.stream, delta=args.delta,
+                       keep=max(args.latest_n, 1000), store=store)
+    return store.count(lk_legal_docs.STORE_SOURCE)
+
+RUNNERS = {
+    "gazettes": run_gazettes,
+    "extra-gazettes": run_extra_gazettes,
+    "acts": run_acts,
+    "lk-legal-docs": run_lk_legal_docs,
+}
+
+def merge_latest(root, store, latest_n):
+    """Single merge of every source's newest documents into <root>/all plus its search index."""
+    buckets = {}
+    for name, sub in SOURCES.items():
+        store.seed(name, os.path.join(root, sub))
+        buckets[name] = store.latest(name, latest_n)
+    with METRICS.stage("merge"):
+        write_all_latest(buckets, root, latest_n=latest_n)
+        store.export_types(os.path.join(root, "types"), latest_n)
+    with METRICS.stage("search-index"):
+        write_search_index(os.path.join(root, "all"))
+        write_ngram_index(os.path.join(root, "all"))
+    print(f"Merged {sum(len(d) for d in buckets.values())} documents into {os.path.join(root, 'all')}")
+
+def run_all(args, store):
+    def one(name):
+        out = os.path.join(args.root, SOURCES[name])
+        try:
+            with METRICS.stage(name):
+                RUNNERS[name](args, store, out)
+        except Exception:
+            METRICS.inc("source_failures_total", source=name)
+            # The store keeps the previous documents of a failed source, so the merge stays complete
+            print(f"[{name}] failed, keeping previous documents", file=sys.stderr)
+            traceback.print_exc()
+
+    with ThreadPoolExecutor(max_workers=len(args.sources)) as pool:
+        list(pool.map(one, args.sources))
+    merge_latest(args.root, store, args.latest_n)
+
+def run_backfill(args, store):
+    queue = JobQueue(args.queue)
+    if args.retry_failed:
+        print(f"Retrying {queue.retry_failed()} failed tasks")
+    if not args.status:
+        added = backfill.seed(queue, args.from_year, args.to_year, args.sources)
+        print(f"Queued {added} new year tasks in {args.queue}")
+        with METRICS.stage("backfill"):
+            finished = backfill.run(queue, processes=args.processes, threads=args.threads, rate=args.rate,
+                                    pdf_root=args.store if args.pdfs else None)
+    print(backfill.status(queue))
+    for key, _, error in queue.failures():
+        print(f"  failed {key}: {error}")
+    if args.status:
+        return
+    if not finished:
+        print("Backfill interrupted; run the same command again to resume")
+        return
+    # Years outside the queue's range keep their records: the store is upserted, not replaced
+    docs = backfill.documents(queue, args.sources)
+    for name, rows in docs.items():
+        out = os.path.join(args.root, SOURCES[name])
+        print(f"[{name}] {store_documents(store, name, out, rows, latest_n=args.latest_n)} documents in {out}")
+    if args.pdfs:
+        n = backfill.record_pdfs(queue, PdfStore(args.store), [d for rows in docs.values() for d in rows])
+        print(f"Recorded {n} PDFs in {args.store}")
+    merge_latest(args.root, store, args.latest_n)
+
+RATE_HELP = "requests/second per host, shared by all workers and sources (default: SCRAPER_RATE or 1)"
+
+def _parser():
+    year = date.today().year
+    p = argparse.ArgumentParser(prog="python -m scrapers.cli", description="LegalHub LK scrapers")
+    p.add_argument("--report", help="write a JSON run report with per-stage and per-URL metrics")
+    p.add_argument("--metrics", help="write the run's metrics in Prometheus text format")
+    p.add_argument("--profile", metavar="STAGE", help="run STAGE under cProfile (stats in .cache/profile)")
+    p.add_argument("--db", default=DEFAULT_PATH, help="SQLite document store (default: %(default)s)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    def common(sp, out_default=None, years=False):
+        if out_default is not None:
+            sp.add_argument("--out", default=out_default)
+        # An incremental crawl only returns new pages, so it cannot tell what was removed
+        modes = sp.add_mutually_exclusive_group()
+        if years:
+            sp.add_argument("--from-year", type=int, default=year)
+            sp.add_argument("--to-year", type=int, default=year)
+            modes.add_argument("--incremental", action="store_true",
+                               help="only crawl pages missing from the crawl state")
+        else:
+            sp.set_defaults(incremental=False)
+        modes.add_argument("--prune", action="store_true",
+                           help="delete stored records (in the crawled years) that this run did not find; "
+                                "skipped if any page failed")
+        sp.add_argument("--latest-n", type=int, default=500)
+        sp.add_argument("--workers", type=int, default=4,
+                        help="concurrent page fetches within a source (1 = serial)")
+        sp.add_argument("--rate", type=float, help=RATE_HELP)
+        return sp
+
+    common(sub.add_parser("gazettes"), "public/data/gazettes", years=True)
+    common(sub.add_parser("extra-gazettes"), "public/data/extra-gazettes", years=True)
+    common(sub.add_parser("acts"), "public/data/acts")
+    sp = common(sub.add_parser("lk-legal-docs"), "public/data")
+    sp.add_argument("--stream", action="store_true",
+                    help="parse and sort the full dump incrementally in bounded memory")
+    sp.add_argument("--delta", action="store_true",
+                    help="merge only records newer than the last sync when latest-100.json covers the gap")
+    sp = common(sub.add_parser("all", help="run sources concurrently, then merge"), years=True)
+    sp.add_argument("--stream", action="store_true", help="stream the lk-legal-docs dump (see lk-legal-docs)")
+    sp.add_argument("--delta", action="store_true", help="delta-sync lk-legal-docs (see lk-legal-docs)")
+    sp.add_argument("--root", default="public/data")
+    sp.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES))
+    sp = sub.add_parser("backfill", help="resumable multi-process crawl of a range of years")
+    sp.add_argument("--from-year", type=int, default=2004)
+    sp.add_argument("--to-year", type=int, default=year)
+    sp.add_argument("--sources", nargs="+", choices=list(backfill.SOURCE_KINDS), default=list(backfill.SOURCE_KINDS))
+    sp.add_argument("--queue", default=backfill.DEFAULT_QUEUE, help="task queue database (default: %(default)s)")
+    sp.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    sp.add_argument("--threads", type=int, default=4, help="fetching threads per process")
+    sp.add_argument("--rate", type=float, help=RATE_HELP)
+    sp.add_argument("--pdfs", action="store_true", help="also download every PDF into --store")
+    sp.add_argument("--store", default=".cache/pdf")
+    sp.add_argument("--retry-failed", action="store_true", help="give failed tasks a fresh set of attempts")
+    sp.add_argument("--status", action="store_true", help="only show the queue's progress")
+    sp.add_argument("--root", default="public/data")
+    sp.add_argument("--latest-n", type=int, default=500)
+    sp = sub.add_parser("merge-latest", help="merge existing per-source outputs into <root>/all")
+    sp.add_argument("--root", default="public/data")
+    sp.add_argument("--latest-n", type=int, default=500)
+    sp = sub.add_parser("mirror", help="mirror source PDFs into the content-addressed store")
+    sp.add_argument("--source", nargs="+", default=[os.path.join("public/data", d) for d in SOURCES.values() if d],
+                    help="catalog directories whose PDFs are mirrored")
+    sp.add_argument("--store", default=".cache/pdf")
+    sp.add_argument("--workers", type=int, default=4)
+    sp.add_argument("--rate", type=float, help=RATE_HELP)
+    sp = sub.add_parser("export", help="write a year-partitioned Parquet copy of the catalogs")
+    sp.add_argument("--source", nargs="+", default=[os.path.join("public/data", d) for d in SOURCES.values() if d],
+                    help="catalog directories to export")
+    sp.add_argument("--out", default="exports/catalog")
+    sp = sub.add_parser("text", help="extract PDF text into the full-content and chunk feeds")
+    sp.add_argument("--source", nargs="+", default=["public/data/acts"],
+                    help="catalog directories whose documents are processed")
+    sp.add_argument("--full-out", default="public/data/hf-acts-full")
+    sp.add_argument("--chunks-out", default="public/data/hf-acts-chunks")
+    sp.add_argument("--chunk-size", type=int, default=2000)
+    sp.add_argument("--overlap", type=int, default=200)
+    sp.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    sp.add_argument("--latest-n", type=int, default=100)
+    sp = sub.add_parser("fulltext", help="update the local BM25 full-text index from the text feeds")
+    sp.add_argument("--source", nargs="+", default=["public/data/hf-acts-full"],
+                    help="catalog directories whose full_content/chunk_content is indexed")
+    sp.add_argument("--index", default=".cache/fulltext")
+    sp = sub.add_parser("search", help="query the full-text index, or serve it over HTTP")
+    sp.add_argument("query", nargs="?", help='words and "quoted phrases"')
+    sp.add_argument("--index", default=".cache/fulltext")
+    sp.add_argument("-k", type=int, default=10, help="number of results")
+    sp.add_argument("--type", help="only documents of this type, e.g. Act")
+    sp.add_argument("--from", dest="date_from", help="earliest date (YYYY, YYYY-MM or YYYY-MM-DD)")
+    sp.add_argument("--to", dest="date_to", help="latest date")
+    sp.add_argument("--serve", type=int, metavar="PORT", help="serve GET /search on PORT instead")
+    sp.add_argument("--host", default="127.0.0.1")
+    return p
+
+def _run(args):
+    if getattr(args, "rate", None):
+        LIMITER.configure(args.rate)
+    store = DocumentStore(args.db) if args.command in ("all", "merge-latest", "backfill", *RUNNERS) else None
+    if args.command == "all":
+        run_all(args, store)
+    elif args.command == "backfill":
+        run_backfill(args, store)
+    elif args.command == "merge-latest":
+        merge_latest(args.root, store, args.latest_n)
+    elif args.command == "mirror":
+        docs = [d for src in args.source for d in read_catalog(src)]
+        with METRICS.stage("mirror"):
+            PdfStore(args.store).mirror(docs, workers=args.workers)
+    elif args.command == "export":
+        with METRICS.stage("export"):
+            write_columnar(dedupe_by_url([d for src in args.source for d in read_catalog(src)]), args.out)
+    elif args.command == "fulltext":
+        with METRICS.stage("fulltext"):
+            # Streamed: the full-content feeds are the largest catalogs
+            stats = FullTextIndex(args.index).update(
+                d for src in args.source for d in iter_catalog(os.path.join(src, "catalog.json")))
+        print(f"Full-text index {args.index}: {stats}")
+    elif args.command == "search":
+        index = FullTextIndex(args.index)
+        if args.serve:
+            serve(index, args.host, args.serve)
+        elif not args.query:
+            _parser().error("search needs a query or --serve")
+        else:
+            for r in index.search(args.query, k=args.k, type=args.type, date_from=args.date_from,
+                                  date_to=args.date_to):
+                print(f"{r['score']:8.3f}  {r['date']:<10}  {r['type']:<22}  {r['id']}  {r['title'][:60]}")
+    elif args.command == "text":
+        docs = dedupe_by_url([d for src in args.source for d in read_catalog(src)])
+        with METRICS.stage("text"):
+            pdf_text.run(docs, args.full_out, args.chunks_out, size=args.chunk_size,
+                         overlap=args.overlap, workers=args.workers, latest_n=args.latest_n)
+    else:
+        with METRICS.stage(args.command):
+            count = RUNNERS[args.command](args, store, args.out)
+        print(f"[{args.command}] {count} documents written to {args.out}")
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    if args.profile:
+        METRICS.profile_stage = args.profile
+    try:
+        _run(args)
+    finally:
+        # Also written for failed runs, where it matters most
+        if args.report:
+            METRICS.write_report(args.report)
+        if args.metrics:
+            METRICS.write_prometheus(args.metrics)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Columnar (Parquet) export of normalized catalog records for analytics.
+
+Records are validated against Item and written as a hive-partitioned
+dataset (year=YYYY/part-0.parquet) with dictionary-encoded type, source,
+rawTypeName and languages. Within each partition rows are sorted by type
+and date, so row-group statistics let readers skip most of a year too:
+
+    import pyarrow.dataset as ds
+    d = ds.dataset("exports/catalog", format="parquet", partitioning="hive")
+    d.to_table(filter=(ds.field("year") == 2023) &
+                      (ds.field("type") == "Extraordinary Gazette"))
+"""
+import os, json, shutil, hashlib
+from datetime import date as _date
+from typing import Iterable, List, Tuple
+from .model import validate_records
+
+_MANIFEST = "_manifest.json"
+
+def _schema():
+    import pyarrow as pa
+    dict_str = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([
+        ("id", pa.string()),
+        ("type", dict_str),
+        ("title", pa.string()),
+        ("date", pa.date32()),
+        ("languages", pa.list_(dict_str)),
+        ("pdf_url", pa.string()),
+        ("detail_url", pa.string()),
+        ("summary", pa.string()),
+        ("source", pa.dictionary(pa.int16(), pa.string())),
+        ("rawTypeName", pa.dictionary(pa.int16(), pa.string())),
+        ("full_content", pa.string()),
+        ("chunk_content", pa.string()),
+        ("metadata", pa.string()),          # JSON encoded
+        ("chunk_metadata", pa.string()),    # JSON encoded
+        ("year", pa.int16()),
+    ])
+
+def _parse_date(s: str):
+    try:
+        return _date.fromisoformat(s[:10])
+    except (TypeError, ValueError):
+        return None
+
+def validate(items: Iterable[dict]) -> Tuple[List[dict], int]:
+    """Validate records against Item; returns (rows, rejected_count)."""
+    items = list(items)
+    rows = validate_records(items)
+    rejected = len(items) - len(rows)
+    for rec in rows:
+        day = _parse_date(rec["date"])
+        rec["date"] = day
+        rec["year"] = day.year if day else None
+        for k in ("metadata", "chunk_metadata"):
+            if rec[k] is not None:
+                rec[k] = json.dumps(rec[k], ensure_ascii=False, sort_keys=True)
+    rows.sort(key=lambda r: (r["year"] or 0, r["type"], r["date"] or _date.min, r["id"]))
+    return rows, rejected
+
+def _partitions(path: str) -> List[str]:
+    return [n for n in os.listdir(path) if n.startswith("year=") and os.path.isdir(os.path.join(path, n))]
+
+def write_columnar(items: Iterable[dict], out_dir: str, row_group_size: int = 50_000) -> bool:
+    """Write items as a year-partitioned Parquet dataset under out_dir.
+
+    Returns False (and writes nothing) when the validated records are the same
+    as in the previous export.
+    """
+    # Imported here so the rest of the package works without pyarrow installed
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    rows, rejected = validate(items)
+    digest = hashlib.sha256(json.dumps(rows, default=str, ensure_ascii=False).encode()).hexdigest()
+    manifest_path = os.path.join(out_dir, _MANIFEST)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            if json.load(f).get("sha256") == digest:
+                return False
+    except (OSError, ValueError):
+        pass
+
+    table = pa.Table.from_pylist(rows, schema=_schema())
+    # Written next to out_dir first; only then are the old year=* partitions
+    # (the only things in out_dir this export owns) swapped for the new ones
+    parent, base = os.path.split(os.path.abspath(out_dir))
+    tmp = os.path.join(parent, f".{base}.tmp")
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)   # left over from an interrupted export
+    ds.write_dataset(
+        table, tmp, format="parquet",
+        partitioning=ds.partitioning(pa.schema([("year", pa.int16())]), flavor="hive"),
+        max_rows_per_group=row_group_size, min_rows_per_group=min(row_group_size, 1024),
+        basename_template="part-{i}.parquet",
+    )
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)   # a swap cut short must not look up to date
+    for name in _partitions(out_dir):
+        shutil.rmtree(os.path.join(out_dir, name))
+    for name in _partitions(tmp):
+        os.replace(os.path.join(tmp, name), os.path.join(out_dir, name))
+    os.rmdir(tmp)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"sha256": digest, "count": len(rows), "rejected": rejected}, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    print(f"Columnar export: {len(rows)} records to {out_dir} ({rejected} rejected)")
+    return True
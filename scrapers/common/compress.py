@@ -0,0 +1,127 @@
+"""
+Precompressed .gz/.br siblings of the JSON outputs, for static hosts that
+serve them (Netlify, the current host, compresses on the fly and does not).
+
+Off by default. With SCRAPER_COMPRESS set (e.g. "gz,br"), every file
+written through io.write_json_stream (catalogs, latest.json, shards, the
+merged feed) gets <name>.gz and <name>.br next to it, and
+<dir>/compressed.json records the raw and compressed byte sizes of each
+file in the directory. Small metadata files written by
+io._write_small_if_changed (manifest.json, changes/index.json, ...) get
+none. The level is chosen from the file size:
+small files (latest.json, recent shards) get the slowest, smallest settings,
+while multi-megabyte catalogs use levels that keep a sync fast. gzip output
+is deterministic (no mtime), so unchanged data does not churn the repo.
+
+Siblings newer than their source are left alone, so unchanged outputs are
+not recompressed. Brotli needs the optional `brotli` package; without it
+only .gz is written.
+"""
+import os, gzip, json, threading
+
+FORMATS = tuple(f for f in os.environ.get("SCRAPER_COMPRESS", "").split(",") if f)
+MANIFEST = "compressed.json"
+MIN_BYTES = 1024          # smaller files are not worth a sibling
+# (files up to this many bytes, brotli quality, gzip level). Brotli 10-11 are
+# ~50x slower than 9 (about 0.5 MB/s), so they are kept for small files.
+LEVELS = ((256 << 10, 11, 9), (4 << 20, 9, 9), (None, 6, 6))
+_CHUNK = 1 << 20
+_lock = threading.Lock()
+_warned = []
+
+def levels(size: int):
+    """(brotli quality, gzip level) for a file of `size` bytes."""
+    for limit, br, gz in LEVELS:
+        if limit is None or size <= limit:
+            return br, gz
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        if not _warned:
+            _warned.append(True)
+            print("brotli is not installed; writing .gz siblings only")
+        return None
+
+def _chunks(path):
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(_CHUNK), b"")
+
+def _write_gz(src, dst, level):
+    with open(dst, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level, mtime=0) as f:
+        for chunk in _chunks(src):
+            f.write(chunk)
+
+def _write_br(src, dst, quality, brotli):
+    c = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+    with open(dst, "wb") as f:
+        for chunk in _chunks(src):
+            f.write(c.process(chunk))
+        f.write(c.finish())
+
+def compress_file(path: str, formats=None) -> dict:
+    """Write missing or stale siblings of path; returns its manifest entry."""
+    formats = FORMATS if formats is None else formats
+    size = os.path.getsize(path)
+    entry = {"bytes": size}
+    if size < MIN_BYTES:
+        _remove_siblings(path)
+        return entry
+    br_q, gz_level = levels(size)
+    mtime = os.path.getmtime(path)
+    for ext in formats:
+        dst = f"{path}.{ext}"
+        if not (os.path.exists(dst) and os.path.getmtime(dst) >= mtime):
+            tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if ext == "gz":
+                _write_gz(path, tmp, gz_level)
+            elif ext == "br":
+                brotli = _brotli()
+                if brotli is None:
+                    continue
+                _write_br(path, tmp, br_q, brotli)
+            else:
+                raise ValueError(f"unknown compression format {ext!r}")
+            os.replace(tmp, dst)
+        entry[ext] = os.path.getsize(dst)
+    return entry
+
+def _remove_siblings(path):
+    for ext in ("gz", "br"):
+        if os.path.exists(f"{path}.{ext}"):
+            os.remove(f"{path}.{ext}")
+
+def remove(path: str):
+    """Delete path's siblings and its manifest entry (path itself is already gone)."""
+    _remove_siblings(path)
+    _update_manifest(os.path.dirname(path), os.path.basename(path), None)
+
+def precompress(path: str, formats=None) -> dict:
+    """compress_file plus the manifest update for path's directory (no-op when disabled)."""
+    formats = FORMATS if formats is None else formats
+    if not formats:
+        return {}
+    entry = compress_file(path, formats)
+    _update_manifest(os.path.dirname(path), os.path.basename(path), entry)
+    return entry
+
+def _update_manifest(directory, name, entry):
+    path = os.path.join(directory or ".", MANIFEST)
+    with _lock:
+        try:
+            with open(path, encoding="utf-8") as f:
+                files = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            files = {}
+        if files.get(name) == entry:
+            return
+        if entry is None:
+            files.pop(name, None)
+        else:
+            files[name] = entry
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": dict(sorted(files.items()))}, f, separators=(",", ":"))
+        os.replace(tmp, path)
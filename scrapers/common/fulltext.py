@@ -0,0 +1,519 @@
+"""
+Local full-text BM25 search over extracted document text.
+
+Indexes title, summary and full_content (or chunk_content for chunk records)
+of the text feeds into a directory of immutable, memory-mapped segments, so
+opening an index only maps files and takes milliseconds. Each segment holds a
+batch of documents:
+
+    docs.bin       uint32 [date (yyyymmdd), type, length, string offset] per document
+    strings.bin    "id\\0title\\0parent_id" of each document
+    terms.bin      sorted terms (utf-8); terms.idx has uint64 [term offset, df,
+                   postings offset, postings length, positions offset, positions length]
+    postings.bin   per term: zlib(uint32 document-number gaps + term frequencies)
+    positions.bin  per term: uint32 [block count, compressed block sizes], then
+                   blocks of POSITION_BLOCK documents: zlib(uint32 position gaps)
+
+Postings are delta-encoded uint32 arrays compressed with zlib rather than
+variable-byte codes, because zlib and array decode them in C. Arrays use the
+native byte order; the index is a local cache, rebuilt from the feeds.
+
+index.json lists the segments with their deleted document numbers, and
+docmap.json maps each id to its segment, number and content digest. update()
+only indexes new or changed documents into a new segment and marks replaced
+ones deleted; segments are merged once there are more than MAX_SEGMENTS or a
+large share of deleted documents. As in Lucene, document frequencies count
+deleted documents until their segment is merged.
+
+Queries are words and "quoted phrases": documents must contain every phrase
+and rank by BM25 over all query words, optionally filtered by type and date.
+Phrases are checked in score order until k documents match, so only the
+position blocks of those candidates are decoded.
+"""
+import os, re, sys, json, math, mmap, zlib, heapq, shutil, itertools
+from array import array
+from typing import Dict, Iterable, List, Optional
+from .io import doc_digest
+from .search_index import tokenize
+
+MANIFEST = "index.json"
+DOCMAP = "docmap.json"
+SEGMENT_DOCS = 20_000     # documents per segment written by one update
+MAX_SEGMENTS = 8
+MAX_DELETED = 0.3         # merge when this share of indexed documents is deleted
+POSITION_BLOCK = 128      # documents per separately decoded block of positions
+K1, B = 1.2, 0.75
+_PHRASE = re.compile(r'"([^"]*)"')
+_TERM_FIELDS = 6
+
+def _text(d: dict) -> str:
+    return "\n".join(filter(None, (d.get("title"), d.get("summary"),
+                                   d.get("full_content") or d.get("chunk_content"))))
+
+def _day(s, end=False) -> int:
+    """yyyymmdd of an ISO date or prefix ("2025", "2025-03"); 0 if unparseable."""
+    digits = re.sub(r"\D", "", (s or "")[:10])
+    if len(digits) < 4:
+        return 0
+    return int((digits + ("9999" if end else "0000"))[:8])
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _pack(values, typecode="I") -> bytes:
+    return zlib.compress(array(typecode, values).tobytes())
+
+def _unpack(blob, typecode="I") -> array:
+    a = array(typecode)
+    a.frombytes(zlib.decompress(blob))
+    return a
+
+def parse_query(query: str):
+    """(terms, phrases): every query token, and the token lists of quoted phrases."""
+    phrases = [p for p in (tokenize(m) for m in _PHRASE.findall(query)) if p]
+    terms = tokenize(_PHRASE.sub(" ", query))
+    for p in phrases:
+        terms.extend(p)
+    return list(dict.fromkeys(terms)), phrases
+
+class _Segment:
+    FILES = ("docs.bin", "strings.bin", "terms.bin", "terms.idx", "postings.bin", "positions.bin")
+
+    def __init__(self, path: str, deleted=()):
+        self.path, self.name = path, os.path.basename(path)
+        self.deleted = frozenset(deleted)
+        self.maps = {name: _map(os.path.join(path, name)) for name in self.FILES}
+        self.docs = memoryview(self.maps["docs.bin"]).cast("I")
+        self.idx = memoryview(self.maps["terms.idx"]).cast("Q")
+        self.n, self.nterms = len(self.docs) // 4, len(self.idx) // _TERM_FIELDS
+        self._lengths = None
+
+    def term(self, i: int) -> bytes:
+        end = self.idx[(i + 1) * _TERM_FIELDS] if i + 1 < self.nterms else len(self.maps["terms.bin"])
+        return self.maps["terms.bin"][self.idx[i * _TERM_FIELDS]:end]
+
+    def find(self, term: bytes) -> int:
+        lo, hi = 0, self.nterms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.nterms and self.term(lo) == term else -1
+
+    def terms(self):
+        """(term, segment name, term number) in term order."""
+        return ((self.term(i), self.name, i) for i in range(self.nterms))
+
+    def df(self, i: int) -> int:
+        return self.idx[i * _TERM_FIELDS + 1]
+
+    def postings(self, i: int):
+        """(document numbers, term frequencies) of term i."""
+        _, df, off, n = self.idx[i * _TERM_FIELDS:i * _TERM_FIELDS + 4]
+        a = _unpack(self.maps["postings.bin"][off:off + n])
+        return list(itertools.accumulate(a[:df])), a[df:]
+
+    def _position_blocks(self, i: int):
+        off = self.idx[i * _TERM_FIELDS + 4]
+        data = self.maps["positions.bin"]
+        count = int.from_bytes(data[off:off + 4], sys.byteorder)
+        sizes = memoryview(data[off + 4:off + 4 + 4 * count]).cast("I")
+        return off + 4 + 4 * count, sizes
+
+    def positions(self, i: int, tfs, j: int, cache: dict) -> List[int]:
+        """Token positions of term i in its j-th document; cache holds decoded blocks."""
+        b = j // POSITION_BLOCK
+        block = cache.get((i, b))
+        if block is None:
+            start, sizes = self._position_blocks(i)
+            start += sum(sizes[:b])
+            block = cache[i, b] = _unpack(self.maps["positions.bin"][start:start + sizes[b]])
+        skip = sum(tfs[b * POSITION_BLOCK:j])
+        return list(itertools.accumulate(block[skip:skip + tfs[j]]))
+
+    def all_positions(self, i: int, tfs) -> List[List[int]]:
+        """Token positions of term i in each of its documents."""
+        start, sizes = self._position_blocks(i)
+        out, data = [], self.maps["positions.bin"]
+        for b, size in enumerate(sizes):
+            block, k = _unpack(data[start:start + size]), 0
+            for tf in tfs[b * POSITION_BLOCK:(b + 1) * POSITION_BLOCK]:
+                out.append(list(itertools.accumulate(block[k:k + tf])))
+                k += tf
+            start += size
+        return out
+
+    def strings(self, doc: int):
+        start = self.docs[doc * 4 + 3]
+        end = self.docs[doc * 4 + 7] if doc + 1 < self.n else len(self.maps["strings.bin"])
+        return self.maps["strings.bin"][start:end].decode().split("\0")
+
+    def lengths(self) -> List[int]:
+        if self._lengths is None:
+            self._lengths = self.docs[2::4].tolist()
+        return self._lengths
+
+    def close(self):
+        self.docs.release()
+        self.idx.release()
+        for m in self.maps.values():
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+def _write_segment(path, docs, inverted):
+    """docs: [(date, type, length, id, title, parent)]; inverted: {term: (numbers, positions)}."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp)
+    table, strings = array("I"), bytearray()
+    for date, type_, length, id_, title, parent in docs:
+        table.extend((date, type_, length, len(strings)))
+        strings += "\0".join((id_, title.replace("\0", " "), parent)).encode()
+    terms, idx = bytearray(), array("Q")
+    with open(os.path.join(tmp, "postings.bin"), "wb") as post, open(os.path.join(tmp, "positions.bin"), "wb") as pos:
+        for term in sorted(inverted, key=str.encode):
+            numbers, positions = inverted[term]
+            gaps = [numbers[0]] + [b - a for a, b in zip(numbers, numbers[1:])]
+            p = _pack(gaps + [len(ps) for ps in positions])
+            blocks = [_pack(g for ps in positions[k:k + POSITION_BLOCK]
+                            for g in itertools.chain((ps[0],), (b - a for a, b in zip(ps, ps[1:]))))
+                      for k in range(0, len(positions), POSITION_BLOCK)]
+            q = array("I", [len(blocks)] + [len(x) for x in blocks]).tobytes() + b"".join(blocks)
+            idx.extend((len(terms), len(numbers), post.tell(), len(p), pos.tell(), len(q)))
+            terms += term.encode()
+            post.write(p)
+            pos.write(q)
+    for name, data in (("docs.bin", table.tobytes()), ("strings.bin", strings),
+                       ("terms.bin", terms), ("terms.idx", idx.tobytes())):
+        with open(os.path.join(tmp, name), "wb") as f:
+            f.write(data)
+    os.replace(tmp, path)
+
+class FullTextIndex:
+    def __init__(self, path: str = ".cache/fulltext"):
+        self.path = path
+        self.segments: List[_Segment] = []
+        self.reload()
+
+    def reload(self):
+        """(Re)open the segments listed in index.json."""
+        try:
+            with open(os.path.join(self.path, MANIFEST), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {"version": 1, "next": 0, "types": [], "length": 0, "segments": []}
+        self.mtime = _mtime(os.path.join(self.path, MANIFEST))
+        old = {s.name: s for s in self.segments}
+        self.segments = []
+        for e in self.manifest["segments"]:
+            seg = old.pop(e["name"], None) or _Segment(os.path.join(self.path, e["name"]))
+            seg.deleted = frozenset(e["deleted"])
+            self.segments.append(seg)
+        for seg in old.values():
+            seg.close()
+        self.types = self.manifest["types"]
+        self.count = sum(s.n - len(s.deleted) for s in self.segments)
+
+    def close(self):
+        for seg in self.segments:
+            seg.close()
+        self.segments = []
+
+    # Searching
+
+    def search(self, query: str, k: int = 10, type: str = None, date_from: str = None,
+               date_to: str = None) -> List[dict]:
+        """Top k documents for query, best first, as {id, title, date, type, parent_id, score}."""
+        terms, phrases = parse_query(query)
+        if not terms or not self.count:
+            return []
+        type_no = None
+        if type is not None:
+            if type not in self.types:
+                return []
+            type_no = self.types.index(type)
+        lo, hi = _day(date_from), _day(date_to, end=True)
+        avgdl = self.manifest["length"] / self.count or 1.0
+        keys = [t.encode() for t in terms]
+        found = [[seg.find(t) for t in keys] for seg in self.segments]
+        df = [sum(seg.df(row[j]) for seg, row in zip(self.segments, found) if row[j] >= 0)
+              for j in range(len(terms))]
+        # df includes deleted documents until a merge, so N does too
+        total = sum(seg.n for seg in self.segments)
+        idf = [math.log(1 + (total - n + 0.5) / (n + 0.5)) for n in df]
+        hits, context = [], {}
+        for seg, row in zip(self.segments, found):
+            term_no = dict(zip(terms, row))
+            if any(term_no[w] < 0 for p in phrases for w in p):
+                continue
+            docs, lengths, postings = seg.docs, seg.lengths(), {}
+            scores: Dict[int, float] = {}
+            for t, i, w in zip(terms, row, idf):
+                if i < 0:
+                    continue
+                numbers, tfs = postings[t] = seg.postings(i)
+                for n, tf in zip(numbers, tfs):
+                    scores[n] = scores.get(n, 0.0) + w * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[n] / avgdl))
+            context[id(seg)] = (term_no, postings, {})
+            for n, score in scores.items():
+                if n in seg.deleted or (type_no is not None and docs[n * 4 + 1] != type_no):
+                    continue
+                date = docs[n * 4]
+                if (lo and date < lo) or (hi and date > hi):
+                    continue
+                hits.append((score, seg, n))
+        if not phrases:
+            return [self._result(seg, n, score) for score, seg, n in heapq.nlargest(k, hits, key=lambda h: h[0])]
+        # Phrase checks decode positions, so only the best candidates are checked
+        results = []
+        for score, seg, n in sorted(hits, key=lambda h: -h[0]):
+            term_no, postings, positions = context[id(seg)]
+            if all(_has_phrase(seg, term_no, postings, positions, p, n) for p in phrases):
+                results.append(self._result(seg, n, score))
+                if len(results) == k:
+                    break
+        return results
+
+    def _result(self, seg, n, score) -> dict:
+        id_, title, parent = seg.strings(n)
+        date, type_no = seg.docs[n * 4], seg.docs[n * 4 + 1]
+        return {"id": id_, "title": title, "parent_id": parent or None, "score": round(score, 4),
+                "date": f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}" if date else "",
+                "type": self.types[type_no] if type_no < len(self.types) else ""}
+
+    # Updating
+
+    def update(self, docs: Iterable[dict], prune: bool = True) -> dict:
+        """Index new and changed docs; with prune, delete ids not in docs.
+
+        Returns counts of added, replaced, deleted and unchanged documents.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        docmap = _load(os.path.join(self.path, DOCMAP))
+        segs = {s.name: s for s in self.segments}
+        names = list(segs)
+        deleted = {s.name: set(s.deleted) for s in self.segments}
+        types, length = list(self.types), self.manifest["length"]
+        stats = dict(added=0, replaced=0, deleted=0, unchanged=0)
+        seen, batch = set(), []
+
+        def drop(entry):
+            nonlocal length
+            name, n, _ = entry
+            if n not in deleted[name]:
+                deleted[name].add(n)
+                length -= segs[name].lengths()[n]
+
+        def flush():
+            nonlocal length
+            name = f"seg-{self.manifest['next']:06d}"
+            self.manifest["next"] += 1
+            inverted, table = {}, []
+            for n, (d, digest) in enumerate(batch):
+                toks = tokenize(_text(d))
+                for pos, t in enumerate(toks):
+                    e = inverted.get(t)
+                    if e is None:
+                        e = inverted[t] = ([], [])
+                    if not e[0] or e[0][-1] != n:
+                        e[0].append(n)
+                        e[1].append([])
+                    e[1][-1].append(pos)
+                t = d.get("type") or ""
+                if t not in types:
+                    types.append(t)
+                table.append((_day(d.get("date")), types.index(t), len(toks), d["id"], d.get("title") or "",
+                              _parent(d) or ""))
+                docmap[d["id"]] = [name, n, digest]
+                length += len(toks)
+            _write_segment(os.path.join(self.path, name), table, inverted)
+            segs[name], deleted[name] = _Segment(os.path.join(self.path, name)), set()
+            names.append(name)
+            batch.clear()
+
+        for d in docs:
+            id_ = d.get("id")
+            if not id_ or id_ in seen:
+                continue
+            seen.add(id_)
+            digest = doc_digest(json.dumps([_text(d), d.get("type"), d.get("date"), _parent(d)]).encode())
+            old = docmap.get(id_)
+            if old and old[2] == digest:
+                stats["unchanged"] += 1
+                continue
+            if old:
+                drop(old)
+                stats["replaced"] += 1
+            else:
+                stats["added"] += 1
+            batch.append((d, digest))
+            if len(batch) >= SEGMENT_DOCS:
+                flush()
+        if batch:
+            flush()
+        if prune:
+            for id_ in [i for i in docmap if i not in seen]:
+                drop(docmap.pop(id_))
+                stats["deleted"] += 1
+
+        total = sum(segs[n].n for n in names)
+        if len(names) > MAX_SEGMENTS or (total and sum(len(deleted[n]) for n in names) / total > MAX_DELETED):
+            names = [self._merge(names, segs, deleted, docmap)]
+        # Segments without live documents are dropped
+        names = [n for n in names if len(deleted[n]) < segs[n].n]
+        self.manifest.update(types=types, length=length,
+                             segments=[{"name": n, "docs": segs[n].n, "deleted": sorted(deleted[n])} for n in names])
+        _write_json(os.path.join(self.path, DOCMAP), docmap)
+        # The manifest is written last: it is what makes the new segments visible
+        _write_json(os.path.join(self.path, MANIFEST), self.manifest)
+        current = {s.name for s in self.segments}
+        for name, seg in segs.items():
+            if name not in current:
+                seg.close()
+        self.reload()
+        self._remove_unused()
+        return stats
+
+    def _merge(self, names, segs, deleted, docmap) -> str:
+        """Merge the named segments into one without their deleted documents."""
+        name = f"seg-{self.manifest['next']:06d}"
+        self.manifest["next"] += 1
+        remap, table, n = {}, [], 0
+        for s in names:
+            seg, dead = segs[s], deleted[s]
+            for old in range(seg.n):
+                if old in dead:
+                    continue
+                remap[s, old] = n
+                row = seg.docs[old * 4:old * 4 + 3].tolist()
+                table.append((*row, *seg.strings(old)))
+                n += 1
+        for id_, entry in docmap.items():
+            entry[:2] = [name, remap[entry[0], entry[1]]]
+        inverted = {}
+        merged = heapq.merge(*[segs[s].terms() for s in names])
+        for term, group in itertools.groupby(merged, key=lambda x: x[0]):
+            numbers, positions = [], []
+            for _, s, i in group:
+                seg = segs[s]
+                docs_, tfs = seg.postings(i)
+                for old, ps in zip(docs_, seg.all_positions(i, tfs)):
+                    new = remap.get((s, old))
+                    if new is not None:
+                        numbers.append(new)
+                        positions.append(ps)
+            if numbers:
+                inverted[term.decode()] = (numbers, positions)
+        _write_segment(os.path.join(self.path, name), table, inverted)
+        segs[name], deleted[name] = _Segment(os.path.join(self.path, name)), set()
+        return name
+
+    def _remove_unused(self):
+        keep = {s.name for s in self.segments}
+        for entry in os.listdir(self.path):
+            if entry.startswith("seg-") and entry not in keep:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+def serve(index: FullTextIndex, host: str = "127.0.0.1", port: int = 8080):
+    """Serve GET /search?q=...&k=10&type=...&from=YYYY[-MM[-DD]]&to=... as JSON.
+
+    The index is reopened when index.json changes, so a running server picks
+    up updates written by another process.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+    import threading, time
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != "/search":
+                return self._send(404, {"error": "not found"})
+            qs = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if not qs.get("q"):
+                return self._send(400, {"error": "missing q"})
+            try:
+                k = min(int(qs.get("k", 10)), 100)
+            except ValueError:
+                return self._send(400, {"error": "k must be a number"})
+            with lock:
+                if _mtime(os.path.join(index.path, MANIFEST)) != index.mtime:
+                    index.reload()
+            t0 = time.perf_counter()
+            results = index.search(qs["q"], k=k, type=qs.get("type"), date_from=qs.get("from"),
+                                   date_to=qs.get("to"))
+            self._send(200, {"query": qs["q"], "took_ms": round((time.perf_counter() - t0) * 1000, 2),
+                             "count": len(results), "results": results})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Full-text search on http://{host}:{server.server_address[1]}/search?q=... ({index.count} documents)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def _parent(d: dict) -> Optional[str]:
+    return (d.get("chunk_metadata") or {}).get("parent_id")
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _has_phrase(seg, term_no, postings, positions, phrase, n) -> bool:
+    """Whether document n of seg has the words of phrase at consecutive positions.
+
+    positions caches the decoded position blocks for the query.
+    """
+    starts = None
+    for offset, word in enumerate(phrase):
+        numbers, tfs = postings[word]
+        j = _bisect(numbers, n)
+        if j < 0:
+            return False
+        here = {p - offset for p in seg.positions(term_no[word], tfs, j, positions)}
+        starts = here if starts is None else starts & here
+        if not starts:
+            return False
+    return True
+
+def _bisect(numbers, n) -> int:
+    lo, hi = 0, len(numbers)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if numbers[mid] < n:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo if lo < len(numbers) and numbers[lo] == n else -1
+
+def _load(path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
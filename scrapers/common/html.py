@@ -0,0 +1,77 @@
+"""
+HTML extraction primitives shared by the table/link scrapers.
+
+Two interchangeable backends return identical results:
+
+- "lxml": walks the lxml tree directly with XPath (default, much faster)
+- "soup": the original BeautifulSoup path, kept for parity checks
+
+Pick one with the `parser=` argument or the SCRAPER_PARSER env var.
+"""
+import os
+import lxml.etree, lxml.html
+from bs4 import BeautifulSoup
+
+DEFAULT_PARSER = os.environ.get("SCRAPER_PARSER", "lxml")
+
+def _text_lxml(el) -> str:
+    # Same as bs4 get_text(strip=True): stripped text nodes joined with ""
+    return "".join(s.strip() for s in el.itertext())
+
+def _tree(html: str):
+    # Always parse as a full document (like bs4) so a bare fragment's root
+    # element is still reachable with ".//" paths. None for an empty document.
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode input with an XML encoding declaration
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+    except lxml.etree.ParserError:
+        return None
+
+def _links_lxml(html: str):
+    tree = _tree(html)
+    if tree is None:
+        return []
+    return [(a.get("href").strip(), _text_lxml(a)) for a in tree.iterfind(".//a[@href]")]
+
+def _links_soup(html: str):
+    s = BeautifulSoup(html, "lxml")
+    return [(a["href"].strip(), a.get_text(strip=True)) for a in s.select("a[href]")]
+
+def _table_rows_lxml(html: str):
+    tree = _tree(html)
+    table = tree.find(".//table") if tree is not None else None
+    if table is None:
+        return []
+    rows = []
+    for tr in table.iterfind(".//tr"):
+        rows.append([(_text_lxml(td), [(a.get("href", ""), _text_lxml(a)) for a in td.iterfind(".//a")])
+                     for td in tr.iterfind(".//td")])
+    return rows
+
+def _table_rows_soup(html: str):
+    table = BeautifulSoup(html, "lxml").find("table")
+    if not table:
+        return []
+    return [[(td.get_text(strip=True), [(a.get("href", ""), a.get_text(strip=True)) for a in td.find_all("a")])
+             for td in tr.find_all("td")]
+            for tr in table.find_all("tr")]
+
+_BACKENDS = {
+    "lxml": (_links_lxml, _table_rows_lxml),
+    "soup": (_links_soup, _table_rows_soup),
+}
+
+def links(html: str, parser: str = None):
+    """Every <a href> in the page as (href stripped, link text)."""
+    return _BACKENDS[parser or DEFAULT_PARSER][0](html)
+
+def table_rows(html: str, parser: str = None):
+    """Rows of the first <table>, header included.
+
+    Each row is a list of cells; each cell is (text, [(href, link text), ...])
+    covering every <a> in it, with "" for a missing href.
+    """
+    return _BACKENDS[parser or DEFAULT_PARSER][1](html)
@@ -1,5 +1,10 @@
-import time, requests
+import os, json, time, random, hashlib, threading, requests
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
+from .metrics import METRICS
 
 UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
 SESSION = requests.Session()
@@ -9,17 +14,400 @@ SESSION.headers.update({
     "Accept-Language": "en-US,en;q=0.9",
     "Connection": "keep-alive"
 })
+# One connection pool shared by every scraper; sized for concurrent crawls
+_ADAPTER = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
 
-def get(url, *, timeout=30, max_retries=4, backoff=1.5):
+class RateLimiter:
+    """Token bucket per host: `rate` requests/second with bursts up to `burst`."""
+    def __init__(self, rate=1.0, burst=1):
+        self.rate, self.burst = float(rate), float(burst)
+        self._buckets = {}  # host -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = [tokens - 1, now]
+                    return
+                self._buckets[host] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+    def configure(self, rate, burst=None):
+        """Change the rate (and burst) for every host, e.g. from a --rate option."""
+        with self._lock:
+            self.rate = float(rate)
+            if burst is not None:
+                self.burst = float(burst)
+
+# Worth retrying; any other status >= 400 (404, 410, ...) fails at once
+RETRY_STATUSES = frozenset({403, 408, 425, 429, 500, 502, 503, 504})
+# The host is throttling or blocking us (SYNC_AUDIT.md): shrink concurrency
+THROTTLE_STATUSES = frozenset({403, 429, 503})
+MAX_RETRY_AFTER = 300.0
+
+class CircuitOpenError(requests.ConnectionError):
+    """The host's circuit stayed open for longer than the breaker's max_wait."""
+
+def retry_after(r):
+    """Seconds asked for by a response's Retry-After header (capped), or None."""
+    value = r.headers.get("Retry-After") if r is not None else None
+    if not value:
+        return None
+    try:
+        secs = float(value)
+    except ValueError:
+        try:
+            secs = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(secs, 0.0), MAX_RETRY_AFTER)
+
+def backoff_delay(attempt, base=1.5, cap=60.0):
+    """Exponential backoff with equal jitter (half fixed, half random), so
+    concurrent workers that failed together do not retry together."""
+    d = min(cap, base * 2 ** attempt)
+    return d / 2 + random.uniform(0, d / 2)
+
+def retryable(exc):
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in RETRY_STATUSES
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+def healthy(status):
+    """Whether a request outcome (status code or "error") says the host is fine."""
+    return status != "error" and status < 500 and status not in THROTTLE_STATUSES
+
+class AdaptiveConcurrency:
+    """Per-host cap on requests in flight, adjusted AIMD-style.
+
+    Each success raises the cap by 1/cap (about +1 per round of requests); a
+    throttling response (403/429/503) halves it, at most once per `cooldown`
+    seconds so a burst of 429s from one round counts as a single signal.
+    """
+    def __init__(self, initial=8, min_limit=1, max_limit=32, cooldown=5.0):
+        self.initial, self.min_limit, self.max_limit, self.cooldown = initial, min_limit, max_limit, cooldown
+        self._hosts = {}  # host -> [limit, in_flight, last_decrease]
+        self._cond = threading.Condition()
+
+    def _host(self, url):
+        return self._hosts.setdefault(urlparse(url).netloc, [float(self.initial), 0, float("-inf")])
+
+    def limit(self, url):
+        with self._cond:
+            return self._host(url)[0]
+
+    @contextmanager
+    def slot(self, url):
+        with self._cond:
+            h = self._host(url)
+            while h[1] >= int(h[0]):
+                self._cond.wait()
+            h[1] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                h[1] -= 1
+                self._cond.notify_all()
+
+    def success(self, url):
+        with self._cond:
+            h = self._host(url)
+            h[0] = min(self.max_limit, h[0] + 1 / h[0])
+            self._cond.notify_all()
+
+    def throttled(self, url):
+        with self._cond:
+            h = self._host(url)
+            now = time.monotonic()
+            if now - h[2] >= self.cooldown:
+                h[0], h[2] = max(self.min_limit, h[0] / 2), now
+                METRICS.inc("http_concurrency_decreases_total", host=urlparse(url).netloc)
+
+class _Circuit:
+    __slots__ = ("failures", "open_until", "cooldown", "probing", "tripped")
+
+    def __init__(self, cooldown):
+        self.failures, self.open_until, self.cooldown, self.probing = 0, 0.0, cooldown, False
+        self.tripped = False   # opened on consecutive failures, not only paused
+
+class CircuitBreaker:
+    """Per-host circuit breaker shared by every request to the host.
+
+    After `threshold` consecutive unhealthy outcomes (connection errors,
+    timeouts, 5xx, 403/429) the circuit opens and every request to the host
+    waits `cooldown` seconds instead of spending its own retries. Then one
+    probe request goes through: success closes the circuit, failure reopens
+    it with the cooldown doubled (up to max_cooldown). A pause() for the
+    server's Retry-After is not an escalation: once it is over the circuit
+    closes again whatever the probe returns, and only `threshold`
+    consecutive failures open it. A request that has waited max_wait seconds
+    in total raises CircuitOpenError.
+    """
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=600.0, max_wait=1800.0):
+        self.threshold, self.cooldown, self.max_cooldown, self.max_wait = threshold, cooldown, max_cooldown, max_wait
+        self._hosts = {}  # host -> _Circuit
+        self._cond = threading.Condition()
+
+    def _circuit(self, host):
+        c = self._hosts.get(host)
+        if c is None:
+            c = self._hosts[host] = _Circuit(self.cooldown)
+        return c
+
+    def is_open(self, url):
+        with self._cond:
+            return self._circuit(urlparse(url).netloc).open_until > 0
+
+    def before(self, url):
+        """Block while the host's circuit is open; let one probe through after."""
+        host = urlparse(url).netloc
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                c = self._circuit(host)
+                now = time.monotonic()
+                if not c.open_until:
+                    return
+                if now >= c.open_until and not c.probing:
+                    c.probing = True
+                    return
+                left = self.max_wait - (now - start)
+                if left <= 0:
+                    raise CircuitOpenError(f"circuit for {host} open for more than {self.max_wait:.0f}s")
+                # Until the cooldown ends, or until the probe reports back
+                self._cond.wait(min(left, c.open_until - now if now < c.open_until else 1.0))
+
+    def pause(self, url, seconds):
+        """Hold every request to the host for `seconds` (e.g. for Retry-After)."""
+        with self._cond:
+            c = self._circuit(urlparse(url).netloc)
+            c.open_until = max(c.open_until, time.monotonic() + seconds)
+            c.probing = False
+
+    def record(self, url, ok):
+        host = urlparse(url).netloc
+        with self._cond:
+            c = self._circuit(host)
+            if ok:
+                if c.open_until and c.failures >= self.threshold:
+                    print(f"Circuit closed for {host}")
+                c.failures, c.open_until, c.cooldown, c.probing = 0, 0.0, self.cooldown, False
+                c.tripped = False
+            else:
+                c.failures += 1
+                if c.probing and not c.tripped:
+                    # The Retry-After pause is over; a new Retry-After pauses again
+                    c.open_until, c.probing = 0.0, False
+                if c.probing or (not c.open_until and c.failures >= self.threshold):
+                    if c.probing:
+                        c.cooldown = min(self.max_cooldown, c.cooldown * 2)
+                    c.open_until, c.probing, c.tripped = time.monotonic() + c.cooldown, False, True
+                    METRICS.inc("http_circuit_opened_total", host=host)
+                    print(f"Circuit open for {host} after {c.failures} failures, pausing {c.cooldown:g}s")
+            self._cond.notify_all()
+
+class ResponseCache:
+    """On-disk cache of GET responses keyed by URL.
+
+    Entries younger than `ttl` seconds are served without touching the network;
+    older ones are revalidated with If-None-Match/If-Modified-Since. The least
+    recently used entries are evicted once the bodies exceed `max_bytes`.
+    """
+    def __init__(self, path, *, max_bytes=200 * 1024 * 1024, ttl=0):
+        self.path, self.max_bytes, self.ttl = path, max_bytes, ttl
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _key(self, url):
+        return os.path.join(self.path, hashlib.sha256(url.encode()).hexdigest())
+
+    def load(self, url):
+        key = self._key(url)
+        try:
+            with open(key + ".json", encoding="utf-8") as f: meta = json.load(f)
+            with open(key + ".body", "rb") as f: body = f.read()
+            os.utime(key + ".json")  # LRU bookkeeping
+        except (OSError, ValueError):
+            # Missing, or evicted meanwhile by another process sharing the cache
+            return None, None
+        return meta, body
+
+    def is_fresh(self, meta):
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def conditional_headers(self, meta):
+        h = {}
+        if meta.get("etag"): h["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"): h["If-Modified-Since"] = meta["last_modified"]
+        return h
+
+    def store(self, url, r):
+        os.makedirs(self.path, exist_ok=True)
+        key = self._key(url)
+        meta = {"url": url, "fetched_at": time.time(), "encoding": r.encoding,
+                "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                "headers": dict(r.headers)}
+        old = _size(key + ".body")
+        _write_atomic(key + ".body", r.content)
+        _write_atomic(key + ".json", json.dumps(meta).encode())
+        with self._lock:
+            if self._size is None:
+                self._size = sum(_size(os.path.join(self.path, n))
+                                 for n in os.listdir(self.path) if n.endswith(".body"))
+            else:
+                self._size += len(r.content) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def touch(self, meta):
+        """Mark a revalidated entry as fresh again."""
+        meta["fetched_at"] = time.time()
+        _write_atomic(self._key(meta["url"]) + ".json", json.dumps(meta).encode())
+
+    def _evict(self):
+        metas = []
+        for n in os.listdir(self.path):
+            if n.endswith(".json"):
+                try:
+                    metas.append((os.path.getmtime(os.path.join(self.path, n)), n[:-5]))
+                except OSError:
+                    pass   # removed by another process since listdir
+        metas.sort()
+        for _, name in metas:
+            if self._size <= self.max_bytes:
+                break
+            body = os.path.join(self.path, name + ".body")
+            try:
+                self._size -= os.path.getsize(body)
+                os.remove(body)
+                os.remove(os.path.join(self.path, name + ".json"))
+            except OSError:
+                pass
+
+    @staticmethod
+    def response(meta, body):
+        r = requests.Response()
+        r.status_code, r._content, r.url = 200, body, meta["url"]
+        r.headers.update(meta.get("headers") or {})
+        r.encoding = meta.get("encoding")
+        r.from_cache = True
+        return r
+
+def _size(path):
+    # Other processes sharing the cache may evict a file at any moment
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _write_atomic(path, blob):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f: f.write(blob)
+    os.replace(tmp, path)
+
+def _cache_from_env():
+    path = os.environ.get("SCRAPER_CACHE_DIR", ".cache/http")
+    if not path:
+        return None
+    return ResponseCache(path,
+                         max_bytes=int(os.environ.get("SCRAPER_CACHE_MAX_MB", "200")) * 1024 * 1024,
+                         ttl=float(os.environ.get("SCRAPER_CACHE_TTL", "0")))
+
+# Set SCRAPER_CACHE_DIR="" to disable
+CACHE = _cache_from_env()
+
+def record_request(url, status, nbytes, seconds, retry=False):
+    """Request metrics for one attempt; for callers that use SESSION directly."""
+    host = urlparse(url).netloc
+    METRICS.inc("http_requests_total", host=host, status=status)
+    METRICS.inc("http_bytes_total", nbytes, host=host)
+    METRICS.observe("http_request_seconds", seconds, host=host)
+    METRICS.record_url(url, status=status, nbytes=nbytes, seconds=seconds, retry=retry)
+
+# Shared by every get() call, like SESSION
+CONCURRENCY = AdaptiveConcurrency()
+BREAKER = CircuitBreaker()
+# The serial crawl's pace (a page, then a 1s pause) per host, however many
+# threads fetch; set SCRAPER_RATE or call LIMITER.configure() to change it
+LIMITER = RateLimiter(rate=float(os.environ.get("SCRAPER_RATE", "1")), burst=1)
+
+def get(url, *, timeout=30, max_retries=4, backoff=1.5, limiter=LIMITER, cache=True,
+        breaker=BREAKER, concurrency=CONCURRENCY):
+    """GET with caching, status-aware retries and per-host health tracking.
+
+    Connection errors, timeouts and RETRY_STATUSES are retried after the
+    response's Retry-After (which pauses the whole host through the breaker)
+    or a jittered exponential backoff; other 4xx responses raise at once.
+    Every request to the network takes a token from the host's shared
+    LIMITER. Pass limiter=None / breaker=None / concurrency=None to opt out
+    of the shared ones.
+    """
+    store = CACHE if cache else None
+    host = urlparse(url).netloc
+    meta, body = store.load(url) if store else (None, None)
+    if meta and store.is_fresh(meta):
+        METRICS.inc("http_cache_total", host=host, result="fresh")
+        METRICS.record_url(url, cache="fresh")
+        return ResponseCache.response(meta, body)
+    headers = store.conditional_headers(meta) if meta else {}
     for i in range(max_retries):
+        status, nbytes, r = "error", 0, None
+        if breaker:
+            with METRICS.timed("http_circuit_wait_seconds", host=host):
+                breaker.before(url)
+        if limiter:
+            with METRICS.timed("http_throttle_seconds", host=host):
+                limiter.acquire(url)
+        t0 = time.perf_counter()
         try:
-            r = SESSION.get(url, timeout=timeout)
+            with concurrency.slot(url) if concurrency else nullcontext():
+                t0 = time.perf_counter()
+                r = SESSION.get(url, timeout=timeout, headers=headers)
+            status, nbytes = r.status_code, len(r.content)
+            if r.status_code == 304 and meta:
+                METRICS.inc("http_cache_total", host=host, result="revalidated")
+                store.touch(meta)
+                return ResponseCache.response(meta, body)
             r.raise_for_status()
+            if store:
+                store.store(url, r)
+            r.from_cache = False
             return r
-        except Exception:
-            if i == max_retries - 1:
+        except Exception as e:
+            if i == max_retries - 1 or not retryable(e):
                 raise
-            time.sleep(backoff ** i)
+        finally:
+            # Runs for every attempt, including the returns above
+            record_request(url, status, nbytes, time.perf_counter() - t0, retry=i > 0)
+            _feedback(url, status, breaker, concurrency)
+        METRICS.inc("http_retries_total", host=host)
+        delay = retry_after(r)
+        if delay is not None and breaker:
+            breaker.pause(url, delay)   # waited out in breaker.before()
+            continue
+        with METRICS.timed("http_backoff_seconds", host=host):
+            time.sleep(delay if delay is not None else backoff_delay(i, backoff))
+
+def _feedback(url, status, breaker, concurrency):
+    ok = healthy(status)
+    if breaker:
+        breaker.record(url, ok)
+    if concurrency:
+        if status in THROTTLE_STATUSES:
+            concurrency.throttled(url)
+        elif ok:
+            concurrency.success(url)
 
-def soup(url):
-    return BeautifulSoup(get(url).text, "lxml")
\ No newline at end of file
+def soup(url, **kw):
+    return BeautifulSoup(get(url, **kw).text, "lxml")
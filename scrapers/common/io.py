@@ -1,30 +1,362 @@
-import os, json, hashlib
+import os, json, codecs, hashlib, heapq, itertools, tempfile
 from datetime import datetime, timezone
-from typing import List, Dict
-
-def _sha(b: bytes) -> str:
-    return hashlib.sha256(b).hexdigest()
-
-def _write_if_changed(path: str, data: dict) -> bool:
-    blob = json.dumps(data, ensure_ascii=False, separators=(",",":"))
-    new_hash = _sha(blob.encode())
-    old_hash = _sha(open(path,"rb").read()) if os.path.exists(path) else None
-    if new_hash != old_hash:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path,"w",encoding="utf-8") as f: f.write(blob)
+from typing import Callable, List, Dict, Iterable, Iterator, Optional
+from . import compress
+from .merge import merge_documents
+from .metrics import METRICS
+from .state import state_path
+
+# Everything before this marker (updated_at) changes on every run and is not
+# part of a file's content hash
+_BODY_MARKER = b'"documents":'
+_CHUNK = 1 << 16
+# Changefeed: <out_dir>/changes/{index,<seq>}.json; deltas kept per directory.
+# Its state (seq and per-id digests) is internal and kept under state.STATE_DIR
+CHANGES_DIR = "changes"
+CHANGEFEED_WINDOW = 50
+
+def _file_hash(path: str):
+    """Content hash of a catalog file, read in chunks and skipping the header."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        h = hashlib.sha256()
+        head = f.read(_CHUNK)
+        i = head.find(_BODY_MARKER)
+        h.update(head[i:] if i >= 0 else head)
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+        return h.hexdigest()
+
+def doc_digest(encoded: bytes) -> str:
+    """Short hash of one document's compact JSON, used to detect updates."""
+    return hashlib.blake2b(encoded, digest_size=6).hexdigest()
+
+def write_json_stream(path: str, documents: Iterable[dict], updated_at: str = None, digests: dict = None):
+    """Stream {"updated_at", "documents", "count"} JSON to path.
+
+    Documents (dicts, or bytes already holding their compact JSON) are
+    encoded one at a time and hashed as they are written to a temp file,
+    which replaces path only when the content (everything except updated_at)
+    differs. Precompressed .gz/.br siblings are refreshed when
+    stale (see compress). Returns (changed, bytes_written, content_hash).
+
+    With a digests dict, the id of every dict document is mapped to its
+    doc_digest (for write_changefeed).
+    """
+    with METRICS.timed("write_seconds", kind="json"):
+        changed, size, digest = _write_json_stream(path, documents, updated_at, digests)
+    METRICS.inc("write_bytes_total", size, kind="json", changed=changed)
+    with METRICS.timed("compress_seconds"):
+        compress.precompress(path)
+    return changed, size, digest
+
+def _write_json_stream(path, documents, updated_at, digests):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    updated_at = updated_at or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    h = hashlib.sha256()
+    size = 0
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            def emit(b: bytes, hashed=True):
+                nonlocal size
+                f.write(b)
+                size += len(b)
+                if hashed:
+                    h.update(b)
+            emit(b'{"updated_at":' + json.dumps(updated_at).encode() + b",", hashed=False)
+            emit(_BODY_MARKER + b"[")
+            count = 0
+            for d in documents:
+                # bytes are already-encoded documents (e.g. from the document store)
+                if not isinstance(d, bytes):
+                    doc, d = d, json.dumps(d, ensure_ascii=False, separators=(",",":")).encode()
+                    if digests is not None and doc.get("id"):
+                        digests[doc["id"]] = doc_digest(d)
+                emit((b"," if count else b"") + d)
+                count += 1
+            emit(f'],"count":{count}}}'.encode())
+        digest = h.hexdigest()
+        if digest == _file_hash(path):
+            os.remove(tmp)
+            return False, size, digest
+        os.replace(tmp, path)
+        return True, size, digest
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+_DECODER = json.JSONDecoder()
+_WS = " \t\r\n"
+
+class _JsonScanner:
+    """Decodes JSON values one at a time from a stream of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decode = codecs.getincrementaldecoder("utf-8")()
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self.decode.decode(b"", final=True)
+        else:
+            text = self.decode.decode(chunk)
+        # Drop what has been consumed so the buffer stays about one chunk long
+        self.buf, self.pos = self.buf[self.pos:] + text, 0
         return True
-    return False
 
-def write_catalog_and_latest(items: List[dict], out_dir: str, latest_n=100):
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at the end of the stream)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected one of {chars!r} in JSON stream, got {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return v
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def iter_json_documents(chunks: Iterable[bytes], key: str = "documents") -> Iterator:
+    """Yield the elements of a JSON array as the bytes arrive.
+
+    Accepts either a top-level array or an object holding the array under
+    `key` (other members are skipped). Only one element is held in memory at
+    a time, so arbitrarily large dumps can be read from a streamed response.
+    """
+    sc = _JsonScanner(chunks)
+    if sc.expect("[{") == "{":
+        while True:
+            if sc.peek() == "}":
+                return
+            name = sc.value()
+            sc.expect(":")
+            if name == key and sc.peek() == "[":
+                sc.expect("[")
+                break
+            sc.value()
+            if sc.expect(",}") == "}":
+                return
+    if sc.peek() == "]":
+        return
+    while True:
+        yield sc.value()
+        if sc.expect(",]") == "]":
+            return
+
+def external_sort(items: Iterable[dict], key: Callable[[dict], object], reverse: bool = False,
+                  run_size: int = 50_000) -> Iterator[dict]:
+    """Sort items with at most run_size of them in memory.
+
+    Sorted runs are spilled to temporary JSON-lines files and lazily k-way
+    merged; input that fits in a single run is sorted in memory.
+    """
+    items = iter(items)
+    first = list(itertools.islice(items, run_size))
+    first.sort(key=key, reverse=reverse)
+    nxt = list(itertools.islice(items, run_size))
+    if not nxt:
+        yield from first
+        return
+    with tempfile.TemporaryDirectory(prefix="sort-") as tmp:
+        paths, run = [], first
+        del first
+        while run:
+            path = os.path.join(tmp, f"run-{len(paths)}.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for d in run:
+                    f.write(json.dumps(d, ensure_ascii=False, separators=(",",":")) + "\n")
+            paths.append(path)
+            run, nxt = nxt, list(itertools.islice(items, run_size))
+            run.sort(key=key, reverse=reverse)
+        files = [open(p, encoding="utf-8") for p in paths]
+        try:
+            yield from heapq.merge(*((json.loads(line) for line in f) for f in files),
+                                   key=key, reverse=reverse)
+        finally:
+            for f in files:
+                f.close()
+
+def _shard_key(d: dict, shard_by: str) -> str:
+    date = d.get("date") or ""
+    n = 7 if shard_by == "month" else 4
+    return date[:n] if len(date) >= n and date[:4].isdigit() else "undated"
+
+def write_shards(items_sorted: List[dict], out_dir: str, shard_by="year", updated_at: str = None) -> bool:
+    """Write date-partitioned shards/<key>.json plus manifest.json.
+
+    items_sorted must be newest-first. The manifest lists each shard with its
+    count, date range and content hash so clients only refetch changed shards.
+    Shards that no longer have documents are removed.
+    """
+    shard_dir = os.path.join(out_dir, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    groups: Dict[str, List[dict]] = {}
+    for d in items_sorted:
+        groups.setdefault(_shard_key(d, shard_by), []).append(d)
+    changed, entries = False, []
+    for key, docs in groups.items():
+        path = os.path.join(shard_dir, f"{key}.json")
+        c, size, digest = write_json_stream(path, docs, updated_at)
+        changed |= c
+        entries.append({"key": key, "path": f"shards/{key}.json", "count": len(docs),
+                        "from": docs[-1].get("date", ""), "to": docs[0].get("date", ""),
+                        "bytes": size, "sha256": digest})
+    keep = {e["path"].split("/")[-1] for e in entries}
+    for name in os.listdir(shard_dir):
+        if name.endswith(".json") and name not in keep and name != compress.MANIFEST:
+            os.remove(os.path.join(shard_dir, name))
+            compress.remove(os.path.join(shard_dir, name))
+            changed = True
+    manifest = {"updated_at": updated_at, "shard_by": shard_by,
+                "count": sum(e["count"] for e in entries), "shards": entries}
+    return _write_small_if_changed(os.path.join(out_dir, "manifest.json"), manifest) or changed
+
+def _write_small_if_changed(path: str, data: dict) -> bool:
+    # For small metadata files: compare parsed content ignoring updated_at
+    strip = lambda d: {k: v for k, v in d.items() if k != "updated_at"}
+    try:
+        with open(path, encoding="utf-8") as f:
+            if strip(json.load(f)) == strip(data):
+                return False
+    except (OSError, ValueError):
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",",":"))
+    os.replace(tmp, path)
+    return True
+
+def changefeed_state_path(out_dir: str) -> str:
+    return state_path(out_dir, "changefeed.json", legacy=os.path.join(out_dir, CHANGES_DIR, "state.json"))
+
+def catalog_digests(path: str) -> Optional[Dict[str, str]]:
+    """{id: doc_digest} of a published catalog.json, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    return {d["id"]: doc_digest(json.dumps(d, ensure_ascii=False, separators=(",",":")).encode())
+            for d in iter_catalog(path) if d.get("id")}
+
+def write_catalog_json(out_dir: str, documents: Iterable, updated_at: str,
+                       lookup: Callable[[set], Iterable[dict]], digests: dict = None):
+    """write_json_stream to out_dir/catalog.json, then write_changefeed when it changed.
+
+    Pass digests when documents are pre-encoded bytes (write_json_stream
+    only digests dicts) and fill it while they are consumed.
+    """
+    catalog, state = os.path.join(out_dir, "catalog.json"), changefeed_state_path(out_dir)
+    # Without a state (e.g. a fresh checkout) the published catalog is the previous version
+    previous = None if os.path.exists(state) else catalog_digests(catalog)
+    digests = {} if digests is None else digests
+    res = write_json_stream(catalog, documents, updated_at, digests)
+    if res[0] or not os.path.exists(state):
+        write_changefeed(out_dir, digests, lookup, updated_at, previous=previous)
+    return res
+
+def write_changefeed(out_dir: str, digests: Dict[str, str], lookup: Callable[[set], Iterable[dict]],
+                     updated_at: str = None, window: int = CHANGEFEED_WINDOW, previous: dict = None) -> int:
+    """Record what changed in out_dir's catalog since the previous call.
+
+    digests maps every current document id to its doc_digest; lookup(ids)
+    returns the current documents with those ids. The ids are compared with
+    the state saved by the previous call (changefeed_state_path) or, when it
+    is lost, with `previous` continuing from index.json's sequence number.
+    When anything differs, changes/<seq>.json gets
+    {"seq", "updated_at", "added": [docs], "updated": [docs], "removed": [ids]}
+    under the next sequence number. changes/index.json lists the newest
+    `window` deltas; a client that last synced at sequence s applies the
+    deltas after s in order, or refetches catalog.json (and takes the index's
+    seq) when s is older than the window. The first call only records the
+    baseline (seq 0). Returns the current sequence number.
+    """
+    d, state_file = os.path.join(out_dir, CHANGES_DIR), changefeed_state_path(out_dir)
+    os.makedirs(d, exist_ok=True)
+    try:
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+        seq, old = state["seq"], state["digests"]
+    except (OSError, ValueError, KeyError, TypeError):
+        seq, old = None, None
+    try:
+        with open(os.path.join(d, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        deltas = index["deltas"]
+        if old is None and previous is not None:
+            seq, old = index["seq"], previous
+    except (OSError, ValueError, KeyError, TypeError):
+        deltas = []
+    updated_at = updated_at or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    if old is None:
+        seq, deltas = 0, []
+    else:
+        added = [i for i in digests if i not in old]
+        updated = [i for i in digests if i in old and old[i] != digests[i]]
+        removed = [i for i in old if i not in digests]
+        if not (added or updated or removed) and os.path.exists(state_file):
+            return seq
+        if added or updated or removed:
+            seq += 1
+            docs = {doc["id"]: doc for doc in lookup(set(added) | set(updated))}
+            delta = {"seq": seq, "updated_at": updated_at, "added": [docs[i] for i in added if i in docs],
+                     "updated": [docs[i] for i in updated if i in docs], "removed": removed}
+            path = f"{CHANGES_DIR}/{seq}.json"
+            _write_small_if_changed(os.path.join(out_dir, path), delta)
+            # Entries from a run that was interrupted before saving the state
+            deltas = [e for e in deltas if e["seq"] < seq]
+            deltas.insert(0, {"seq": seq, "updated_at": updated_at, "path": path, "added": len(added),
+                              "updated": len(updated), "removed": len(removed),
+                              "bytes": os.path.getsize(os.path.join(out_dir, path))})
+            for old_delta in deltas[window:]:
+                stale = os.path.join(out_dir, old_delta["path"])
+                if os.path.exists(stale):
+                    os.remove(stale)
+            del deltas[window:]
+    _write_small_if_changed(os.path.join(d, "index.json"),
+                            {"updated_at": updated_at, "seq": seq, "count": len(digests), "deltas": deltas})
+    # Not for clients; written last so an interrupted run is redone next time
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    _write_small_if_changed(state_file, {"seq": seq, "digests": digests})
+    return seq
+
+def write_catalog_and_latest(items: List[dict], out_dir: str, latest_n=100, shard_by="year"):
     os.makedirs(out_dir, exist_ok=True)
-    items_sorted = sorted(items, key=lambda d: d.get("date",""), reverse=True)
+    # Secondary key keeps the order (and so shard hashes) stable across runs
+    items_sorted = sorted(items, key=lambda d: (d.get("date",""), d.get("id","")), reverse=True)
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    catalog = {"updated_at": now, "count": len(items_sorted), "documents": items_sorted}
-    latest  = {"updated_at": now, "count": min(latest_n, len(items_sorted)),
-               "documents": items_sorted[:latest_n]}
-    cat_changed = _write_if_changed(os.path.join(out_dir,"catalog.json"), catalog)
-    lat_changed = _write_if_changed(os.path.join(out_dir,"latest.json"), latest)
-    return cat_changed or lat_changed
+    cat_changed, _, _ = write_catalog_json(out_dir, items_sorted, now,
+                                           lambda ids: [d for d in items_sorted if d.get("id") in ids])
+    lat_changed, _, _ = write_json_stream(os.path.join(out_dir,"latest.json"),
+                                          itertools.islice(items_sorted, latest_n), now)
+    shards_changed = bool(shard_by) and write_shards(items_sorted, out_dir, shard_by, now)
+    return cat_changed or lat_changed or shards_changed
 
 def dedupe_by_url(items: List[dict]) -> List[dict]:
     by: Dict[str, dict] = {}
@@ -43,8 +375,26 @@ def dedupe_by_url(items: List[dict]) -> List[dict]:
 
 def write_all_latest(buckets: Dict[str, List[dict]], out_dir: str, latest_n=300):
     # Merge small "latest" for super-fast home/search
-    merged = []
-    for _, docs in buckets.items():
-        merged.extend(docs[:latest_n])     # assume docs already newest-first
+    docs = []
+    for _, bucket in buckets.items():
+        docs.extend(bucket[:latest_n])     # assume docs already newest-first
+    # Same document from several sources / languages -> one record
+    merged = merge_documents(docs)
     merged.sort(key=lambda d: d.get("date",""), reverse=True)
-    write_catalog_and_latest(merged, os.path.join(out_dir, "all"), latest_n=latest_n)
\ No newline at end of file
+    write_catalog_and_latest(merged, os.path.join(out_dir, "all"), latest_n=latest_n)
+
+def iter_catalog(path: str) -> Iterator[dict]:
+    """Documents of a catalog file, read incrementally (one at a time in memory)."""
+    with open(path, "rb") as f:
+        yield from iter_json_documents(iter(lambda: f.read(_CHUNK), b""))
+
+def read_catalog(out_dir: str) -> List[dict]:
+    # Documents from a previous run, used to merge incremental crawls.
+    # Some sources only ship latest.json, so fall back to that.
+    for name in ("catalog.json", "latest.json"):
+        try:
+            with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                return json.load(f).get("documents", [])
+        except (OSError, ValueError):
+            continue
+    return []
@@ -0,0 +1,194 @@
+"""
+Persistent work queue for long crawls, in SQLite.
+
+A task is (kind, key) with a JSON payload; adding an existing task is a
+no-op, so a producer can re-enqueue everything on every start. Workers in
+any number of threads or processes lease tasks: a lease marks the task as
+taken until `lease_until`, workers renew the leases of tasks they are still
+running, and a lease that runs out (its worker crashed or was killed) makes
+the task available again. Only the current holder of a lease can finish,
+fail or release the task, so a worker that lost its lease cannot undo the
+work of the one that took over. Finishing a task stores its
+result and enqueues the tasks it produced in the same transaction, so every
+finished task is a checkpoint and an interrupted run resumes from there.
+
+Failed tasks are retried with exponential backoff until max_attempts;
+errors that are not worth retrying (http.retryable) fail at once.
+"""
+import os, json, time, sqlite3, threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+LEASE_SECONDS = 600      # renewed every LEASE_SECONDS / 3 while the task runs
+MAX_ATTEMPTS = 5
+RETRY_BASE = 30.0         # seconds before the first retry, doubled per attempt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,   -- lower runs first
+    state       TEXT NOT NULL DEFAULT 'pending',  -- pending, leased, done, failed
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    not_before  REAL NOT NULL DEFAULT 0,      -- retry backoff
+    lease_until REAL,
+    worker      TEXT,
+    error       TEXT,
+    result      BLOB,
+    updated     REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, priority, id);
+CREATE INDEX IF NOT EXISTS tasks_kind_state ON tasks (kind, state);
+"""
+
+class Task:
+    __slots__ = ("id", "kind", "key", "payload", "attempts", "worker")
+
+    def __init__(self, id, kind, key, payload, attempts, worker):
+        self.id, self.kind, self.key, self.payload, self.attempts = id, kind, key, json.loads(payload), attempts
+        self.worker = worker
+
+    def __repr__(self):
+        return f"Task({self.kind} {self.key}, attempt {self.attempts})"
+
+class JobQueue:
+    def __init__(self, path: str, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.path, self.lease_seconds, self.max_attempts = path, lease_seconds, max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread (and per worker process)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _write(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _add(db, tasks, now) -> int:
+        cur = db.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, priority, updated) VALUES (?, ?, ?, ?, ?)",
+            ((kind, key, json.dumps(payload or {}), priority, now) for kind, key, payload, priority in tasks))
+        return cur.rowcount
+
+    def add(self, tasks: Iterable[Tuple[str, str, dict, int]]) -> int:
+        """Enqueue (kind, key, payload, priority) tasks; returns how many were new."""
+        with self._write() as db:
+            return self._add(db, tasks, time.time())
+
+    def lease(self, worker: str) -> Optional[Task]:
+        """Take the next ready task (pending, or leased with an expired lease)."""
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                "SELECT id, kind, key, payload, attempts FROM tasks "
+                "WHERE (state = 'pending' AND not_before <= ?) OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY priority, id LIMIT 1", (now, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_until = ?, "
+                       "worker = ?, updated = ? WHERE id = ?", (now + self.lease_seconds, worker, now, row[0]))
+        return Task(row[0], row[1], row[2], row[3], row[4] + 1, worker)
+
+    _HELD = " WHERE id = ? AND state = 'leased' AND worker = ?"
+
+    def renew(self, tasks: Iterable[Task]) -> int:
+        """Extend the leases of tasks still held by their workers; returns how many were."""
+        now = time.time()
+        with self._write() as db:
+            return db.executemany("UPDATE tasks SET lease_until = ?, updated = ?" + self._HELD,
+                                  ((now + self.lease_seconds, now, t.id, t.worker) for t in tasks)).rowcount
+
+    def complete(self, task: Task, result=None, children: Iterable[Tuple[str, str, dict, int]] = ()) -> bool:
+        """Store task's result and enqueue its children atomically.
+
+        Returns False (and changes nothing) if the lease was lost to another worker.
+        """
+        now = time.time()
+        blob = None if result is None else json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode()
+        with self._write() as db:
+            if not db.execute("UPDATE tasks SET state = 'done', result = ?, error = NULL, lease_until = NULL, "
+                              "updated = ?" + self._HELD, (blob, now, task.id, task.worker)).rowcount:
+                return False
+            self._add(db, children, now)
+            return True
+
+    def fail(self, task: Task, error: str, retry: bool = True) -> bool:
+        """Retry task after a backoff, or mark it failed once it is out of attempts.
+
+        Returns False (and changes nothing) if the lease was lost to another worker.
+        """
+        now = time.time()
+        if retry and task.attempts < self.max_attempts:
+            state, not_before = "pending", now + RETRY_BASE * 2 ** (task.attempts - 1)
+        else:
+            state, not_before = "failed", 0
+        with self._write() as db:
+            return bool(db.execute("UPDATE tasks SET state = ?, not_before = ?, error = ?, lease_until = NULL, "
+                                   "updated = ?" + self._HELD,
+                                   (state, not_before, error[:2000], now, task.id, task.worker)).rowcount)
+
+    def release(self, task: Task) -> bool:
+        """Give a leased task back untried (e.g. on shutdown)."""
+        with self._write() as db:
+            return bool(db.execute("UPDATE tasks SET state = 'pending', attempts = attempts - 1, lease_until = NULL, "
+                                   "updated = ?" + self._HELD, (time.time(), task.id, task.worker)).rowcount)
+
+    def retry_failed(self, kind: str = None) -> int:
+        """Make failed tasks pending again with fresh attempts."""
+        sql = "UPDATE tasks SET state = 'pending', attempts = 0, not_before = 0 WHERE state = 'failed'"
+        with self._write() as db:
+            return db.execute(sql + (" AND kind = ?" if kind else ""), (kind,) if kind else ()).rowcount
+
+    def workers(self) -> List[str]:
+        """Workers holding leases."""
+        return [w for w, in self._db().execute("SELECT DISTINCT worker FROM tasks WHERE state = 'leased'")]
+
+    def expire(self, worker: str) -> int:
+        """End worker's leases now, when it is known to be gone."""
+        with self._write() as db:
+            return db.execute("UPDATE tasks SET lease_until = 0 WHERE state = 'leased' AND worker = ?",
+                              (worker,)).rowcount
+
+    def idle_for(self) -> Optional[float]:
+        """Seconds until a task may become ready, 0 if one is ready now, None if all are finished."""
+        now = time.time()
+        row = self._db().execute(
+            "SELECT MIN(CASE state WHEN 'pending' THEN not_before ELSE lease_until END) FROM tasks "
+            "WHERE state IN ('pending', 'leased')").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - now)
+
+    def counts(self) -> dict:
+        """{kind: {state: count}}"""
+        out = {}
+        for kind, state, n in self._db().execute("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state"):
+            out.setdefault(kind, {})[state] = n
+        return out
+
+    def failures(self, limit: int = 20) -> List[Tuple[str, str, str]]:
+        return self._db().execute("SELECT kind, key, error FROM tasks WHERE state = 'failed' ORDER BY id LIMIT ?",
+                                  (limit,)).fetchall()
+
+    def results(self, kind: str) -> Iterator[Tuple[str, object, float]]:
+        """(key, result, finished at) of the finished tasks of kind, in enqueue order."""
+        rows = self._db().execute("SELECT key, result, updated FROM tasks WHERE kind = ? AND state = 'done' "
+                                  "ORDER BY id", (kind,))
+        for key, blob, updated in rows:
+            yield key, None if blob is None else json.loads(blob), updated
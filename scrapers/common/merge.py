@@ -0,0 +1,115 @@
+"""
+Cross-source deduplication and merge.
+
+Documents are linked when they share either a normalized PDF URL with the
+language suffix removed (so the _E/_S/_T variants of one gazette meet) or a
+normalized (type, number) such as ("Act", "20/2025"). Linked documents are
+grouped with a hash index plus union-find, so merging stays near-linear in
+the number of documents, and each group becomes a single record built from
+the highest-priority source.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+# Lower is preferred when two sources describe the same document
+SOURCE_PRIORITY = {"documents.gov.lk": 0, "lk_legal_docs": 1}
+LANG_ORDER = ("en", "si", "ta")
+
+_LANG_SUFFIX = re.compile(r"(?:_|(?<=[)\d]))([EST])\.pdf$", re.I)
+# "2458/46" but not part of a date like 17/10/2025
+_NUMBER = re.compile(r"(?<![/\d])(\d{1,5})\s*/\s*(\d{1,4})\b(?!\s*/)")
+# Types whose numbers identify a single document across sources
+NUMBERED_TYPES = ("Act", "Bill", "Extraordinary Gazette")
+_LANGS = {"E": "en", "S": "si", "T": "ta"}
+
+def normalize_url(url: str) -> str:
+    """URL with https scheme, lowercase host without www, no fragment or repeated slashes."""
+    p = urlsplit(url.strip())
+    host = p.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"/{2,}", "/", p.path)
+    return urlunsplit(("https", host, path, p.query, ""))
+
+def url_key(url: str) -> str:
+    """normalize_url with the language suffix dropped, shared by all variants."""
+    return _LANG_SUFFIX.sub(".pdf", normalize_url(url)).lower()
+
+def url_lang(url: str) -> Optional[str]:
+    m = _LANG_SUFFIX.search(url or "")
+    return _LANGS[m.group(1).upper()] if m else None
+
+def doc_number(d: dict) -> Optional[str]:
+    """Normalized gazette/act number ("2458/46", "20/2025") if the record has one."""
+    meta = d.get("metadata") or {}
+    for value in (meta.get("doc_num"), d.get("doc_num"), d.get("title")):
+        m = _NUMBER.search(value or "")
+        if m:
+            return f"{int(m.group(1))}/{int(m.group(2))}"
+    return None
+
+def _keys(d: dict):
+    url = d.get("pdf_url") or d.get("detail_url") or d.get("url") or d.get("pdf") or d.get("href")
+    if url:
+        yield "u:" + url_key(url)
+    if d.get("type") in NUMBERED_TYPES:
+        num = doc_number(d)
+        if num:
+            yield f"n:{d['type']}:{num}"
+
+def _priority(d: dict):
+    # Preferred source first, then the record that already covers most languages
+    return (SOURCE_PRIORITY.get(d.get("source"), len(SOURCE_PRIORITY)), -len(d.get("languages") or ()))
+
+def _merge_group(group: List[dict]) -> dict:
+    group = sorted(group, key=_priority)
+    out = dict(group[0])
+    if len(group) == 1:
+        return out
+    pdf_urls: Dict[str, str] = {}
+    langs = []
+    for d in group:
+        url = d.get("pdf_url")
+        lang = url_lang(url) if url else None
+        if url and lang:
+            pdf_urls.setdefault(lang, url)
+        for l in d.get("languages") or ([lang] if lang else []):
+            if l not in langs:
+                langs.append(l)
+        for k, v in d.items():
+            if out.get(k) in (None, "", [], {}) and v not in (None, "", [], {}):
+                out[k] = v
+    out["languages"] = sorted(langs, key=lambda l: LANG_ORDER.index(l) if l in LANG_ORDER else len(LANG_ORDER))
+    if pdf_urls:
+        out["pdf_urls"] = {l: pdf_urls[l] for l in out["languages"] if l in pdf_urls}
+        # English first, matching the scrapers' choice of primary PDF
+        primary = next((pdf_urls[l] for l in LANG_ORDER if l in pdf_urls), None)
+        if primary and url_lang(out.get("pdf_url") or "") not in (None, "en"):
+            out["pdf_url"] = primary
+    return out
+
+def merge_documents(docs: Iterable[dict]) -> List[dict]:
+    """Group duplicate and multilingual records across sources into one each."""
+    docs = list(docs)
+    parent = list(range(len(docs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index: Dict[str, int] = {}
+    for i, d in enumerate(docs):
+        for k in _keys(d):
+            j = index.setdefault(k, i)
+            if j != i:
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+    groups: Dict[int, List[dict]] = {}
+    for i, d in enumerate(docs):
+        groups.setdefault(find(i), []).append(d)
+    return [_merge_group(g) for g in groups.values()]
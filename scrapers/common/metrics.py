@@ -0,0 +1,177 @@
+"""
+Run instrumentation: counters and timing histograms per stage, host and URL.
+
+Everything is recorded in the process-wide METRICS registry. The CLI writes
+it out as a JSON run report (--report) and optionally in the Prometheus text
+format (--metrics, e.g. for the node_exporter textfile collector). Per-URL
+detail only goes to the JSON report to keep the Prometheus label sets small.
+
+One stage can be run under cProfile with --profile STAGE or SCRAPER_PROFILE;
+the stats are saved as <profile_dir>/<stage>.prof. cProfile only sees the
+thread that runs the stage, not its worker threads.
+"""
+import os, io, json, time, threading, cProfile, pstats
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Upper bounds (seconds) of the timing histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PREFIX = "scraper_"
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts, self.sum, self.count, self.max = [0] * len(BUCKETS), 0.0, 0, 0.0
+
+    def add(self, v):
+        for i, le in enumerate(BUCKETS):
+            if v <= le:
+                self.counts[i] += 1
+                break
+        self.sum += v
+        self.count += 1
+        self.max = max(self.max, v)
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Metrics:
+    def __init__(self, profile_stage=None, profile_dir=".cache/profile"):
+        self.profile_stage, self.profile_dir = profile_stage, profile_dir
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = {}    # (name, labels) -> number
+            self.histograms = {}  # (name, labels) -> _Histogram
+            self.urls = {}        # url -> {requests, retries, bytes, seconds, status, ...}
+
+    def inc(self, name, value=1, **labels):
+        k = _key(name, labels)
+        with self._lock:
+            self.counters[k] = self.counters.get(k, 0) + value
+
+    def observe(self, name, seconds, url=None, **labels):
+        """Add a timing to histogram `name`; with url also to that URL's totals."""
+        k = _key(name, labels)
+        with self._lock:
+            h = self.histograms.get(k)
+            if h is None:
+                h = self.histograms[k] = _Histogram()
+            h.add(seconds)
+            if url:
+                u = self._url(url)
+                u[name] = u.get(name, 0.0) + seconds
+
+    def _url(self, url):
+        u = self.urls.get(url)
+        if u is None:
+            u = self.urls[url] = {"requests": 0, "retries": 0, "bytes": 0, "seconds": 0.0, "status": {}}
+        return u
+
+    def record_url(self, url, *, status=None, nbytes=0, seconds=0.0, retry=False, cache=None):
+        """Per-URL totals for one request attempt (status "error" for exceptions,
+        None for a response served from the cache without a request)."""
+        with self._lock:
+            u = self._url(url)
+            u["requests"] += status is not None
+            u["retries"] += bool(retry)
+            u["bytes"] += nbytes
+            u["seconds"] += seconds
+            if status is not None:
+                u["status"][str(status)] = u["status"].get(str(status), 0) + 1
+            if cache:
+                u["cache"] = cache
+
+    @contextmanager
+    def timed(self, name, url=None, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, url=url, **labels)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage, under cProfile if it is the profiled one."""
+        prof = cProfile.Profile() if name == self.profile_stage else None
+        if prof:
+            prof.enable()
+        try:
+            with self.timed("stage_seconds", stage=name):
+                yield
+        finally:
+            if prof:
+                prof.disable()
+                self._save_profile(name, prof)
+
+    def _save_profile(self, name, prof):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        prof.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(25)
+        print(f"Profile of stage {name} saved to {path}\n{out.getvalue()}")
+
+    def report(self):
+        """JSON-ready run report."""
+        with self._lock:
+            def labelled(items, value):
+                return [dict(name=n, labels=dict(l), **value(v)) for (n, l), v in sorted(items)]
+            return {
+                "started_at": datetime.fromtimestamp(self.started, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "counters": labelled(self.counters.items(), lambda v: {"value": v}),
+                "histograms": labelled(self.histograms.items(), lambda h: {
+                    "count": h.count, "sum": round(h.sum, 6), "max": round(h.max, 6),
+                    "buckets": dict(zip(map(str, BUCKETS), h.counts))}),
+                "urls": {u: {k: round(x, 6) if isinstance(x, float) else x for k, x in v.items()}
+                         for u, v in sorted(self.urls.items())},
+            }
+
+    def prometheus(self):
+        """Counters and histograms in the Prometheus text exposition format."""
+        def labels(l, extra=()):
+            parts = [f'{k}="{_escape(v)}"' for k, v in l + tuple(extra)]
+            return "{" + ",".join(parts) + "}" if parts else ""
+        lines = []
+        with self._lock:
+            for kind, items in (("counter", self.counters), ("histogram", self.histograms)):
+                typed = set()
+                for (name, l), v in sorted(items.items()):
+                    metric = PREFIX + name
+                    if metric not in typed:
+                        typed.add(metric)
+                        lines.append(f"# TYPE {metric} {kind}")
+                    if kind == "counter":
+                        lines.append(f"{metric}{labels(l)} {v}")
+                        continue
+                    cum = 0
+                    for le, n in zip(BUCKETS, v.counts):
+                        cum += n
+                        lines.append(f"{metric}_bucket{labels(l, [('le', str(le))])} {cum}")
+                    lines.append(f"{metric}_bucket{labels(l, [('le', '+Inf')])} {v.count}")
+                    lines.append(f"{metric}_sum{labels(l)} {v.sum}")
+                    lines.append(f"{metric}_count{labels(l)} {v.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path):
+        _write_text(path, json.dumps(self.report(), indent=1))
+
+    def write_prometheus(self, path):
+        _write_text(path, self.prometheus())
+
+def _escape(v):
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _write_text(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+METRICS = Metrics(profile_stage=os.environ.get("SCRAPER_PROFILE") or None)
@@ -1,8 +1,22 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Literal, Optional
+import gc, hashlib
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+from pydantic import BaseModel, Field, HttpUrl, TypeAdapter, ValidationError
+from typing import Iterable, List, Literal, Optional, Union
+from typing_extensions import NotRequired, TypedDict
+from .metrics import METRICS
 
 DocType = Literal["Gazette","Extraordinary Gazette","Act","Bill","Form","Notice"]
 
+def canonical_url(url: str) -> str:
+    # Scheme and host are case-insensitive; fragments never reach the server
+    p = urlsplit(url.strip())
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), p.path, p.query, ""))
+
+def stable_id(date: str, url: str) -> str:
+    """Deterministic id from the date and canonical URL (same across runs/processes)."""
+    return f"{date}-{hashlib.sha256(canonical_url(url).encode()).hexdigest()[:8]}"
+
 class Item(BaseModel):
     id: str
     type: DocType
@@ -25,8 +39,127 @@ class Item(BaseModel):
     def make(cls, *, type: DocType, date: str, title: str, url: str,
              languages=None, summary="", raw=""):
         return cls(
-            id=f"{date}-{abs(hash(url)) & 0xffffffff:08x}",
+            id=stable_id(date, url),
             type=type, title=title, date=date,
             languages=languages or [], pdf_url=url,
             summary=summary or title, rawTypeName=raw
-        )
\ No newline at end of file
+        )
+
+# (field, zero-argument default) pairs, resolved once instead of per row
+_DEFAULTS = tuple(
+    (name, f.default_factory or (lambda v=f.default: v)) for name, f in Item.model_fields.items()
+)
+
+class ItemRecord:
+    """Unvalidated, slot-based Item for hot scraping loops.
+
+    Build rows with ItemRecord.make, then validate them all at once with
+    validate_records; this avoids a pydantic round-trip per row.
+    """
+    __slots__ = tuple(Item.model_fields)
+
+    # Same defaults as Item
+    def __init__(self, id, type, title, date, languages=None, pdf_url=None, detail_url=None,
+                 summary="", source="documents.gov.lk", rawTypeName="", full_content=None,
+                 chunk_content=None, metadata=None, chunk_metadata=None):
+        self.id, self.type, self.title, self.date = id, type, title, date
+        self.languages = languages if languages is not None else []
+        self.pdf_url, self.detail_url, self.summary = pdf_url, detail_url, summary
+        self.source, self.rawTypeName = source, rawTypeName
+        self.full_content, self.chunk_content = full_content, chunk_content
+        self.metadata, self.chunk_metadata = metadata, chunk_metadata
+
+    @classmethod
+    def make(cls, *, type: DocType, date: str, title: str, url: str,
+             languages=None, summary="", raw=""):
+        return cls(
+            id=stable_id(date, url),
+            type=type, title=title, date=date,
+            languages=languages or [], pdf_url=url,
+            summary=summary or title, rawTypeName=raw
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# Same fields as Item but validated into plain dicts: no model instances to
+# build and dump again, which is most of the cost for large batches
+_ItemRow = TypedDict("_ItemRow", {
+    name: f.annotation if f.is_required() else NotRequired[f.annotation]
+    for name, f in Item.model_fields.items()
+})
+_ROWS = TypeAdapter(List[_ItemRow])
+_URL_FIELDS = tuple(name for name, f in Item.model_fields.items() if "Url" in str(f.annotation))
+
+_ITEMS = TypeAdapter(List[Item])
+
+@contextmanager
+def _gc_paused():
+    # Bulk validation allocates many acyclic dicts/lists; the cyclic collector
+    # would otherwise rescan the growing batch over and over
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _as_dict(r) -> dict:
+    return r.to_dict() if isinstance(r, ItemRecord) else r
+
+def validate_items(records: Iterable[Union[ItemRecord, dict]]) -> List[Item]:
+    """Validate many records in one call.
+
+    If the batch fails, records are validated one by one and the invalid ones
+    are reported and dropped, so one bad row does not lose the whole page.
+    """
+    rows = [_as_dict(r) for r in records]
+    try:
+        return _ITEMS.validate_python(rows)
+    except ValidationError:
+        pass
+    items = []
+    for row in rows:
+        try:
+            items.append(Item.model_validate(row))
+        except ValidationError as e:
+            print(f"  Invalid record {row.get('id', '?')}: {e.error_count()} error(s), "
+                  f"first: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+    return items
+
+def dump_items(items: List[Item]) -> List[dict]:
+    """JSON-ready dicts for many items in one call."""
+    return _ITEMS.dump_python(items, mode="json")
+
+def validate_records(records: Iterable[Union[ItemRecord, dict]], trusted: bool = False) -> List[dict]:
+    """Validated, JSON-ready dicts for a batch of records.
+
+    trusted=True skips validation for sources whose rows are already known to
+    be well formed (URLs are then kept exactly as given).
+    """
+    rows = [_as_dict(r) for r in records]
+    if trusted:
+        return rows
+    with METRICS.timed("validate_seconds"):
+        out = _validate_rows(rows)
+    METRICS.inc("validate_records_total", len(out), result="ok")
+    METRICS.inc("validate_records_total", len(rows) - len(out), result="rejected")
+    return out
+
+def _validate_rows(rows: List[dict]) -> List[dict]:
+    try:
+        with _gc_paused():
+            rows = _ROWS.validate_python(rows)
+    except ValidationError:
+        # Report and drop the invalid rows
+        return dump_items(validate_items(rows))
+    out = []
+    with _gc_paused():
+        for row in rows:
+            for name in _URL_FIELDS:
+                if row.get(name) is not None:
+                    row[name] = str(row[name])
+            # Field order and defaults as in Item.model_dump
+            out.append({name: row[name] if name in row else default() for name, default in _DEFAULTS})
+    return out
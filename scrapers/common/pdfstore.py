@@ -0,0 +1,196 @@
+import os, re, json, time, hashlib, threading, requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+from .http import BREAKER, LIMITER, SESSION, backoff_delay, healthy, retry_after, retryable
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _content_range(value):
+    """(first byte, total length) of a Content-Range header; None for unknown parts."""
+    m = re.match(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)", value or "")
+    return (_int(m.group(1)), _int(m.group(2))) if m else (None, None)
+
+def _validator(r):
+    """If-Range value for a response: a strong ETag, else Last-Modified (weak ETags are not allowed)."""
+    etag = r.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return r.headers.get("Last-Modified")
+
+class PdfStore:
+    """Content-addressed mirror of source PDFs.
+
+    Files live at <root>/<sha[:2]>/<sha>.pdf, so identical files served under
+    different URLs are stored once. urls.json maps each source URL to
+    {sha256, size, last_seen} and documents.json does the same per document
+    id, so later stages can work purely from the store without the network.
+    Interrupted downloads are kept as .part files, with the ETag or
+    Last-Modified of their response next to them, and resumed with HTTP
+    Range and If-Range, so a file that changed meanwhile is fetched afresh.
+    """
+    def __init__(self, root: str = ".cache/pdf"):
+        self.root = root
+        self._lock = threading.Lock()
+        self.urls = self._load("urls.json")
+        self.documents = self._load("documents.json")
+        # Indexes written by older versions mapped url -> sha only
+        for url, rec in list(self.urls.items()):
+            if isinstance(rec, str):
+                p = self.path(rec)
+                self.urls[url] = {"sha256": rec, "size": os.path.getsize(p) if os.path.exists(p) else None,
+                                  "last_seen": None}
+
+    def _load(self, name: str) -> dict:
+        try:
+            with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], f"{sha}.pdf")
+
+    def lookup(self, url: str):
+        rec = self.urls.get(url)
+        return rec["sha256"] if rec and os.path.exists(self.path(rec["sha256"])) else None
+
+    def _download(self, url: str, timeout, limiter) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        part = os.path.join(self.root, f".{hashlib.sha256(url.encode()).hexdigest()}.part")
+        # The validator of the response the .part came from, so a resume
+        # never appends bytes of a different version of the file
+        validator = self._load_validator(part)
+        for _ in range(2):
+            have = os.path.getsize(part) if os.path.exists(part) else 0
+            if have and not validator:
+                have = 0   # no way to tell whether the file changed since
+            # Identity encoding: byte ranges and lengths then count the file's own bytes
+            headers = {"Accept-Encoding": "identity"}
+            if have:
+                headers.update({"Range": f"bytes={have}-", "If-Range": validator})
+            if limiter:
+                limiter.acquire(url)
+            with SESSION.get(url, timeout=timeout, stream=True, headers=headers) as r:
+                start, total = _content_range(r.headers.get("Content-Range"))
+                if r.status_code == 416:
+                    # Complete only if the server's length is what we have
+                    if total == have:
+                        break
+                    validator = self._restart(part)
+                    continue
+                r.raise_for_status()
+                if r.status_code == 206 and start != have:
+                    validator = self._restart(part)
+                    continue
+                if r.status_code != 206:
+                    # 200: Range ignored or If-Range did not match; start over
+                    have, total = 0, _int(r.headers.get("Content-Length"))
+                    validator = _validator(r)
+                    self._save_validator(part, validator)
+                with open(part, "ab" if have else "wb") as f:
+                    for chunk in r.iter_content(1 << 16):
+                        f.write(chunk)
+            if total is not None and os.path.getsize(part) != total:
+                # Retried by fetch(), resuming from the bytes already written
+                raise requests.ConnectionError(f"{url}: got {os.path.getsize(part)} of {total} bytes")
+            break
+        else:
+            raise requests.ConnectionError(f"{url}: server did not honour the resume range")
+        if os.path.exists(part + ".json"):
+            os.remove(part + ".json")
+        h = hashlib.sha256()
+        with open(part, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+        dest = self.path(sha)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(part)   # same bytes already mirrored under another URL
+        else:
+            os.replace(part, dest)
+        return sha
+
+    def _load_validator(self, part):
+        try:
+            with open(part + ".json", encoding="utf-8") as f:
+                return json.load(f).get("validator")
+        except (OSError, ValueError):
+            return None
+
+    def _save_validator(self, part, validator):
+        with open(part + ".json", "w", encoding="utf-8") as f:
+            json.dump({"validator": validator}, f)
+
+    def _restart(self, part):
+        for p in (part, part + ".json"):
+            if os.path.exists(p):
+                os.remove(p)
+        return None
+
+    def fetch(self, url: str, *, timeout=60, max_retries=4, backoff=1.5, limiter=LIMITER) -> str:
+        """Return the sha256 of url's body, downloading it if not stored yet."""
+        sha = self.lookup(url)
+        if not sha:
+            for i in range(max_retries):
+                BREAKER.before(url)
+                try:
+                    sha = self._download(url, timeout, limiter)
+                    BREAKER.record(url, True)
+                    break
+                except Exception as e:
+                    # Partial bytes stay in the .part file for the next attempt
+                    r = e.response if isinstance(e, requests.HTTPError) else None
+                    if isinstance(e, requests.RequestException):
+                        BREAKER.record(url, healthy(r.status_code if r is not None else "error"))
+                    if i == max_retries - 1 or not retryable(e):
+                        raise
+                    delay = retry_after(r)
+                    time.sleep(delay if delay is not None else backoff_delay(i, backoff))
+        with self._lock:
+            self.urls[url] = {"sha256": sha, "size": os.path.getsize(self.path(sha)), "last_seen": _now()}
+        return sha
+
+    def mirror(self, docs: List[dict], *, workers=4) -> Dict[str, dict]:
+        """Mirror every doc's pdf_url with bounded concurrency, paced by http.LIMITER.
+
+        Returns {doc_id: {pdf_url, sha256, size, last_seen}} for mirrored docs;
+        failures are reported and skipped.
+        """
+        urls = sorted({d["pdf_url"] for d in docs if d.get("pdf_url")})
+
+        def one(url):
+            try:
+                return url, self.fetch(url)
+            except Exception as e:
+                print(f"  Download failed {url}: {e}")
+                return url, None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            ok = {u for u, sha in pool.map(one, urls) if sha}
+        out = {}
+        for d in docs:
+            url = d.get("pdf_url")
+            if url in ok and d.get("id"):
+                out[d["id"]] = self.documents[d["id"]] = dict(self.urls[url], pdf_url=url)
+        self.save()
+        unique = len({self.urls[u]["sha256"] for u in ok})
+        print(f"Mirrored {len(ok)}/{len(urls)} PDFs ({unique} unique files)")
+        return out
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        for name, data in (("urls.json", self.urls), ("documents.json", self.documents)):
+            with self._lock:
+                blob = json.dumps(data, sort_keys=True)
+            path = os.path.join(self.root, name)
+            with open(path + ".tmp", "w", encoding="utf-8") as f: f.write(blob)
+            os.replace(path + ".tmp", path)
@@ -0,0 +1,243 @@
+import os, re, json, hashlib, unicodedata
+from typing import List, Dict, Iterable
+
+# Same fields the client-side lunr index uses, in posting order
+FIELDS = ("title", "summary", "type")
+# \w alone splits Sinhala and Tamil words at vowel signs and viramas (category M)
+_WORD = r"[\w\u0D80-\u0DFF\u0B80-\u0BFF]+"
+_TOKEN = re.compile(_WORD, re.U)
+# Gazette and act numbers ("2458/46", "No. 20/2025") stay one n-gram token
+_NGRAM_TOKEN = re.compile(rf"{_WORD}(?:[/.\-]{_WORD})*", re.U)
+# Zero-width joiners select Sinhala conjunct forms; they are not typed consistently
+_INVISIBLE = dict.fromkeys(map(ord, "\u200b\u200c\u200d\ufeff"))
+
+NGRAM = 3
+NGRAM_FIELDS = ("title", "summary")
+NGRAM_DIR = "ngram"
+_START = "^"
+_VERIFY = 64              # candidates few enough to check by substring
+_VLQ = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "").translate(_INVISIBLE).lower()
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(normalize(text))
+
+def build_index(docs: Iterable[dict]) -> dict:
+    """Build a serializable inverted index over FIELDS.
+
+    docs: [[id, len(title), len(summary), len(type)], ...] in token counts
+    terms: {term: [doc_index, field_index, term_frequency, ...]} flattened
+    """
+    ids, terms = [], {}
+    for i, d in enumerate(docs):
+        lengths = []
+        for f, field in enumerate(FIELDS):
+            toks = tokenize(d.get(field, ""))
+            lengths.append(len(toks))
+            tf: Dict[str, int] = {}
+            for t in toks:
+                tf[t] = tf.get(t, 0) + 1
+            for t, n in tf.items():
+                terms.setdefault(t, []).extend((i, f, n))
+        ids.append([d.get("id", ""), *lengths])
+    return {"version": 1, "fields": list(FIELDS), "docs": ids,
+            "terms": {t: terms[t] for t in sorted(terms)}}
+
+def _load(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_search_index(root: str) -> bool:
+    """Build search/<key>.json for every shard listed in root/manifest.json.
+
+    A shard's index is only rebuilt when the shard's content hash differs from
+    the one recorded in search/manifest.json, so incremental runs only touch
+    the partitions that changed. Returns True if anything was written.
+    """
+    shards = _load(os.path.join(root, "manifest.json")).get("shards", [])
+    out_dir = os.path.join(root, "search")
+    os.makedirs(out_dir, exist_ok=True)
+    old = {e["key"]: e for e in _load(os.path.join(out_dir, "manifest.json")).get("shards", [])}
+    changed, entries = False, []
+    for shard in shards:
+        key, path = shard["key"], os.path.join(out_dir, f"{shard['key']}.json")
+        prev = old.get(key)
+        if prev and prev["source_sha256"] == shard["sha256"] and os.path.exists(path):
+            entries.append(prev)
+            continue
+        docs = _load(os.path.join(root, shard["path"])).get("documents", [])
+        index = build_index(docs)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",",":"))
+        os.replace(tmp, path)
+        changed = True
+        entries.append({"key": key, "path": f"search/{key}.json", "count": len(docs),
+                        "terms": len(index["terms"]), "source_sha256": shard["sha256"]})
+    keep = {f"{e['key']}.json" for e in entries} | {"manifest.json"}
+    for name in os.listdir(out_dir):
+        if name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+            changed = True
+    if changed or len(entries) != len(old):
+        manifest_path = os.path.join(out_dir, "manifest.json")
+        tmp = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "fields": list(FIELDS), "shards": entries}, f,
+                      ensure_ascii=False, separators=(",",":"))
+        os.replace(tmp, manifest_path)
+        changed = True
+    return changed
+
+def _units(token: str) -> List[str]:
+    """Split token into letters with their combining marks (vowel signs, viramas)."""
+    units = []
+    for c in token:
+        if units and unicodedata.category(c)[0] == "M":
+            units[-1] += c
+        else:
+            units.append(c)
+    return units
+
+def ngrams(token: str, n: int = NGRAM, start: bool = True) -> List[str]:
+    """Character n-grams of token, counting a letter and its marks as one character.
+
+    With start, a leading "^" gram anchors the token start, so shorter query
+    tokens still match as prefixes; tokens shorter than n are a single gram.
+    """
+    units = ([_START] if start else []) + _units(token)
+    if len(units) <= n:
+        return ["".join(units)]
+    return ["".join(units[i:i + n]) for i in range(len(units) - n + 1)]
+
+def ngram_text(d: dict) -> str:
+    return " ".join(normalize(d.get(f)) for f in NGRAM_FIELDS if d.get(f))
+
+def encode_postings(numbers: List[int]) -> str:
+    """Ascending doc numbers as base64 VLQ gaps (5 bits per char, 0x20 = more)."""
+    out, prev = [], -1
+    for n in numbers:
+        gap, prev = n - prev - 1, n
+        while True:
+            digit, gap = gap & 31, gap >> 5
+            out.append(_VLQ[digit | (32 if gap else 0)])
+            if not gap:
+                break
+    return "".join(out)
+
+def decode_postings(s: str) -> List[int]:
+    out, prev, gap, shift = [], -1, 0, 0
+    for c in s:
+        digit = _VLQ.index(c)
+        gap |= (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            prev += gap + 1
+            out.append(prev)
+            gap = shift = 0
+    return out
+
+def build_ngram_index(docs: Iterable[dict], n: int = NGRAM) -> dict:
+    """Serializable n-gram index over NGRAM_FIELDS.
+
+    docs: [id, ...] in input order
+    grams: {gram: encode_postings(doc numbers)}
+    """
+    ids, grams = [], {}
+    for i, d in enumerate(docs):
+        seen = set()
+        for token in _NGRAM_TOKEN.findall(ngram_text(d)):
+            seen.update(ngrams(token, n))
+        for g in seen:
+            grams.setdefault(g, []).append(i)
+        ids.append(d.get("id", ""))
+    return {"version": 1, "n": n, "fields": list(NGRAM_FIELDS), "docs": ids,
+            "grams": {g: encode_postings(grams[g]) for g in sorted(grams)}}
+
+def query_ngrams(query: str, n: int = NGRAM) -> List[List[str]]:
+    """Grams per query token; tokens of n or more letters match anywhere in a word."""
+    out = []
+    for token in _NGRAM_TOKEN.findall(normalize(query)):
+        out.append(ngrams(token, n, start=len(_units(token)) < n))
+    return out
+
+def search_ngrams(index: dict, query: str, texts: List[str] = None) -> List[int]:
+    """Doc numbers containing every query token, in index order.
+
+    Gram intersection can over-match (grams present but not adjacent); with
+    texts, the ngram_text of each doc, candidates are checked by substring,
+    and the rarest grams are intersected first until few candidates remain.
+    """
+    grams = index["grams"]
+    wanted = {g for token in query_ngrams(query, index["n"]) for g in token}
+    if not wanted or any(g not in grams for g in wanted):
+        return []
+    result = None
+    for g in sorted(wanted, key=lambda g: len(grams[g])):
+        numbers = decode_postings(grams[g])
+        result = numbers if result is None else sorted(set(result).intersection(numbers))
+        if not result or (texts is not None and len(result) <= _VERIFY):
+            break
+    if texts is None:
+        return result
+    words = _NGRAM_TOKEN.findall(normalize(query))
+    return [i for i in result if all(w in texts[i] for w in words)]
+
+def _slug(type_: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (type_ or "other").lower()).strip("-") or "other"
+
+def write_ngram_index(root: str) -> bool:
+    """Build search/ngram/<type>.json from the shards listed in root/manifest.json.
+
+    Documents keep the shards' newest-first order. Nothing is rebuilt while
+    the shard hashes are unchanged, and only type files whose content changed
+    are rewritten. Returns True if anything was written.
+    """
+    shards = _load(os.path.join(root, "manifest.json")).get("shards", [])
+    out_dir = os.path.join(root, "search", NGRAM_DIR)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    source = hashlib.sha256("".join(s["sha256"] for s in shards).encode()).hexdigest()
+    old = _load(manifest_path)
+    if old.get("source_sha256") == source and old.get("n") == NGRAM and all(
+            os.path.exists(os.path.join(root, "search", e["path"])) for e in old.get("shards", [])):
+        return False
+    by_type: Dict[str, List[dict]] = {}
+    for shard in shards:
+        for d in _load(os.path.join(root, shard["path"])).get("documents", []):
+            by_type.setdefault(d.get("type") or "Other", []).append(
+                {"id": d.get("id", ""), **{f: d.get(f) for f in NGRAM_FIELDS}})
+    os.makedirs(out_dir, exist_ok=True)
+    entries = []
+    for type_ in sorted(by_type):
+        index = build_ngram_index(by_type[type_])
+        data = json.dumps(index, ensure_ascii=False, separators=(",",":")).encode("utf-8")
+        name = f"{_slug(type_)}.json"
+        path = os.path.join(out_dir, name)
+        try:
+            with open(path, "rb") as f:
+                same = f.read() == data
+        except OSError:
+            same = False
+        if not same:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        entries.append({"type": type_, "path": f"{NGRAM_DIR}/{name}", "count": len(index["docs"]),
+                        "grams": len(index["grams"]), "bytes": len(data)})
+    keep = {e["path"].split("/")[-1] for e in entries} | {"manifest.json"}
+    for name in os.listdir(out_dir):
+        if name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "n": NGRAM, "fields": list(NGRAM_FIELDS), "source_sha256": source,
+                   "shards": entries}, f, ensure_ascii=False, separators=(",",":"))
+    os.replace(tmp, manifest_path)
+    return True
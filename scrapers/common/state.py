@@ -0,0 +1,59 @@
+import os, json, hashlib
+from datetime import datetime, timezone
+
+# Internal state (crawl states, changefeed digests, sync marks) lives here,
+# mirroring the data tree, so none of it is deployed with the site
+STATE_DIR = os.environ.get("SCRAPER_STATE_DIR", ".cache/state")
+
+def state_path(out_dir: str, name: str, legacy: str = None) -> str:
+    """Path of the internal state file `name` for data directory out_dir.
+
+    A state file an older version kept inside the data tree (legacy, by
+    default out_dir/name) is moved here on first use.
+    """
+    rel = os.path.relpath(out_dir)
+    if rel.startswith(os.pardir):
+        rel = os.path.abspath(out_dir).lstrip(os.sep)
+    path = os.path.normpath(os.path.join(STATE_DIR, rel, name))
+    legacy = legacy or os.path.join(out_dir, name)
+    if os.path.exists(legacy) and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(legacy, path)
+    return path
+
+class CrawlState:
+    """Persisted record of crawled pages and their content hashes.
+
+    Lets incremental runs skip pages that were already processed. Stored as a
+    small JSON manifest under STATE_DIR, not next to the published catalog
+    it describes (see state_path).
+    """
+    def __init__(self, path: str, pages: dict = None):
+        self.path = path
+        self.pages = pages or {}   # url -> {"sha": str, "crawled_at": str}
+
+    @classmethod
+    def load(cls, path: str) -> "CrawlState":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(path, json.load(f).get("pages", {}))
+        except (OSError, ValueError):
+            return cls(path)
+
+    def seen(self, url: str) -> bool:
+        return url in self.pages
+
+    def changed(self, url: str, body: bytes) -> bool:
+        entry = self.pages.get(url)
+        return not entry or entry["sha"] != hashlib.sha256(body).hexdigest()
+
+    def mark(self, url: str, body: bytes):
+        self.pages[url] = {"sha": hashlib.sha256(body).hexdigest(),
+                           "crawled_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pages": self.pages}, f, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,329 @@
+"""
+SQLite document store shared by every source.
+
+Each source upserts its records in batched transactions into one WAL-mode
+database, keyed by (source, canonical URL) and indexed on date, type and
+URL. The public/data JSON is then exported from indexed queries: catalogs
+stream out already in (date, id) order, "latest N" is a LIMIT query, and
+only the year shards holding rows changed since the previous export are
+rewritten. An export with no changed rows does nothing. Each export that
+changes the catalog also appends to its changefeed (io.write_catalog_json).
+
+Every write batch gets a sequence number stored on the rows it changed;
+dates that rows moved away from (date edits, deletions) are recorded in
+`changes`, so the shards to rewrite are known without scanning the source.
+A source with no rows is seeded from its existing catalog.json, so a fresh
+database (e.g. on a CI runner) picks up the committed data.
+"""
+import os, re, json, sqlite3, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+from . import compress
+from .io import (_shard_key, _write_small_if_changed, doc_digest, iter_catalog, write_catalog_json,
+                 write_json_stream)
+from .merge import normalize_url
+from .metrics import METRICS
+
+DEFAULT_PATH = os.environ.get("SCRAPER_DB", ".cache/documents.sqlite")
+BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    source TEXT NOT NULL,
+    url    TEXT NOT NULL,     -- canonical document URL (merge.normalize_url)
+    id     TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    type   TEXT NOT NULL,
+    doc    BLOB NOT NULL,     -- compact JSON, exactly as exported
+    seq    INTEGER NOT NULL,  -- write batch that last changed the row
+    UNIQUE (source, url)
+);
+CREATE INDEX IF NOT EXISTS documents_source_date ON documents (source, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS documents_type_date ON documents (type, date DESC);
+CREATE INDEX IF NOT EXISTS documents_source_id ON documents (source, id);
+CREATE INDEX IF NOT EXISTS documents_url ON documents (url);
+CREATE INDEX IF NOT EXISTS documents_source_seq ON documents (source, seq);
+CREATE TABLE IF NOT EXISTS changes (source TEXT NOT NULL, date TEXT NOT NULL, seq INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS changes_source_seq ON changes (source, seq);
+CREATE TABLE IF NOT EXISTS exports (
+    source TEXT NOT NULL, out_dir TEXT NOT NULL, seq INTEGER NOT NULL,
+    latest_n INTEGER NOT NULL, shard_by TEXT NOT NULL,
+    PRIMARY KEY (source, out_dir)
+);
+CREATE TABLE IF NOT EXISTS counter (seq INTEGER NOT NULL);
+INSERT INTO counter SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM counter);
+CREATE TRIGGER IF NOT EXISTS documents_moved AFTER UPDATE OF date ON documents
+WHEN old.date IS NOT new.date BEGIN
+    INSERT INTO changes VALUES (old.source, old.date, new.seq);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_deleted AFTER DELETE ON documents BEGIN
+    INSERT INTO changes VALUES (old.source, old.date, (SELECT seq FROM counter));
+END;
+"""
+
+_REPLACE = """
+INSERT INTO documents (source, url, id, date, type, doc, seq) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, url) DO UPDATE SET
+    id = excluded.id, date = excluded.date, type = excluded.type, doc = excluded.doc, seq = excluded.seq
+WHERE excluded.doc != documents.doc
+"""
+# Same preference as io.dedupe_by_url: a merged record only replaces one that is not newer
+_UPSERT = _REPLACE + " AND excluded.date >= documents.date"
+
+# exports row of the per-type catalogs, which span every source
+_TYPES = "*types"
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _encode(d: dict) -> bytes:
+    return json.dumps(d, ensure_ascii=False, separators=(",", ":")).encode()
+
+def doc_url(d: dict) -> Optional[str]:
+    """Canonical key of a record: its URL as in io.dedupe_by_url, else its id."""
+    url = d.get("pdf_url") or d.get("detail_url") or d.get("url") or d.get("pdf") or d.get("href")
+    if url:
+        return normalize_url(url)
+    return f"id:{d['id']}" if d.get("id") else None
+
+def _shard_order(key):
+    # Newest shard first and undated last, as io.write_shards writes them
+    return (key != "undated", key)
+
+class DocumentStore:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers run while a source writes
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _write(self):
+        """Write transaction; yields (connection, sequence number of the batch)."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("UPDATE counter SET seq = seq + 1")
+            yield db, db.execute("SELECT seq FROM counter").fetchone()[0]
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def upsert(self, source: str, docs: Iterable[dict]) -> int:
+        """Insert or update records in batches of BATCH; returns the rows changed.
+
+        Records without a URL or id are skipped.
+        """
+        return self._upsert(source, docs, _UPSERT, None)
+
+    def _upsert(self, source, docs, sql, seen):
+        changed, batch = 0, []
+
+        def flush():
+            nonlocal changed
+            with METRICS.timed("store_seconds", op="upsert"), self._write() as (db, seq):
+                changed += db.executemany(sql, [row + (seq,) for row in batch]).rowcount
+            batch.clear()
+
+        for d in docs:
+            url = doc_url(d)
+            if url is None:
+                continue
+            if seen is not None:
+                seen.add(url)
+            batch.append((source, url, d.get("id") or "", d.get("date") or "", d.get("type") or "", _encode(d)))
+            if len(batch) >= BATCH:
+                flush()
+        if batch:
+            flush()
+        METRICS.inc("store_rows_changed_total", changed, source=source)
+        return changed
+
+    def replace(self, source: str, docs: Iterable[dict], date_from: str = None, date_to: str = None) -> int:
+        """Make docs the complete set of source's records dated date_from..date_to
+        (inclusive, default: all); returns the rows changed.
+
+        Stored records outside that range, e.g. years a crawl did not cover, are kept.
+        """
+        seen = set()
+        changed = self._upsert(source, docs, _REPLACE, seen)
+        rows = self._db().execute("SELECT url FROM documents WHERE source = ? AND date >= ? AND date <= ?",
+                                  (source, date_from or "", date_to or "\uffff"))
+        gone = [(source, url) for (url,) in rows if url not in seen]
+        for i in range(0, len(gone), BATCH):
+            with self._write() as (db, _):
+                db.executemany("DELETE FROM documents WHERE source = ? AND url = ?", gone[i:i + BATCH])
+        METRICS.inc("store_rows_changed_total", len(gone), source=source)
+        return changed + len(gone)
+
+    def seed(self, source: str, out_dir: str) -> int:
+        """Load out_dir's catalog.json (or latest.json) into an empty source."""
+        if self.count(source):
+            return 0
+        for name in ("catalog.json", "latest.json"):
+            path = os.path.join(out_dir, name)
+            if os.path.exists(path):
+                n = self.upsert(source, iter_catalog(path))
+                if n:
+                    print(f"[store] seeded {source} with {n} documents from {path}")
+                return n
+        return 0
+
+    def count(self, source: str) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM documents WHERE source = ?", (source,)).fetchone()[0]
+
+    def _rows(self, source: str, limit: int = -1) -> Iterator[bytes]:
+        for (doc,) in self._db().execute(
+                "SELECT doc FROM documents WHERE source = ? ORDER BY date DESC, id DESC LIMIT ?", (source, limit)):
+            yield doc
+
+    def latest(self, source: str, n: int) -> List[dict]:
+        return [json.loads(doc) for doc in self._rows(source, n)]
+
+    def by_type(self, type: str, n: int = -1) -> Iterator[bytes]:
+        """Newest records of one type across every source, once per URL."""
+        seen = set()
+        for url, doc in self._db().execute(
+                "SELECT url, doc FROM documents WHERE type = ? ORDER BY date DESC, id DESC", (type,)):
+            if url not in seen:
+                seen.add(url)
+                yield doc
+                if len(seen) == n:
+                    return
+
+    def export_types(self, out_dir: str, latest_n: int = 100) -> bool:
+        """Write <out_dir>/<type>/catalog.json and latest.json for every type,
+        across sources, plus <out_dir>/types.json listing them.
+
+        Does nothing when no row of any source changed since the previous
+        export to out_dir. Returns whether any file changed.
+        """
+        db = self._db()
+        seq = db.execute("SELECT MAX(COALESCE((SELECT MAX(seq) FROM documents), 0),"
+                         " COALESCE((SELECT MAX(seq) FROM changes), 0))").fetchone()[0]
+        prev = db.execute("SELECT seq, latest_n FROM exports WHERE source = ? AND out_dir = ?",
+                          (_TYPES, out_dir)).fetchone()
+        listing = os.path.join(out_dir, "types.json")
+        if prev == (seq, latest_n) and os.path.exists(listing):
+            return False
+        now, changed, entries = _now(), False, []
+        os.makedirs(out_dir, exist_ok=True)
+        with METRICS.timed("store_seconds", op="export_types"):
+            for (type,) in db.execute("SELECT DISTINCT type FROM documents WHERE type != '' ORDER BY type").fetchall():
+                slug = re.sub(r"[^a-z0-9]+", "-", type.lower()).strip("-") or "other"
+                c, size, _ = write_json_stream(os.path.join(out_dir, slug, "catalog.json"), self.by_type(type), now)
+                changed |= c
+                changed |= write_json_stream(os.path.join(out_dir, slug, "latest.json"),
+                                             self.by_type(type, latest_n), now)[0]
+                entries.append({"type": type, "path": f"{slug}/catalog.json", "latest": f"{slug}/latest.json",
+                                "bytes": size})
+            changed |= _write_small_if_changed(listing, {"updated_at": now, "types": entries})
+        with self._write() as (db, _):
+            db.execute("INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?)", (_TYPES, out_dir, seq, latest_n, "type"))
+        return changed
+
+    def last_seq(self, source: str) -> int:
+        return self._db().execute(
+            "SELECT MAX(COALESCE((SELECT MAX(seq) FROM documents WHERE source = ?), 0),"
+            " COALESCE((SELECT MAX(seq) FROM changes WHERE source = ?), 0))", (source, source)).fetchone()[0]
+
+    def export(self, source: str, out_dir: str, latest_n: int = 100, shard_by: str = "year") -> bool:
+        """Write source's catalog.json, latest.json and shards to out_dir.
+
+        Does nothing when no row changed since the previous export to out_dir;
+        otherwise only the shards with changed rows are rewritten. Returns
+        whether any file changed.
+        """
+        seq, shard_by = self.last_seq(source), shard_by or ""
+        db = self._db()
+        prev = db.execute("SELECT seq, latest_n, shard_by FROM exports WHERE source = ? AND out_dir = ?",
+                          (source, out_dir)).fetchone()
+        catalog = os.path.join(out_dir, "catalog.json")
+        if prev == (seq, latest_n, shard_by) and os.path.exists(catalog):
+            return False
+        now = _now()
+        digests = {}
+
+        def rows():
+            for id, doc in db.execute("SELECT id, doc FROM documents WHERE source = ? ORDER BY date DESC, id DESC",
+                                      (source,)):
+                if id:
+                    digests[id] = doc_digest(doc)
+                yield doc
+
+        def lookup(ids):
+            ids = list(ids)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                yield from (json.loads(doc) for (doc,) in db.execute(
+                    f"SELECT doc FROM documents WHERE source = ? AND id IN ({','.join('?' * len(chunk))})",
+                    (source, *chunk)))
+
+        with METRICS.timed("store_seconds", op="export"):
+            changed = write_catalog_json(out_dir, rows(), now, lookup, digests)[0]
+            changed |= write_json_stream(os.path.join(out_dir, "latest.json"), self._rows(source, latest_n), now)[0]
+            if shard_by:
+                since = prev[0] if prev and prev[2] == shard_by else 0
+                changed |= self._export_shards(source, out_dir, shard_by, since, now)
+        with self._write() as (db, _):
+            db.execute("INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?)",
+                       (source, out_dir, seq, latest_n, shard_by))
+        return changed
+
+    def _export_shards(self, source, out_dir, shard_by, since, now) -> bool:
+        db = self._db()
+        shard_dir = os.path.join(out_dir, "shards")
+        manifest = os.path.join(out_dir, "manifest.json")
+        os.makedirs(shard_dir, exist_ok=True)
+        entries = {}
+        if since:
+            try:
+                with open(manifest, encoding="utf-8") as f:
+                    entries = {e["key"]: e for e in json.load(f)["shards"]}
+            except (OSError, ValueError, KeyError, TypeError):
+                since = 0
+        key = lambda date: _shard_key({"date": date}, shard_by)
+        if since:
+            dirty = {key(d) for (d,) in db.execute(
+                "SELECT date FROM documents WHERE source = ? AND seq > ?"
+                " UNION SELECT date FROM changes WHERE source = ? AND seq > ?", (source, since, source, since))}
+        else:
+            # Everything, including shard files left over from other writers
+            dirty = {key(d) for (d,) in db.execute("SELECT DISTINCT date FROM documents WHERE source = ?", (source,))}
+            dirty |= {n[:-5] for n in os.listdir(shard_dir) if n.endswith(".json") and n != compress.MANIFEST}
+        changed = False
+        for k in dirty:
+            if k == "undated":
+                rows = db.execute("SELECT date, doc FROM documents WHERE source = ? ORDER BY date DESC, id DESC",
+                                  (source,))
+            else:
+                # Prefix range on the (source, date) index
+                rows = db.execute("SELECT date, doc FROM documents WHERE source = ? AND date >= ? AND date < ?"
+                                  " ORDER BY date DESC, id DESC", (source, k, k + "\uffff"))
+            rows = [(d, doc) for d, doc in rows if key(d) == k]
+            path = os.path.join(shard_dir, f"{k}.json")
+            if not rows:
+                if os.path.exists(path):
+                    os.remove(path)
+                    compress.remove(path)
+                    changed = True
+                entries.pop(k, None)
+                continue
+            c, size, digest = write_json_stream(path, (doc for _, doc in rows), now)
+            changed |= c
+            entries[k] = {"key": k, "path": f"shards/{k}.json", "count": len(rows),
+                          "from": rows[-1][0], "to": rows[0][0], "bytes": size, "sha256": digest}
+        shards = [entries[k] for k in sorted(entries, key=_shard_order, reverse=True)]
+        data = {"updated_at": now, "shard_by": shard_by, "count": sum(e["count"] for e in shards), "shards": shards}
+        return _write_small_if_changed(manifest, data) or changed
@@ -1,92 +1,99 @@
-import re, time
+import re
 from urllib.parse import urljoin
-from .common.http import soup
-from .common.model import Item
+from .common.html import table_rows
+from .common.http import get
+from .common.metrics import METRICS
+from .common.model import ItemRecord, validate_records
 from .common.io import dedupe_by_url, write_catalog_and_latest
 
 BASE = "https://documents.gov.lk"
 PDF = re.compile(r"\.pdf$", re.I)
+LANG = re.compile(r"_([EST])\.pdf$", re.I)
+DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _index_url(year:int):
+    return f"{BASE}/view/extra-gazettes/egz_{year}.html"
 
 def _extract_pdf_links(row_cells):
     """Extract PDF links from table cells"""
     pdfs = []
-    for cell in row_cells:
-        for a in cell.select("a[href]"):
-            href = a.get("href", "").strip()
+    for _, cell_links in row_cells:
+        for href, text in cell_links:
+            href = href.strip()
             if PDF.search(href):
                 pdfs.append({
                     'url': urljoin(BASE, href),
-                    'text': a.get_text(strip=True)
+                    'text': text
                 })
     return pdfs
 
 def _lang_from_url(url:str):
     """Determine language from URL pattern"""
-    m = re.search(r"_([EST])\.pdf$", url, re.I)
+    m = LANG.search(url)
     return {"E":"en","S":"si","T":"ta"}.get(m.group(1).upper()) if m else "en"
 
-def crawl(year:int):
-    """Crawl extraordinary gazettes for a given year"""
+def parse_index(html:str, parser=None):
+    """Parse an egz_<year>.html index page into item dicts"""
     rows = []
-    try:
-        url = f"{BASE}/view/extra-gazettes/egz_{year}.html"
-        s = soup(url)
+    # Process each row (skip header)
+    for cells in table_rows(html, parser)[1:]:
+        if len(cells) < 4:
+            continue
         
-        # Find the table with extraordinary gazettes
-        table = s.find("table")
-        if not table:
-            return []
+        # Extract data from cells
+        gazette_num = cells[0][0]
+        date_str = cells[1][0]
+        description = cells[2][0]
+        
+        # Parse date to YYYY-MM-DD format (e.g. 2025-10-19)
+        if not DATE.match(date_str):
+            continue
+        date = date_str
+        
+        # Extract PDF links
+        pdf_links = _extract_pdf_links(cells[3:])
         
-        # Process each row (skip header)
-        for tr in table.find_all("tr")[1:]:  # Skip header row
-            cells = tr.find_all("td")
-            if len(cells) < 4:
-                continue
-            
-            # Extract data from cells
-            gazette_num = cells[0].get_text(strip=True)
-            date_str = cells[1].get_text(strip=True)
-            description = cells[2].get_text(strip=True)
-            
-            # Parse date to YYYY-MM-DD format
-            try:
-                # Format: 2025-10-19
-                if re.match(r'\d{4}-\d{2}-\d{2}', date_str):
-                    date = date_str
-                else:
-                    continue
-            except:
-                continue
-            
-            # Extract PDF links
-            pdf_links = _extract_pdf_links(cells[3:])
-            
-            if not pdf_links:
-                # No direct links found, skip
-                continue
-            
-            # Create entries for each PDF link (one per language)
-            langs_seen = set()
-            for pdf in pdf_links:
-                lang = _lang_from_url(pdf['url'])
-                if lang not in langs_seen:
-                    langs_seen.add(lang)
-                    
-            # Create a single entry with all languages
-            title = f"Extraordinary Gazette {gazette_num} - {description}"
-            item = Item.make(
-                type="Extraordinary Gazette",
-                date=date,
-                title=title,
-                url=pdf_links[0]['url'],  # Primary URL
-                languages=list(langs_seen),
-                raw="extra-gazettes"
-            )
-            rows.append(item.model_dump())
+        if not pdf_links:
+            # No direct links found, skip
+            continue
+        
+        # One language per PDF link, in page order
+        langs_seen = list(dict.fromkeys(_lang_from_url(pdf['url']) for pdf in pdf_links))
+                
+        # Create a single entry with all languages
+        title = f"Extraordinary Gazette {gazette_num} - {description}"
+        item = ItemRecord.make(
+            type="Extraordinary Gazette",
+            date=date,
+            title=title,
+            url=pdf_links[0]['url'],  # Primary URL
+            languages=langs_seen,
+            raw="extra-gazettes"
+        )
+        rows.append(item)
+    return validate_records(rows)
+
+def crawl(year:int, state=None, failed=None):
+    """Crawl extraordinary gazettes for a given year.
+
+    With a CrawlState, an index page whose content hash is unchanged since the
+    last run is skipped and an empty list is returned. A year that cannot be
+    crawled also returns an empty list; with a `failed` set it is added to it.
+    """
+    try:
+        url = _index_url(year)
+        r = get(url)
+        if state is not None and not state.changed(url, r.content):
+            return []
+        with METRICS.timed("parse_seconds", url=url, source="extra-gazettes"):
+            rows = parse_index(r.text)
         
-        time.sleep(1)  # Be polite
+        if state is not None:
+            state.mark(url, r.content)
     except Exception as e:
         print(f"Error crawling {year}: {e}")
+        if failed is not None:
+            failed.add(year)
         return []
     
     return dedupe_by_url(rows)
@@ -1,47 +1,120 @@
-import re, time
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as _date
 from urllib.parse import urljoin
-from .common.http import soup
-from .common.model import Item
+from .common.html import links
+from .common.http import get
+from .common.metrics import METRICS
+from .common.model import ItemRecord, validate_records
 from .common.io import dedupe_by_url, write_catalog_and_latest
 
 BASE = "https://documents.gov.lk"
 DATE_PAGE = re.compile(r"^/view/gazettes/\d{4}-\d{2}-\d{2}\.html$")
+DATE_PAGE_DATE = re.compile(r"/(\d{4}-\d{2}-\d{2})\.html$")
 PDF = re.compile(r"\.pdf$", re.I)
+LANG = re.compile(r"([EST])\.pdf$", re.I)
 
-def _year_date_pages(year:int):
+def _year_url(year:int):
+    return f"{BASE}/view/gazettes/{year}.html"
+
+def _fetch(url):
+    r = get(url)
+    return r.content, r.text
+
+def parse_year_index(html:str, parser=None):
+    return sorted({href for href, _ in links(html, parser) if DATE_PAGE.match(href)})
+
+def parse_date_page(html:str, date:str, parser=None):
+    rows = []
+    for href, text in links(html, parser):
+        if not PDF.search(href):
+            continue
+        url = urljoin(BASE, href)
+        title = text or url.split("/")[-1]
+        lang = _lang_from_name(url) or "en"
+        rows.append(ItemRecord.make(type="Gazette", date=date, title=title,
+                                    url=url, languages=[lang], raw="gazettes"))
+    return validate_records(rows)
+
+def _year_index(year:int):
+    """Return (date_pages, body) for a year index, or None if it could not be fetched."""
+    url = _year_url(year)
     try:
-        s = soup(f"{BASE}/view/gazettes/{year}.html")
-        return sorted({a['href'].strip() for a in s.select("a[href]") if DATE_PAGE.match(a['href'].strip())})
+        body, html = _fetch(url)
     except Exception:
-        return []
+        return None
+    with METRICS.timed("parse_seconds", url=url, source="gazettes"):
+        return parse_year_index(html), body
+
+def _year_date_pages(year:int):
+    res = _year_index(year)
+    return res[0] if res else []
 
 def _lang_from_name(name:str):
-    m = re.search(r"([EST])\.pdf$", name, re.I)
+    m = LANG.search(name)
     return {"E":"en","S":"si","T":"ta"}.get(m.group(1).upper()) if m else None
 
-def crawl(from_year:int, to_year:int):
-    rows = []
-    for y in range(from_year, to_year+1):
-        for dp in _year_date_pages(y):
-            date = re.search(r"/(\d{4}-\d{2}-\d{2})\.html$", dp).group(1)
-            try:
-                s = soup(urljoin(BASE, dp))
-                for a in s.select("a[href]"):
-                    href = a["href"].strip()
-                    if not PDF.search(href):
-                        continue
-                    url = urljoin(BASE, href)
-                    title = a.get_text(strip=True) or url.split("/")[-1]
-                    lang = _lang_from_name(url) or "en"
-                    rows.append(Item.make(type="Gazette", date=date, title=title,
-                                          url=url, languages=[lang], raw="gazettes").model_dump())
-                time.sleep(1)  # politeness
-            except Exception:
-                # Skip problematic date pages, continue crawling
-                continue
+def _date_page_rows(dp:str):
+    """Return (rows, body) for a date page, or None if it could not be fetched."""
+    date = DATE_PAGE_DATE.search(dp).group(1)
+    url = urljoin(BASE, dp)
+    try:
+        body, html = _fetch(url)
+        with METRICS.timed("parse_seconds", url=url, source="gazettes"):
+            return parse_date_page(html, date), body
+    except Exception:
+        # Skip problematic date pages, continue crawling
+        return None
+
+def crawl(from_year:int, to_year:int, workers:int=1, state=None, failed=None):
+    """Crawl gazette date pages for the given years.
+
+    With workers=1 pages are fetched one at a time, with more workers
+    concurrently. Either way every request goes through http.get's shared
+    per-host rate limiter, so workers only hide latency and never raise the
+    request rate.
+
+    Passing a CrawlState makes the crawl incremental: past years whose index is
+    already recorded are not refetched, only date pages missing from the state
+    are crawled, and fetched pages are recorded with their content hashes.
+
+    Pages that cannot be fetched are skipped; with a `failed` set the years
+    whose index or any date page failed are added to it.
+    """
+    years = list(range(from_year, to_year+1))
+    if state is not None:
+        current = _date.today().year
+        years = [y for y in years if y >= current or not state.seen(_year_url(y))]
+    failed = set() if failed is None else failed
+    if workers <= 1:
+        return _crawl(years, state, map, failed)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return _crawl(years, state, pool.map, failed)
+
+def _crawl(years, state, map_, failed):
+    indexes = {y: res for y, res in zip(years, map_(_year_index, years)) if res}
+    failed.update(y for y in years if y not in indexes)
+    pages = [dp for dps, _ in indexes.values() for dp in dps
+             if state is None or not state.seen(urljoin(BASE, dp))]
+
+    rows, failed_years = [], set()
+    for dp, res in zip(pages, map_(_date_page_rows, pages)):
+        if res is None:
+            failed_years.add(int(dp.rsplit("/", 1)[-1][:4]))
+            continue
+        rows.extend(res[0])
+        if state is not None:
+            state.mark(urljoin(BASE, dp), res[1])
+    failed.update(failed_years)
+    if state is not None:
+        # A year index is only recorded once all of its date pages made it in,
+        # so failed pages are retried on the next incremental run
+        for y, (_, body) in indexes.items():
+            if y not in failed_years:
+                state.mark(_year_url(y), body)
     return dedupe_by_url(rows)
 
-def run(from_year:int, to_year:int, out_dir:str):
-    docs = crawl(from_year, to_year)
+def run(from_year:int, to_year:int, out_dir:str, workers:int=1):
+    docs = crawl(from_year, to_year, workers=workers)
     docs.sort(key=lambda d: d["date"], reverse=True)
-    write_catalog_and_latest(docs, out_dir)
\ No newline at end of file
+    write_catalog_and_latest(docs, out_dir)
@@ -0,0 +1,363 @@
+"""
+lk_legal_docs source: documents published by the nuuuwan/lk_legal_docs
+repository, normalized to the standard schema.
+"""
+
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+import requests
+
+from .common.http import SESSION, record_request
+from .common.io import external_sort, iter_catalog, iter_json_documents, write_catalog_json, write_json_stream
+from .common.metrics import METRICS
+from .common.model import ItemRecord, validate_records
+from .common.state import state_path
+
+SOURCE_BASE = 'https://raw.githubusercontent.com/nuuuwan/lk_legal_docs/main'
+SOURCE_ALL = 'data/all.json'
+SOURCE_LATEST = 'data/latest-100.json'
+
+# Records normalized per validation batch and held in memory per sort run
+# when streaming
+STREAM_BATCH = 1000
+SORT_RUN_SIZE = 50_000
+
+# Newest (date, id) ingested so far, for delta syncs; internal, so kept under
+# state.STATE_DIR rather than next to the published catalog
+STATE_FILE = 'lk_legal_docs_state.json'
+
+# Name of this source in the CLI and the document store
+STORE_SOURCE = 'lk-legal-docs'
+
+
+def download_json(url: str) -> Optional[Dict[str, Any]]:
+    """Download and parse JSON from URL with error handling."""
+    status, nbytes, t0 = "error", 0, time.perf_counter()
+    try:
+        print(f"Downloading: {url}")
+        response = SESSION.get(url, timeout=30)
+        status, nbytes = response.status_code, len(response.content)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"Error downloading {url}: {e}")
+        return None
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON from {url}: {e}")
+        return None
+    finally:
+        record_request(url, status, nbytes, time.perf_counter() - t0)
+
+
+def normalize_document(raw_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize a raw document to the standard Item schema.
+    
+    Returns an unvalidated Item-shaped dict (see scrapers.common.model.Item);
+    normalize_all validates them in bulk. The source document number
+    (e.g. 2458/46) is kept in metadata.doc_num for cross-source matching.
+    """
+    # Extract fields from the lk_legal_docs structure
+    doc_id = raw_doc.get('id', raw_doc.get('doc_num', ''))
+    
+    # Get title from description or other fields
+    title = raw_doc.get('description', raw_doc.get('title', ''))
+    
+    # Get date
+    date_str = raw_doc.get('date', '')
+    
+    # Determine type from doc_type_name
+    doc_type_name = raw_doc.get('doc_type_name', '').lower()
+    if 'extra-gazette' in doc_type_name or 'extraordinary' in doc_type_name:
+        normalized_type = 'Extraordinary Gazette'
+    elif 'gazette' in doc_type_name:
+        normalized_type = 'Gazette'
+    elif 'act' in doc_type_name:
+        normalized_type = 'Act'
+    elif 'bill' in doc_type_name:
+        normalized_type = 'Bill'
+    else:
+        normalized_type = 'Gazette'  # Default
+    
+    # Extract languages and PDF URL from lang_to_source_url
+    lang_mapping = raw_doc.get('lang_to_source_url', {})
+    languages = list(lang_mapping.keys()) if lang_mapping else ['en']
+    pdf_url = lang_mapping.get('en', lang_mapping.get('si', lang_mapping.get('ta', '')))
+    doc_num = raw_doc.get('doc_num', '')
+    
+    return ItemRecord(
+        id=doc_id,
+        type=normalized_type,
+        title=title,
+        date=date_str,
+        languages=languages,
+        pdf_url=pdf_url or None,
+        summary=title,  # Use title as summary
+        source='lk_legal_docs',
+        rawTypeName=raw_doc.get('doc_type_name', ''),
+        metadata={'doc_num': doc_num} if doc_num else None,
+    ).to_dict()
+
+
+def sort_documents_by_date(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort documents by date, newest first."""
+    def get_sort_key(doc):
+        date_str = doc.get('date', '')
+        try:
+            # Try to parse as ISO date
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        except:
+            # Fallback to string sorting for non-ISO dates
+            return date_str
+    
+    return sorted(documents, key=get_sort_key, reverse=True)
+
+
+def write_json_atomically(filepath: str, documents: Iterable[Dict[str, Any]], updated_at: str) -> None:
+    """Stream documents to filepath, replacing it atomically only if the content changed."""
+    changed, size, _ = write_json_stream(filepath, documents, updated_at)
+    print(f"{'Written' if changed else 'Unchanged'}: {filepath} ({size} bytes)")
+
+
+def write_catalog(catalog_path: str, documents: Iterable[Dict[str, Any]], updated_at: str) -> None:
+    """write_json_atomically for catalog.json, also appending to the directory's changefeed."""
+    def lookup(ids):
+        return (doc for doc in iter_catalog(catalog_path) if doc.get('id') in ids)
+    changed, size, _ = write_catalog_json(os.path.dirname(catalog_path), documents, updated_at, lookup)
+    print(f"{'Written' if changed else 'Unchanged'}: {catalog_path} ({size} bytes)")
+
+
+def normalize_all(data: Any, label: str = 'document') -> List[Dict[str, Any]]:
+    """Normalize a downloaded payload (list or {'documents': [...]})."""
+    if isinstance(data, list):
+        raw_docs = data
+    elif isinstance(data, dict) and 'documents' in data:
+        raw_docs = data['documents']
+    else:
+        raw_docs = []
+    
+    docs = []
+    with METRICS.timed("parse_seconds", source="lk_legal_docs"):
+        for raw_doc in raw_docs:
+            try:
+                docs.append(normalize_document(raw_doc))
+            except Exception as e:
+                print(f"Error normalizing {label} {raw_doc.get('id', 'unknown')}: {e}")
+    # Validate the whole batch in one pass; invalid records are reported and dropped
+    return validate_records(docs)
+
+
+def stream_documents(url: str, label: str = 'document') -> Iterator[Dict[str, Any]]:
+    """
+    Download url and yield normalized, validated documents as they arrive.
+    
+    The response is parsed incrementally, so memory use does not depend on
+    the size of the dump. Raises requests.RequestException or ValueError if
+    the download or the JSON is broken part way through.
+    """
+    print(f"Streaming: {url}")
+    status, nbytes, t0 = "error", 0, time.perf_counter()
+    
+    def counted(chunks):
+        nonlocal nbytes
+        for chunk in chunks:
+            nbytes += len(chunk)
+            yield chunk
+    
+    try:
+        with SESSION.get(url, timeout=30, stream=True) as response:
+            status = response.status_code
+            response.raise_for_status()
+            chunks = counted(response.iter_content(chunk_size=1 << 16))
+            yield from _normalize_stream(iter_json_documents(chunks), label)
+    finally:
+        # Seconds include the normalizing and writing done while streaming
+        record_request(url, status, nbytes, time.perf_counter() - t0)
+
+
+def _normalize_stream(raw_docs: Iterable[Any], label: str) -> Iterator[Dict[str, Any]]:
+    """Normalize raw documents and validate them STREAM_BATCH at a time."""
+    batch = []
+    for raw_doc in raw_docs:
+        try:
+            batch.append(normalize_document(raw_doc))
+        except Exception as e:
+            print(f"Error normalizing {label} {raw_doc.get('id', 'unknown') if isinstance(raw_doc, dict) else raw_doc!r}: {e}")
+        if len(batch) >= STREAM_BATCH:
+            yield from validate_records(batch)
+            batch = []
+    yield from validate_records(batch)
+
+
+def catalog_sort_key(doc: Dict[str, Any]) -> Tuple[str, str]:
+    # ISO dates sort correctly as strings; the id keeps ties in a stable order
+    return (doc.get('date') or '', doc.get('id') or '')
+
+
+def load_high_water(output_dir: str) -> Optional[Tuple[str, str]]:
+    """The newest (date, id) already in output_dir's catalog, if recorded."""
+    try:
+        with open(state_path(output_dir, STATE_FILE), encoding='utf-8') as f:
+            mark = json.load(f).get('high_water')
+        return (mark['date'], mark['id']) if mark else None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_high_water(output_dir: str, mark: Tuple[str, str]) -> None:
+    path = state_path(output_dir, STATE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'high_water': {'date': mark[0], 'id': mark[1]}}, f)
+    os.replace(tmp, path)
+
+
+class _Head:
+    """Pass documents through while counting them and keeping the first `keep`."""
+    
+    def __init__(self, keep: int):
+        self.keep, self.docs, self.count = keep, [], 0
+    
+    def __call__(self, docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for doc in docs:
+            self.count += 1
+            if len(self.docs) < self.keep:
+                self.docs.append(doc)
+            yield doc
+
+
+def _download_latest(latest_url: str) -> List[Dict[str, Any]]:
+    latest_data = download_json(latest_url)
+    if not latest_data:
+        raise RuntimeError("Failed to download latest documents data")
+    return sort_documents_by_date(normalize_all(latest_data, 'latest document'))
+
+
+def _sync_delta(catalog_path: str, latest_docs: List[Dict[str, Any]], mark: Tuple[str, str],
+                head: _Head, updated_at: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Merge the records of latest_docs newer than mark into the catalog.
+    
+    Returns the new records, or None when every record in the latest window
+    is new, i.e. the gap since the last sync may be larger than the window
+    and a full sync is needed.
+    """
+    new = sorted((d for d in latest_docs if catalog_sort_key(d) > mark), key=catalog_sort_key, reverse=True)
+    if not latest_docs or len(new) == len(latest_docs):
+        return None
+    if not new:
+        # Only the head is needed for the return value
+        for _ in head(itertools.islice(iter_catalog(catalog_path), head.keep)):
+            pass
+        return []
+    new_ids = {d['id'] for d in new}
+    
+    def merged():
+        # Everything new sorts above the mark, so it goes in front of the old catalog
+        yield from new
+        for doc in iter_catalog(catalog_path):
+            if doc.get('id') not in new_ids:
+                yield doc
+    write_catalog(catalog_path, head(merged()), updated_at)
+    return new
+
+
+def sync(output_dir: str, source_base: str = SOURCE_BASE, source_all: str = SOURCE_ALL,
+         source_latest: str = SOURCE_LATEST, stream: bool = False, delta: bool = False,
+         keep: int = 1000, store=None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Download, normalize and write catalog.json/latest.json to output_dir.
+    
+    Returns (all_docs, latest_docs), newest first. Raises RuntimeError if
+    either source file cannot be downloaded.
+    
+    With stream=True the all.json dump is parsed and normalized as it
+    downloads, sorted with a bounded-memory external merge sort and written
+    incrementally; all_docs then holds only the newest `keep` documents.
+    
+    With delta=True only latest-100.json is downloaded when it still reaches
+    back to the high-water mark saved by the previous sync; its newer records
+    are merged into the existing catalog and all_docs again holds the newest
+    `keep`. Otherwise (first run, or a gap wider than the window) it falls
+    back to a full sync. Records published later with a date below the mark
+    are only picked up by a full sync.
+    
+    With a store (scrapers.common.store.DocumentStore) the records are also
+    upserted under STORE_SOURCE: only the new ones after a delta sync, the
+    whole written catalog otherwise.
+    """
+    all_url = f"{source_base}/{source_all}"
+    latest_url = f"{source_base}/{source_latest}"
+    catalog_path = os.path.join(output_dir, 'catalog.json')
+    
+    print(f"Source URLs:")
+    print(f"  All: {all_url}")
+    print(f"  Latest: {latest_url}")
+    print(f"Output directory: {output_dir}")
+    
+    current_time = datetime.utcnow().isoformat() + 'Z'
+    mark = load_high_water(output_dir) if delta and os.path.exists(catalog_path) else None
+    added = new = None
+    
+    if mark is not None:
+        latest_docs = _download_latest(latest_url)
+        head = _Head(keep)
+        new = _sync_delta(catalog_path, latest_docs, mark, head, current_time)
+        added = None if new is None else len(new)
+        if added is None:
+            print(f"Latest window does not reach back to {mark[0]} {mark[1]}, running a full sync")
+        else:
+            all_docs, count = head.docs, f"+{added}"
+    
+    if added is None and stream:
+        # latest-100.json is small; fetch it first so a failure leaves the catalog untouched
+        if mark is None:
+            latest_docs = _download_latest(latest_url)
+        head = _Head(keep)
+        try:
+            ordered = external_sort(stream_documents(all_url), catalog_sort_key,
+                                    reverse=True, run_size=SORT_RUN_SIZE)
+            write_catalog(catalog_path, head(ordered), current_time)
+        except (requests.RequestException, ValueError) as e:
+            raise RuntimeError(f"Failed to stream all documents data: {e}") from e
+        all_docs, count = head.docs, head.count
+    elif added is None:
+        # Download data
+        all_data = download_json(all_url)
+        latest_data = download_json(latest_url)
+        
+        if not all_data:
+            raise RuntimeError("Failed to download all documents data")
+        
+        if not latest_data:
+            raise RuntimeError("Failed to download latest documents data")
+        
+        # Sort documents by date (newest first)
+        all_docs = sort_documents_by_date(normalize_all(all_data))
+        latest_docs = sort_documents_by_date(normalize_all(latest_data, 'latest document'))
+        count = len(all_docs)
+        
+        write_catalog(catalog_path, all_docs, current_time)
+    
+    write_json_atomically(os.path.join(output_dir, 'latest.json'), latest_docs, current_time)
+    if all_docs:
+        newest = max(map(catalog_sort_key, all_docs))
+        if newest != mark:
+            save_high_water(output_dir, newest)
+    
+    if store is not None:
+        if new is not None and store.count(STORE_SOURCE):
+            store.upsert(STORE_SOURCE, new)
+        else:
+            store.replace(STORE_SOURCE, iter_catalog(catalog_path))
+    
+    print(f"\nSync completed successfully:")
+    print(f"  Catalog: {count} documents")
+    print(f"  Latest: {len(latest_docs)} documents")
+    print(f"  Updated at: {current_time}")
+    return all_docs, latest_docs
@@ -0,0 +1,97 @@
+"""
+PDF text extraction stage: fills Item.full_content / chunk_content.
+
+Every pdf_url is mirrored once into the content-addressed PdfStore, text is
+extracted in a process pool (pypdf is CPU-bound) and cached as
+<text_dir>/<sha>.txt, so re-runs only process PDFs whose hash is new. The
+results are written as two feeds: one record per document with full_content,
+and one record per chunk with chunk_content and chunk_metadata.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple
+from .common.io import write_catalog_and_latest
+from .common.pdfstore import PdfStore
+
+def extract_text(path: str) -> str:
+    # Imported here so the rest of the package works without pypdf installed
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages).strip()
+
+def _extract_to(args: Tuple[str, str]):
+    pdf_path, txt_path = args
+    try:
+        text = extract_text(pdf_path)
+    except Exception as e:
+        return txt_path, f"{type(e).__name__}: {e}"
+    tmp = f"{txt_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(text)
+    os.replace(tmp, txt_path)
+    return txt_path, None
+
+def chunk_text(text: str, size: int = 2000, overlap: int = 200) -> List[Tuple[int, int, str]]:
+    """Split text into ~size character chunks overlapping by `overlap`.
+
+    Chunk ends are moved back to the last whitespace when there is one in the
+    second half of the window, so words are not cut in two.
+    """
+    if overlap >= size:
+        raise ValueError("overlap must be smaller than size")
+    chunks, start, n = [], 0, len(text)
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            cut = text.rfind(" ", start + size // 2, end)
+            cut = max(cut, text.rfind("\n", start + size // 2, end))
+            if cut > start:
+                end = cut
+        chunks.append((start, end, text[start:end]))
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def extract_all(docs: List[dict], store: PdfStore, text_dir: str,
+                workers: int = None, download_workers: int = 4) -> Dict[str, str]:
+    """Return {pdf_url: sha} for docs whose text is available in text_dir."""
+    os.makedirs(text_dir, exist_ok=True)
+    shas = {rec["pdf_url"]: rec["sha256"] for rec in store.mirror(docs, workers=download_workers).values()}
+
+    todo = sorted({s for s in shas.values() if not os.path.exists(os.path.join(text_dir, f"{s}.txt"))})
+    print(f"Extracting text from {len(todo)} new PDFs ({len(set(shas.values())) - len(todo)} cached)")
+    if todo:
+        jobs = [(store.path(s), os.path.join(text_dir, f"{s}.txt")) for s in todo]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for txt_path, err in pool.map(_extract_to, jobs, chunksize=8):
+                if err:
+                    print(f"  Extraction failed {os.path.basename(txt_path)}: {err}")
+    return {u: s for u, s in shas.items() if os.path.exists(os.path.join(text_dir, f"{s}.txt"))}
+
+def run(docs: List[dict], full_dir: str, chunks_dir: str, *, store: PdfStore = None,
+        text_dir: str = ".cache/text", size: int = 2000, overlap: int = 200,
+        workers: int = None, latest_n: int = 100):
+    """Extract text for docs and write the full-content and chunk feeds."""
+    store = store or PdfStore()
+    shas = extract_all(docs, store, text_dir, workers)
+    full, chunks = [], []
+    for d in docs:
+        sha = shas.get(d.get("pdf_url"))
+        if not sha:
+            continue
+        with open(os.path.join(text_dir, f"{sha}.txt"), encoding="utf-8") as f:
+            text = f.read()
+        if not text:
+            continue
+        meta = dict(d.get("metadata") or {}, pdf_sha256=sha, chars=len(text))
+        full.append(dict(d, full_content=text, metadata=meta))
+        parts = chunk_text(text, size, overlap)
+        for i, (start, end, part) in enumerate(parts):
+            chunks.append(dict(d, id=f"{d['id']}-c{i}", chunk_content=part, full_content=None,
+                               chunk_metadata={"parent_id": d["id"], "chunk_index": i,
+                                               "chunk_count": len(parts), "start": start,
+                                               "end": end, "pdf_sha256": sha}))
+    write_catalog_and_latest(full, full_dir, latest_n=latest_n)
+    write_catalog_and_latest(chunks, chunks_dir, latest_n=latest_n)
+    print(f"Text feeds: {len(full)} documents, {len(chunks)} chunks")
+    return full, chunks
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the full-text index (scrapers.common.fulltext).
+
+Builds an index over a synthetic corpus (Zipf-distributed vocabulary, default
+100k documents of ~300 words), then reports build time, index size, the time
+to open the index, query latency percentiles per query kind, and the time of
+an incremental update adding 100 documents.
+
+Usage:
+    python3 scripts/bench_fulltext.py [--docs 100000] [--words 300] [--queries 200] [--index DIR]
+
+With --index the index is kept in DIR (and reused when it already holds the
+corpus) instead of a temporary directory.
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.common.fulltext import FullTextIndex
+
+TYPES = ("Act", "Gazette", "Extraordinary Gazette", "Bill")
+VOCABULARY = 50_000
+
+
+def zipf_sampler(rng, n, s=1.1):
+    cum = list(itertools.accumulate(1 / (i + 1) ** s for i in range(n)))
+    words = [f"w{i}" for i in range(n)]
+    return lambda k: [words[bisect.bisect(cum, rng.random() * cum[-1])] for _ in range(k)]
+
+
+def corpus(n, words, seed=7, start=0):
+    rng = random.Random(seed)
+    sample = zipf_sampler(rng, VOCABULARY)
+    for i in range(start, start + n):
+        length = max(20, int(rng.lognormvariate(0, 0.6) * words))
+        yield {"id": f"doc-{i}", "title": " ".join(sample(6)), "type": TYPES[i % len(TYPES)],
+               "date": f"{1990 + i % 36}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+               "full_content": " ".join(sample(length))}
+
+
+def queries(kind, n, rng):
+    common = lambda: f"w{rng.randrange(1, 50)}"
+    rare = lambda: f"w{rng.randrange(2000, VOCABULARY)}"
+    make = {
+        "common term": lambda: (common(), {}),
+        "rare term": lambda: (rare(), {}),
+        "3 terms": lambda: (f"{common()} {rng.choice([common, rare])()} {rare()}", {}),
+        "phrase": lambda: (f'"w{rng.randrange(0, 20)} w{rng.randrange(0, 20)}"', {}),
+        "term + type/date filter": lambda: (f"{common()} {rare()}",
+                                            {"type": "Act", "date_from": "2000", "date_to": "2010"}),
+    }[kind]
+    return [make() for _ in range(n)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark full-text index build and query latency")
+    ap.add_argument('--docs', type=int, default=100_000)
+    ap.add_argument('--words', type=int, default=300, help="median words per document")
+    ap.add_argument('--queries', type=int, default=200, help="queries per kind")
+    ap.add_argument('--index', help="keep the index in this directory")
+    args = ap.parse_args()
+
+    path = args.index or tempfile.mkdtemp(prefix='fulltext-')
+    try:
+        index = FullTextIndex(path)
+        if index.count != args.docs:
+            t0 = time.perf_counter()
+            stats = index.update(corpus(args.docs, args.words))
+            print(f"Build: {args.docs} documents in {time.perf_counter() - t0:.1f} s ({stats})")
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+        print(f"Index size: {size / 1e6:.1f} MB in {len(index.segments)} segments")
+        index.close()
+
+        t0 = time.perf_counter()
+        index = FullTextIndex(path)
+        print(f"Open: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+        rng = random.Random(1)
+        print(f"{'query':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'hits':>7}")
+        for kind in ("common term", "rare term", "3 terms", "phrase", "term + type/date filter"):
+            times, hits = [], 0
+            for q, kw in queries(kind, args.queries, rng):
+                t0 = time.perf_counter()
+                hits += bool(index.search(q, k=10, **kw))
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"{kind:<26}{percentile(times, 50):>9.2f}{percentile(times, 95):>9.2f}"
+                  f"{percentile(times, 99):>9.2f}{hits / len(times):>7.0%}")
+
+        # Incremental update: existing documents are unchanged, 100 are new
+        t0 = time.perf_counter()
+        stats = index.update(itertools.chain(corpus(args.docs, args.words), corpus(100, args.words, seed=9,
+                                                                                   start=args.docs)))
+        print(f"Update (+100 documents): {time.perf_counter() - t0:.1f} s ({stats})")
+        index.close()
+    finally:
+        if not args.index:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark and parity check for the HTML parser backends.
+
+Runs each page parser (gazette year index and date page, extraordinary
+gazette index, acts table) with the "soup" and "lxml" backends on
+documents.gov.lk pages, checks both produce identical records and prints
+the per-page parse time.
+
+Usage:
+    python3 scripts/bench_html_parsers.py [--pages DIR | --synthetic] [--repeat N]
+    python3 scripts/bench_html_parsers.py --save DIR
+
+Pages are read from --pages (default: the fixtures in FIXTURES), named
+gazettes_<year>.html, gazettes_<YYYY-MM-DD>.html, egz_<year>.html and
+acts_<year>.html. --synthetic generates large pages of the same shape
+instead. --save downloads the live pages of SAVE_PAGES into DIR, e.g. to
+refresh the fixtures. scripts/check_html_parity.py asserts parity on the
+same pages.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers import acts, extra_gazettes, gazettes
+
+BACKENDS = ('soup', 'lxml')
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'documents_gov_lk')
+# File name -> live page, for --save
+SAVE_PAGES = {
+    'gazettes_2025.html': gazettes._year_url(2025),
+    'gazettes_2025-10-17.html': f"{gazettes.BASE}/view/gazettes/2025-10-17.html",
+    'egz_2025.html': extra_gazettes._index_url(2025),
+    'acts_2025.html': f"{acts.BASE}/view/acts/acts_2025.html",
+}
+
+
+def synthetic_pages():
+    year_index = '<html><body><ul>' + ''.join(
+        f'<li><a href=" /view/gazettes/2025-{m:02d}-{d:02d}.html ">2025-{m:02d}-{d:02d}</a></li>'
+        for m in range(1, 13) for d in range(1, 29)) + '<a href="/view/other.html">x</a></ul></body></html>'
+    date_page = '<html><body><table>' + ''.join(
+        f'<tr><td>Part {i}</td><td><a href="/view/gazettes/2025/10/2025-10-17({i})E.pdf"> English </a>'
+        f'<a href="/view/gazettes/2025/10/2025-10-17({i})S.pdf">සිංහල</a>'
+        f'<a href="/view/gazettes/2025/10/2025-10-17({i})T.pdf">தமிழ்</a></td></tr>'
+        for i in range(40)) + '</table></body></html>'
+    egz = '<html><body><table><tr><th>No</th><th>Date</th><th>Description</th><th>Download</th></tr>' + ''.join(
+        f'<tr><td>{i}/{i % 30:02d}</td><td>2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}</td>'
+        f'<td>Notice <b>{i}</b> under the <!-- c --> Act</td>'
+        f'<td><a href="/view/extra-gazettes/2025/{i}_E.pdf">E</a></td>'
+        f'<td><a href="/view/extra-gazettes/2025/{i}_S.pdf">S</a> <a>no href</a></td>'
+        f'<td><a href="/view/extra-gazettes/2025/{i}_T.pdf">T</a></td></tr>'
+        for i in range(1500)) + '</table></body></html>'
+    acts_page = '<html><body><table><tr><th>No</th><th>Date</th><th>Title</th><th>Download</th></tr>' + ''.join(
+        f'<tr><td>{i}/2024</td><td>2024-{i % 12 + 1:02d}-01</td><td>Act number {i} &amp; amendments</td>'
+        f'<td><a href="/view/acts/2024/{i}-2024_E.pdf">English</a> '
+        f'<a href="/view/acts/2024/{i}-2024_S.pdf">Sinhala</a> '
+        f'<a href="https://documents.gov.lk/view/acts/2024/{i}-2024_T.pdf">Tamil</a></td></tr>'
+        for i in range(1, 80)) + '</table></body></html>'
+    return {
+        'gazettes_2025.html': year_index,
+        'gazettes_2025-10-17.html': date_page,
+        'egz_2025.html': egz,
+        'acts_2024.html': acts_page,
+    }
+
+
+def load_pages(path):
+    pages = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.html'):
+            with open(os.path.join(path, name), encoding='utf-8') as f:
+                pages[name] = f.read()
+    return pages
+
+
+def save_pages(path):
+    from scrapers.common.http import get
+    os.makedirs(path, exist_ok=True)
+    for name, url in SAVE_PAGES.items():
+        r = get(url, cache=False)
+        with open(os.path.join(path, name), 'w', encoding='utf-8') as f:
+            f.write(r.text)
+        print(f"Saved {url} -> {os.path.join(path, name)} ({len(r.content)} bytes)")
+
+
+def parser_for(name):
+    """Return a callable(html, backend) for a page file name."""
+    m = re.fullmatch(r'gazettes_(\d{4}-\d{2}-\d{2})\.html', name)
+    if m:
+        return lambda html, p: gazettes.parse_date_page(html, m.group(1), p)
+    if re.fullmatch(r'gazettes_\d{4}\.html', name):
+        return gazettes.parse_year_index
+    if name.startswith('egz_'):
+        return extra_gazettes.parse_index
+    m = re.fullmatch(r'acts_(\d{4})\.html', name)
+    if m:
+        return lambda html, p: [i.model_dump(mode='json') for i in acts.parse_acts_html(html, int(m.group(1)), p)]
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    ap.add_argument('--pages', default=FIXTURES, help="directory of saved pages (default: the fixtures)")
+    ap.add_argument('--synthetic', action='store_true', help="benchmark generated pages instead")
+    ap.add_argument('--save', metavar='DIR', help="download the live pages into DIR and exit")
+    ap.add_argument('--repeat', type=int, default=20)
+    args = ap.parse_args()
+
+    if args.save:
+        save_pages(args.save)
+        return 0
+    pages = synthetic_pages() if args.synthetic else load_pages(args.pages)
+    failures = 0
+    print(f"{'page':<28}{'records':>9}" + ''.join(f"{b + ' ms':>12}" for b in BACKENDS) + f"{'speedup':>10}")
+    for name, html in pages.items():
+        parse = parser_for(name)
+        if parse is None:
+            continue
+        results, timings = {}, {}
+        for backend in BACKENDS:
+            results[backend] = parse(html, backend)
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                parse(html, backend)
+            timings[backend] = (time.perf_counter() - t0) * 1000 / args.repeat
+        same = results['soup'] == results['lxml']
+        failures += not same
+        print(f"{name:<28}{len(results['lxml']):>9}" + ''.join(f"{timings[b]:>12.2f}" for b in BACKENDS)
+              + f"{timings['soup'] / timings['lxml']:>9.1f}x" + ('' if same else '  PARITY MISMATCH'))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
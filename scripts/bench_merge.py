@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cross-source merge engine on a synthetic catalog.
+
+Generates documents shaped like the real sources: per-language gazette PDFs
+from documents.gov.lk, extraordinary gazettes and acts, and lk_legal_docs
+copies of part of them. Each set is merged at increasing sizes to show that
+time grows near-linearly.
+
+Usage:
+    python3 scripts/bench_merge.py [--size 500000] [--memory]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.common.merge import merge_documents
+
+GOV = 'https://documents.gov.lk'
+
+
+def synthetic(n: int, seed: int = 1):
+    """About n records describing roughly n/3 distinct documents."""
+    rnd = random.Random(seed)
+    docs = []
+    i = 0
+    while len(docs) < n:
+        i += 1
+        year = 2004 + i % 22
+        date = f"{year}-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+        kind = i % 3
+        if kind == 0:
+            base = f"{GOV}/view/gazettes/{year}/{date}(I-{i})"
+            for lang, suf in (('en', 'E'), ('si', 'S'), ('ta', 'T')):
+                docs.append({'id': f"g{i}{suf}", 'type': 'Gazette', 'title': f"Gazette - {date}", 'date': date,
+                             'languages': [lang], 'pdf_url': f"{base}{suf}.pdf", 'source': 'documents.gov.lk'})
+        elif kind == 1:
+            num = f"{2000 + i // 50}/{i % 50}"
+            docs.append({'id': f"x{i}", 'type': 'Extraordinary Gazette', 'title': f"Extraordinary Gazette {num} - Notice",
+                         'date': date, 'languages': ['en', 'si', 'ta'],
+                         'pdf_url': f"{GOV}/view/extra-gazettes/{year}/{num.replace('/', '-')}_E.pdf",
+                         'source': 'documents.gov.lk'})
+            if rnd.random() < 0.5:
+                docs.append({'id': f"lk{i}", 'type': 'Extraordinary Gazette', 'title': 'Notice', 'doc_num': num,
+                             'date': date, 'languages': ['si'], 'source': 'lk_legal_docs',
+                             'pdf_url': f"http://www.documents.gov.lk/view/extra-gazettes/{year}/{num.replace('/', '-')}_S.pdf"})
+        else:
+            docs.append({'id': f"a{i}", 'type': 'Act', 'title': f"Act {i // 22}/{year} - Title {i}", 'date': date,
+                         'languages': ['en'], 'pdf_url': f"{GOV}/view/acts/{year}/{i}_E.pdf",
+                         'source': 'documents.gov.lk'})
+    return docs[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark merge_documents")
+    ap.add_argument('--size', type=int, default=500_000)
+    ap.add_argument('--memory', action='store_true', help="also report peak memory (much slower)")
+    args = ap.parse_args()
+
+    print(f"{'records':>10}{'merged':>10}{'seconds':>10}{'us/record':>11}{'peak MB':>10}")
+    for n in sorted({args.size // 10, args.size // 4, args.size // 2, args.size}):
+        docs = synthetic(n)
+        t0 = time.perf_counter()
+        merged = merge_documents(docs)
+        secs = time.perf_counter() - t0
+        peak = '-'
+        if args.memory:
+            tracemalloc.start()
+            merge_documents(docs)
+            peak = f"{tracemalloc.get_traced_memory()[1] / 1e6:.1f}"
+            tracemalloc.stop()
+        print(f"{n:>10}{len(merged):>10}{secs:>10.2f}{secs / n * 1e6:>11.2f}{peak:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark building and validating scraped records.
+
+Compares the per-row path (Item.make(...).model_dump(mode='json') for every
+row) with slot-based ItemRecord rows validated in one batch by
+validate_records, and with trusted=True, which skips validation.
+
+Usage:
+    python3 scripts/bench_models.py [--size 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.common.model import Item, ItemRecord, validate_records
+
+
+def rows(n: int):
+    for i in range(n):
+        date = f"{2000 + i % 26}-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+        yield dict(type='Extraordinary Gazette', date=date, title=f"Extraordinary Gazette {i}/{i % 60:02d}",
+                   url=f"https://documents.gov.lk/view/extra-gazettes/{date[:4]}/{i}_E.pdf",
+                   languages=['en', 'si', 'ta'], raw='extra_gazettes')
+
+
+def per_row(args):
+    return [Item.make(**a).model_dump(mode='json') for a in args]
+
+
+def batch(args):
+    return validate_records([ItemRecord.make(**a) for a in args])
+
+
+def trusted(args):
+    return validate_records([ItemRecord.make(**a) for a in args], trusted=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark record validation")
+    ap.add_argument('--size', type=int, default=200_000)
+    args = ap.parse_args()
+
+    data = list(rows(args.size))
+    print(f"{'path':<12}{'records':>10}{'seconds':>10}{'us/record':>11}{'speedup':>10}")
+    base = None
+    for name, fn in (('per-row', per_row), ('batch', batch), ('trusted', trusted)):
+        t0 = time.perf_counter()
+        out = fn(data)
+        secs = time.perf_counter() - t0
+        base = base or secs
+        print(f"{name:<12}{len(out):>10}{secs:>10.2f}{secs / len(out) * 1e6:>11.2f}{base / secs:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Recall and latency benchmark for the n-gram search index.
+
+Builds scrapers.common.search_index.build_ngram_index per type over a
+synthetic corpus of English, Sinhala and Tamil titles with gazette and act
+numbers (plus the documents of --catalog, if given), then runs query sets
+for whole words, partial words and partial gazette numbers in each script.
+
+For every query kind it reports recall against a linear substring scan
+(what the client falls back to today), the recall of exact word matching
+over tokenize() as the lunr index does, and p50/p95 latency of the index
+query and of the linear scan. Index sizes are reported raw and gzipped.
+
+Usage:
+    python3 scripts/bench_ngram_index.py [--docs 50000] [--queries 200] [--catalog public/data/all/latest.json]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.common.search_index import (_units, build_ngram_index, ngram_text, normalize,
+                                          search_ngrams, tokenize)
+
+ENGLISH = ("ministry of defence election commission amendment regulation consolidated list "
+           "national building research institute pradeshiya sabha municipal council vacancy "
+           "member appointment notice land acquisition customs excise tax revenue").split()
+# Words as they appear in gazette headings; some carry zero-width joiners (ශ්‍රී)
+SINHALA = ("ශ්‍රී ලංකා ප්‍රජාතාන්ත්‍රික සමාජවාදී ජනරජයේ ගැසට් පත්‍රය අති විශේෂ පනත "
+           "අමාත්‍යාංශය ආරක්ෂක මැතිවරණ කොමිෂන් සභාව ප්‍රාදේශීය නියෝග දැන්වීම ඉඩම්").split()
+TAMIL = ("இலங்கை ஜனநாயக சோசலிசக் குடியரசின் வர்த்தமானி அதி விசேட சட்டம் அமைச்சு "
+         "பாதுகாப்பு தேர்தல்கள் ஆணைக்குழு பிரதேச சபை ஒழுங்குவிதிகள் அறிவித்தல் காணி").split()
+TYPES = {"Extraordinary Gazette": ENGLISH, "Gazette": SINHALA, "Act": TAMIL}
+
+
+def corpus(n, seed=3):
+    rng = random.Random(seed)
+    for i in range(n):
+        type_ = list(TYPES)[i % len(TYPES)]
+        words = TYPES[type_] if rng.random() < 0.6 else ENGLISH
+        number = f"{2300 + i // 60}/{i % 60 + 1}" if type_ != "Act" else f"{i % 60 + 1}/{1990 + i % 36}"
+        title = f"{type_} {number} - " + " ".join(rng.choice(words) for _ in range(rng.randint(3, 8)))
+        yield {"id": f"doc-{i}", "type": type_, "title": title,
+               "summary": " ".join(rng.choice(words) for _ in range(rng.randint(0, 12)))}
+
+
+def queries(kind, n, rng, docs):
+    def word(words):
+        return rng.choice(words)
+
+    def partial(words):
+        units = _units(normalize(word(words)))
+        k = rng.randint(3, max(3, len(units) - 1))
+        return "".join(units[:k])
+
+    def number(full):
+        d = rng.choice(docs)
+        num = d["title"].split(" - ")[0].split()[-1]
+        return num if full else num[:rng.randint(4, len(num))]
+
+    make = {
+        "english word": lambda: word(ENGLISH),
+        "english partial": lambda: partial(ENGLISH),
+        "english 2 words": lambda: f"{word(ENGLISH)} {word(ENGLISH)}",
+        "gazette number": lambda: number(True),
+        "partial number": lambda: number(False),
+        "sinhala word": lambda: word(SINHALA),
+        "sinhala partial": lambda: partial(SINHALA),
+        "tamil word": lambda: word(TAMIL),
+        "tamil partial": lambda: partial(TAMIL),
+    }[kind]
+    return [make() for _ in range(n)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark n-gram index recall and latency")
+    ap.add_argument('--docs', type=int, default=50_000)
+    ap.add_argument('--queries', type=int, default=200, help="queries per kind")
+    ap.add_argument('--catalog', help="also index the documents of this catalog/latest JSON")
+    args = ap.parse_args()
+
+    docs = list(corpus(args.docs))
+    if args.catalog:
+        with open(args.catalog, encoding='utf-8') as f:
+            docs += json.load(f).get('documents', [])
+    shards = {}
+    for d in docs:
+        shards.setdefault(d.get('type') or 'Other', []).append(d)
+
+    t0 = time.perf_counter()
+    indexes = {t: build_ngram_index(ds) for t, ds in shards.items()}
+    build = time.perf_counter() - t0
+    blobs = [json.dumps(ix, ensure_ascii=False, separators=(',', ':')).encode() for ix in indexes.values()]
+    print(f"Documents: {len(docs)} in {len(shards)} type shards, built in {build:.1f} s")
+    print(f"Size: {sum(map(len, blobs)) / 1e6:.1f} MB raw, "
+          f"{sum(len(gzip.compress(b)) for b in blobs) / 1e6:.1f} MB gzipped")
+
+    texts = {t: [ngram_text(d) for d in ds] for t, ds in shards.items()}
+    words = {t: [set(tokenize(x)) for x in xs] for t, xs in texts.items()}
+    rng = random.Random(5)
+    print(f"{'query':<18}{'recall':>8}{'words':>8}{'index p50':>11}{'p95':>8}{'scan p50':>10}{'p95':>8}")
+    for kind in ("english word", "english partial", "english 2 words", "gazette number", "partial number",
+                 "sinhala word", "sinhala partial", "tamil word", "tamil partial"):
+        found = expected = exact = 0
+        index_ms, scan_ms = [], []
+        for q in queries(kind, args.queries, rng, docs):
+            terms = normalize(q).split()
+            qtokens = tokenize(q)
+            t0 = time.perf_counter()
+            hits = {t: set(search_ngrams(ix, q, texts[t])) for t, ix in indexes.items()}
+            index_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            truth = {t: {i for i, x in enumerate(xs) if all(w in x for w in terms)} for t, xs in texts.items()}
+            scan_ms.append((time.perf_counter() - t0) * 1000)
+            for t in indexes:
+                expected += len(truth[t])
+                found += len(hits[t] & truth[t])
+                exact += sum(1 for i in truth[t] if words[t][i].issuperset(qtokens))
+        recall = found / expected if expected else 1.0
+        print(f"{kind:<18}{recall:>8.1%}{exact / (expected or 1):>8.1%}{percentile(index_ms, 50):>11.2f}"
+              f"{percentile(index_ms, 95):>8.2f}{percentile(scan_ms, 50):>10.2f}{percentile(scan_ms, 95):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmarks and regression check for the scraping/output pipeline.
+
+Measures documents per second for:
+- parsing each page type (gazette year index and date page, egz_<year>,
+  acts_<year>) from recorded pages, or synthetic ones shaped like them
+- dedupe_by_url, write_catalog_and_latest and write_all_latest on
+  synthetic catalogs of each --sizes (default 1k and 100k; add 1000000
+  for the full-scale run), without the .gz/.br siblings
+- writing those siblings for the catalog.json of each size
+
+Absolute docs/s depend on the machine, so every result is also divided by
+the speed of a fixed calibration loop (calibrate()) run in the same process.
+The baseline file stores these ratios. With --check the ratios are compared
+with the baseline and the script exits 1 when any benchmark is more than
+--tolerance slower relative to the calibration loop, so CI can gate on it
+whatever runner it gets. Refresh the baseline with --update-baseline.
+
+Usage:
+    python3 scripts/bench_pipeline.py [--pages DIR] [--sizes 1000 100000 1000000]
+                                      [--check | --update-baseline] [--tolerance 0.3]
+    python3 scripts/bench_pipeline.py --record DIR [--year 2025]
+
+--record saves the live documents.gov.lk pages as fixtures for --pages.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_html_parsers import load_pages, parser_for, synthetic_pages
+from bench_merge import synthetic
+from scrapers import gazettes
+from scrapers.common.http import get
+from scrapers.common import compress
+from scrapers.common.io import dedupe_by_url, write_all_latest, write_catalog_and_latest
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+
+def timed(fn, min_seconds=0.5, after=None):
+    """Best seconds per call, repeating fast calls for at least min_seconds.
+
+    after() runs untimed after every call.
+    """
+    best, total, calls = float('inf'), 0.0, 0
+    while calls < 3 or (total < min_seconds and calls < 1000):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        if after:
+            after()
+        best, total, calls = min(best, dt), total + dt, calls + 1
+        if dt > 5:
+            break
+    return best
+
+
+def calibrate():
+    """Docs/s of a fixed pure-Python workload shaped like the pipeline's
+    (JSON encode and decode, a dict keyed by id, a sort by date)."""
+    docs = [{'id': f"doc-{i}", 'date': f"20{i % 25:02d}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+             'title': f"Gazette notice {i} " * 3, 'languages': ['en', 'si', 'ta'][:i % 3 + 1]}
+            for i in range(5000)]
+
+    def work():
+        by_id = {d['id']: d for d in json.loads(json.dumps(docs, ensure_ascii=False))}
+        sorted(by_id.values(), key=lambda d: (d['date'], d['id']))
+    return len(docs) / timed(work, min_seconds=1.0)
+
+
+def page_kind(name):
+    if re.fullmatch(r'gazettes_\d{4}\.html', name):
+        return 'year-index'
+    if name.startswith('gazettes_'):
+        return 'date-page'
+    return name.split('_')[0]
+
+
+def bench_parsers(pages):
+    """Records/s per page kind, over every page of that kind."""
+    totals = {}
+    for name, html in pages.items():
+        parse = parser_for(name)
+        if parse is None:
+            continue
+        n = len(parse(html, 'lxml'))
+        secs = timed(lambda: parse(html, 'lxml'))
+        t = totals.setdefault(f"parse:{page_kind(name)}", [0, 0.0])
+        t[0] += n
+        t[1] += secs
+    return {k: n / secs for k, (n, secs) in totals.items()}
+
+
+def bench_catalog(size, tmp):
+    docs = synthetic(size)
+    for d in docs:
+        d.setdefault('summary', d['title'])
+    buckets = {}
+    for d in docs:
+        buckets.setdefault(d['source'], []).append(d)
+    out = os.path.join(tmp, str(size))
+    # write_* skip unchanged files, so the output is removed after every call
+    clear = lambda: shutil.rmtree(out, ignore_errors=True)
+    formats, compress.FORMATS = compress.FORMATS, ()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = {
+                f"dedupe_by_url[{size}]": size / timed(lambda: dedupe_by_url(docs)),
+                f"write_catalog_and_latest[{size}]": size / timed(
+                    lambda: write_catalog_and_latest(docs, out), after=clear),
+                f"write_all_latest[{size}]": size / timed(
+                    lambda: write_all_latest(buckets, out, latest_n=size), after=clear),
+            }
+            write_catalog_and_latest(docs, out)
+    finally:
+        compress.FORMATS = formats
+    # Siblings are off by default; benchmark them anyway
+    formats = formats or ('gz', 'br')
+    catalog = os.path.join(out, 'catalog.json')
+    siblings = lambda: [os.remove(f"{catalog}.{ext}") for ext in formats if os.path.exists(f"{catalog}.{ext}")]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results[f"compress[{size}]"] = size / timed(lambda: compress.compress_file(catalog, formats), after=siblings)
+    clear()
+    return results
+
+
+def record(out_dir, year):
+    """Save the live pages for one year under the names --pages expects."""
+    os.makedirs(out_dir, exist_ok=True)
+    base = gazettes.BASE
+    index = get(f"{base}/view/gazettes/{year}.html").text
+    pages = {f"gazettes_{year}.html": index}
+    date_pages = gazettes.parse_year_index(index)
+    if date_pages:
+        dp = date_pages[-1]
+        pages[f"gazettes_{dp.rsplit('/', 1)[-1]}"] = get(base + dp).text
+    pages[f"egz_{year}.html"] = get(f"{base}/view/extra-gazettes/egz_{year}.html").text
+    pages[f"acts_{year}.html"] = get(f"{base}/view/acts/acts_{year}.html").text
+    for name, html in pages.items():
+        with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"Recorded {name} ({len(html)} chars)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the scraping and output pipeline")
+    ap.add_argument('--pages', help="directory of recorded pages (default: synthetic pages)")
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000])
+    ap.add_argument('--check', action='store_true', help="exit 1 on a regression against the baseline")
+    ap.add_argument('--update-baseline', action='store_true')
+    ap.add_argument('--baseline', default=BASELINE)
+    ap.add_argument('--tolerance', type=float, default=0.3, help="allowed slowdown (0.3 = 30%%)")
+    ap.add_argument('--record', metavar='DIR', help="record live pages into DIR and exit")
+    ap.add_argument('--year', type=int, default=2025)
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.year)
+        return 0
+
+    # Calibrated before and after; the faster run is the least disturbed one
+    calibration = calibrate()
+    results = bench_parsers(load_pages(args.pages) if args.pages else synthetic_pages())
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp:
+        for size in args.sizes:
+            results.update(bench_catalog(size, tmp))
+    calibration = max(calibration, calibrate())
+    ratios = {name: rate / calibration for name, rate in results.items()}
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['ratios']
+    except (OSError, ValueError, KeyError, TypeError):
+        baseline = {}
+
+    failures = 0
+    print(f"Calibration loop: {calibration:,.0f} docs/s")
+    print(f"{'benchmark':<40}{'docs/s':>14}{'ratio':>10}{'baseline':>10}{'change':>9}")
+    for name, rate in results.items():
+        ratio, base = ratios[name], baseline.get(name)
+        change = f"{ratio / base - 1:+.0%}" if base else '-'
+        regressed = bool(base) and ratio < base * (1 - args.tolerance)
+        failures += regressed
+        print(f"{name:<40}{rate:>14,.0f}{ratio:>10.4g}{base or 0:>10.4g}{change:>9}"
+              + ('  REGRESSION' if regressed else ''))
+
+    if args.update_baseline:
+        baseline.update({k: float(f"{v:.4g}") for k, v in ratios.items()})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'ratios_of': 'docs/s divided by the calibration loop\'s docs/s (calibrate())',
+                       'ratios': dict(sorted(baseline.items()))}, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+    return 1 if args.check and failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
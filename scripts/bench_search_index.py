@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the prebuilt search index against the client-side lunr build.
+
+Measures build time and serialized size (raw and gzipped) of
+scrapers.common.search_index.build_index and, when `node` and the `lunr`
+package (npm install) are available, of the lunr index useLazySearch builds
+in the browser.
+
+Usage:
+    python3 scripts/bench_search_index.py [--catalog public/data/all/latest.json] [--scale N]
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import scrapers module
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scrapers.common.search_index import build_index
+
+# Mirrors the worker code in src/hooks/useLazySearch.tsx
+LUNR_BUILD = """
+const lunr = require('lunr');
+const docs = JSON.parse(require('fs').readFileSync(process.argv[1], 'utf8'));
+const t0 = process.hrtime.bigint();
+const index = lunr(function () {
+  this.metadataWhitelist = ['position'];
+  this.ref('id');
+  this.pipeline.remove(lunr.stemmer);
+  this.searchPipeline.remove(lunr.stemmer);
+  this.field('title', { boost: 5 });
+  this.field('summary', { boost: 1 });
+  this.field('type', { boost: 2 });
+  docs.forEach(d => this.add(d));
+});
+const blob = JSON.stringify(index);
+const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+console.log(JSON.stringify({ ms, bytes: Buffer.byteLength(blob), gzip: require('zlib').gzipSync(blob).length }));
+"""
+
+
+def load_docs(path: str, scale: int):
+    with open(path, encoding='utf-8') as f:
+        docs = json.load(f).get('documents', [])
+    # Replicate with distinct ids to approximate a full historical catalog
+    return [dict(d, id=f"{d.get('id', '')}-{i}") for i in range(scale) for d in docs]
+
+
+def bench_python(docs):
+    t0 = time.perf_counter()
+    blob = json.dumps(build_index(docs), ensure_ascii=False, separators=(',', ':')).encode()
+    ms = (time.perf_counter() - t0) * 1000
+    return {'ms': ms, 'bytes': len(blob), 'gzip': len(gzip.compress(blob))}
+
+
+def bench_lunr(docs):
+    if not shutil.which('node'):
+        return None
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump(docs, f, ensure_ascii=False)
+    try:
+        out = subprocess.run(['node', '-e', LUNR_BUILD, f.name], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return json.loads(out.stdout)
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+    finally:
+        os.remove(f.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search index builds")
+    parser.add_argument('--catalog', default='public/data/all/latest.json')
+    parser.add_argument('--scale', type=int, default=1,
+                        help="replicate the catalog N times")
+    args = parser.parse_args()
+
+    docs = load_docs(args.catalog, args.scale)
+    print(f"Documents: {len(docs)}")
+    print(f"{'builder':<10}{'build ms':>12}{'bytes':>12}{'gzip':>12}")
+    for name, res in (('python', bench_python(docs)), ('lunr', bench_lunr(docs))):
+        if res is None:
+            print(f"{name:<10}{'n/a (needs node + npm install)':>36}")
+        else:
+            print(f"{name:<10}{res['ms']:>12.1f}{res['bytes']:>12}{res['gzip']:>12}")
+
+
+if __name__ == '__main__':
+    main()
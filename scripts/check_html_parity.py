@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Check that the "lxml" and "soup" backends of scrapers.common.html agree.
+
+For every saved documents.gov.lk page in the fixtures directory (see
+scripts/bench_html_parsers.py) asserts that both backends return the same
+links() and table_rows() and that the source's page parser produces the
+same, non-empty records with either. Prints PASS/FAIL per page and exits 1
+if any check fails.
+
+Usage:
+    python3 scripts/check_html_parity.py [--pages DIR]
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.common.html import links, table_rows
+from bench_html_parsers import FIXTURES, load_pages, parser_for
+
+
+def first_difference(a, b):
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return f"item {i}: soup {x!r} != lxml {y!r}"
+    return f"soup has {len(a)} items, lxml {len(b)}"
+
+
+def check_page(name, html):
+    for extract in (links, table_rows):
+        soup, lxml = extract(html, 'soup'), extract(html, 'lxml')
+        assert soup == lxml, f"{extract.__name__}: {first_difference(soup, lxml)}"
+    parse = parser_for(name)
+    assert parse is not None, "no parser for this file name"
+    soup, lxml = parse(html, 'soup'), parse(html, 'lxml')
+    assert lxml, "no records parsed"
+    assert soup == lxml, f"records: {first_difference(soup, lxml)}"
+    return len(lxml)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check HTML backend parity on saved pages")
+    ap.add_argument('--pages', default=FIXTURES, help="directory of saved pages (default: the fixtures)")
+    args = ap.parse_args()
+
+    pages = load_pages(args.pages)
+    assert pages, f"no .html pages in {args.pages}"
+    failures = 0
+    for name, html in pages.items():
+        try:
+            n = check_page(name, html)
+            print(f"PASS {name} ({n} records)")
+        except AssertionError as e:
+            failures += 1
+            print(f"FAIL {name}: {e}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Check the retry, backoff, AIMD and circuit-breaker behaviour of
+scrapers.common.http.get against a local stub server.
+
+Each scenario starts from fresh CircuitBreaker/AdaptiveConcurrency instances
+with short timings, counts the requests the stub server saw and prints
+PASS/FAIL. Exits 1 if any scenario fails.
+
+Usage:
+    python3 scripts/check_http_resilience.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path so we can import scrapers module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from scrapers.common.http import AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, RateLimiter, get
+
+
+class Stub(BaseHTTPRequestHandler):
+    """Routes:
+    /ok               200
+    /missing          404
+    /flaky/<n>        503 for the first n requests, then 200
+    /retry-after/<s>  429 with Retry-After: s once, then 200
+    /throttled/<n>    429 with Retry-After: 0.2 for the first n requests, then 200
+    /down             503 always
+    /crowded/<n>      429 while more than n requests are in flight, else 200
+    """
+    hits = {}
+    in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, headers=None):
+        body = b"ok" if status == 200 else b"no"
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with Stub.lock:
+            n = Stub.hits[self.path] = Stub.hits.get(self.path, 0) + 1
+            Stub.in_flight += 1
+            crowd = Stub.in_flight
+        try:
+            parts = self.path.strip("/").split("/")
+            if parts[0] == "ok":
+                self._send(200)
+            elif parts[0] == "missing":
+                self._send(404)
+            elif parts[0] == "flaky":
+                self._send(503 if n <= int(parts[1]) else 200)
+            elif parts[0] == "retry-after":
+                self._send(429, {"Retry-After": parts[1]}) if n == 1 else self._send(200)
+            elif parts[0] == "throttled":
+                self._send(429, {"Retry-After": "0.2"}) if n <= int(parts[1]) else self._send(200)
+            elif parts[0] == "down":
+                self._send(503)
+            elif parts[0] == "crowded":
+                time.sleep(0.02)
+                self._send(429 if crowd > int(parts[1]) else 200)
+            else:
+                self._send(404)
+        finally:
+            with Stub.lock:
+                Stub.in_flight -= 1
+
+
+def fetch(base, path, **kw):
+    kw.setdefault("cache", False)
+    kw.setdefault("limiter", None)
+    kw.setdefault("backoff", 0.02)
+    kw.setdefault("breaker", CircuitBreaker(threshold=3, cooldown=0.3, max_wait=2))
+    kw.setdefault("concurrency", AdaptiveConcurrency(initial=4, cooldown=0.1))
+    return get(base + path, **kw)
+
+
+def scenarios(base):
+    def not_retried():
+        try:
+            fetch(base, "/missing")
+        except requests.HTTPError as e:
+            return e.response.status_code == 404 and Stub.hits["/missing"] == 1
+        return False
+
+    def transient_5xx():
+        r = fetch(base, "/flaky/2")
+        return r.status_code == 200 and Stub.hits["/flaky/2"] == 3
+
+    def honours_retry_after():
+        t0 = time.monotonic()
+        r = fetch(base, "/retry-after/1")
+        return r.status_code == 200 and time.monotonic() - t0 >= 1 and Stub.hits["/retry-after/1"] == 2
+
+    def retry_after_does_not_escalate():
+        # The probe after each pause gets another 429: the server's value is
+        # honoured every time and the breaker's own cooldown never grows
+        breaker = CircuitBreaker(threshold=5, cooldown=5.0)
+        t0 = time.monotonic()
+        r = fetch(base, "/throttled/3", max_retries=5, breaker=breaker)
+        took, circuit = time.monotonic() - t0, breaker._circuit(base.split("//", 1)[1])
+        print(f"    /throttled/3: {took:.1f}s, cooldown {circuit.cooldown:g}s")
+        return r.status_code == 200 and 0.6 <= took < 2 and circuit.cooldown == 5.0 and not breaker.is_open(base)
+
+    def breaker_pauses_host():
+        # 8 workers with 10 retries each would send 80 requests without the breaker
+        breaker = CircuitBreaker(threshold=3, cooldown=0.3, max_wait=1.0)
+        concurrency = AdaptiveConcurrency(initial=8)
+        errors = []
+
+        def one(_):
+            try:
+                fetch(base, "/down", max_retries=10, breaker=breaker, concurrency=concurrency)
+            except (requests.HTTPError, CircuitOpenError) as e:
+                errors.append(type(e).__name__)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(one, range(8)))
+        print(f"    /down: {Stub.hits['/down']} requests for 8 callers, {errors.count('CircuitOpenError')} gave up")
+        return len(errors) == 8 and Stub.hits["/down"] < 30 and "CircuitOpenError" in errors
+
+    def aimd_shrinks_concurrency():
+        concurrency = AdaptiveConcurrency(initial=16, cooldown=0.05)
+        breaker = CircuitBreaker(threshold=1000)
+        with ThreadPoolExecutor(16) as pool:
+            codes = list(pool.map(lambda _: fetch(base, "/crowded/3", max_retries=12, breaker=breaker,
+                                                  concurrency=concurrency).status_code, range(60)))
+        limit = concurrency.limit(base)
+        print(f"    /crowded/3: concurrency limit 16 -> {limit:.1f}, {Stub.hits['/crowded/3']} requests for 60 pages")
+        return codes == [200] * 60 and limit < 8
+
+    def limiter_shared_by_workers():
+        # 8 threads share one 10/s bucket, so 20 pages take about 2s however many threads fetch
+        limiter = RateLimiter(rate=10, burst=1)
+        t0 = time.monotonic()
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda i: fetch(base, f"/ok/{i}", limiter=limiter), range(20)))
+        took = time.monotonic() - t0
+        print(f"    /ok: 20 pages from 8 threads in {took:.1f}s at 10 requests/s")
+        return took >= 1.8
+
+    return [not_retried, transient_5xx, honours_retry_after, retry_after_does_not_escalate, breaker_pauses_host,
+            aimd_shrinks_concurrency,
+            limiter_shared_by_workers]
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = 0
+    try:
+        for check in scenarios(base):
+            try:
+                ok = check()
+            except Exception as e:
+                print(f"    {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"{'PASS' if ok else 'FAIL'} {check.__name__}")
+    finally:
+        server.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
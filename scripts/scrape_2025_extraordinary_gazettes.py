@@ -3,11 +3,12 @@
 Scrape 2025 extraordinary gazettes from documents.gov.lk and update local JSON files.
 
 Usage:
-    python3 scripts/scrape_2025_extraordinary_gazettes.py
+    python3 scripts/scrape_2025_extraordinary_gazettes.py [--incremental]
 
 Requirements:
     pip install -r scrapers/requirements.txt
 """
+import argparse
 import os
 import sys
 
@@ -15,10 +16,21 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scrapers.extra_gazettes import crawl
-from scrapers.common.io import write_catalog_and_latest, write_all_latest
+from scrapers.cli import merge_latest, store_documents
+from scrapers.common.state import CrawlState, state_path
+from scrapers.common.store import DocumentStore
+
+# Internal, kept under .cache/state rather than with the published data
+STATE_FILE = 'crawl_state.json'
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape 2025 extraordinary gazettes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip the crawl when the year index is unchanged "
+                             "and merge results into the existing catalog")
+    args = parser.parse_args()
+
     print("Starting 2025 extraordinary gazette scrape from documents.gov.lk...")
     
     # Ensure output directories exist
@@ -27,44 +39,38 @@ def main():
 
     # Crawl 2025 extraordinary gazettes
     print("Fetching 2025 extraordinary gazette pages...")
-    docs = crawl(2025)
-    
-    if not docs:
+    state = CrawlState.load(state_path('public/data/extra-gazettes', STATE_FILE)) if args.incremental else None
+    docs = crawl(2025, state=state)
+    if not docs and not args.incremental:
         print("WARNING: No documents found for 2025!")
         return
-    
-    # Sort by date descending (newest first)
-    docs.sort(key=lambda d: d.get("date", ""), reverse=True)
-
-    # Write per-type outputs
-    print(f"Writing {len(docs)} documents to public/data/extra-gazettes/...")
-    write_catalog_and_latest(docs, 'public/data/extra-gazettes', latest_n=500)
+    if args.incremental:
+        print(f"Fetched {len(docs)} new documents, merging into the document store...")
 
-    # Read existing regular gazettes
-    import json
-    regular_gazettes = []
-    try:
-        with open('public/data/gazettes/latest.json', 'r') as f:
-            data = json.load(f)
-            regular_gazettes = data.get('documents', [])
-    except:
-        pass
+    # Upsert into the document store, then export catalog.json, latest.json
+    # and the changed shards from it
+    store = DocumentStore()
+    total = store_documents(store, 'extra-gazettes', 'public/data/extra-gazettes', docs, latest_n=500)
+    print(f"Wrote {total} documents to public/data/extra-gazettes/")
 
-    # Build merged "all/latest.json"
+    # Rebuild merged "all/latest.json" (and its search index) from the newest
+    # documents of every source in the store
     print("Writing merged feed to public/data/all/latest.json...")
-    all_docs = {'gazettes': regular_gazettes, 'extra-gazettes': docs}
-    write_all_latest(all_docs, 'public/data', latest_n=500)
+    merge_latest('public/data', store, latest_n=500)
+    if state is not None:
+        state.save()
 
     print("\n✅ Done!")
-    print(f"Total 2025 extraordinary gazettes: {len(docs)}")
-    if docs:
-        print(f"Newest: {docs[0].get('date')} - {docs[0].get('title', '')[:80]}")
-        print(f"Oldest: {docs[-1].get('date')} - {docs[-1].get('title', '')[:80]}")
+    print(f"Total extraordinary gazettes: {total}")
+    newest = store.latest('extra-gazettes', 1)
+    if newest:
+        print(f"Newest: {newest[0].get('date')} - {newest[0].get('title', '')[:80]}")
     
     print("\nFiles updated:")
     print("  - public/data/extra-gazettes/catalog.json")
     print("  - public/data/extra-gazettes/latest.json")
     print("  - public/data/all/latest.json")
+    print("  - public/data/all/search/")
     print("\nCommit these files to deploy the updates.")
 
 
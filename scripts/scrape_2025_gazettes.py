@@ -3,11 +3,12 @@
 Scrape 2025 gazettes from documents.gov.lk and update local JSON files.
 
 Usage:
-    python3 scripts/scrape_2025_gazettes.py
+    python3 scripts/scrape_2025_gazettes.py [--workers N] [--incremental]
 
 Requirements:
     pip install -r scrapers/requirements.txt
 """
+import argparse
 import os
 import sys
 
@@ -15,10 +16,23 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scrapers.gazettes import crawl
-from scrapers.common.io import write_catalog_and_latest, write_all_latest
+from scrapers.cli import merge_latest, store_documents
+from scrapers.common.state import CrawlState, state_path
+from scrapers.common.store import DocumentStore
+
+# Internal, kept under .cache/state rather than with the published data
+STATE_FILE = 'crawl_state.json'
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape 2025 gazettes")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent date-page fetches (1 = serial crawl)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only crawl date pages not recorded in the crawl state "
+                             "and merge them into the existing catalog")
+    args = parser.parse_args()
+
     print("Starting 2025 gazette scrape from documents.gov.lk...")
     
     # Ensure output directories exist
@@ -27,33 +41,38 @@ def main():
 
     # Crawl only 2025 gazettes
     print("Fetching 2025 gazette pages...")
-    docs = crawl(2025, 2025)
-    
-    if not docs:
+    state = CrawlState.load(state_path('public/data/gazettes', STATE_FILE)) if args.incremental else None
+    docs = crawl(2025, 2025, workers=args.workers, state=state)
+    if not docs and not args.incremental:
         print("WARNING: No documents found for 2025!")
         return
-    
-    # Sort by date descending (newest first)
-    docs.sort(key=lambda d: d.get("date", ""), reverse=True)
+    if args.incremental:
+        print(f"Fetched {len(docs)} new documents, merging into the document store...")
 
-    # Write per-type outputs (gazettes/catalog.json and gazettes/latest.json)
-    print(f"Writing {len(docs)} documents to public/data/gazettes/...")
-    write_catalog_and_latest(docs, 'public/data/gazettes', latest_n=500)
+    # Upsert into the document store, then export catalog.json, latest.json
+    # and the changed shards from it
+    store = DocumentStore()
+    total = store_documents(store, 'gazettes', 'public/data/gazettes', docs, latest_n=500)
+    print(f"Wrote {total} documents to public/data/gazettes/")
 
-    # Build merged "all/latest.json" using only gazettes for now
+    # Rebuild merged "all/latest.json" (and its search index) from the newest
+    # documents of every source in the store
     print("Writing merged feed to public/data/all/latest.json...")
-    write_all_latest({'gazettes': docs}, 'public/data', latest_n=500)
+    merge_latest('public/data', store, latest_n=500)
+    if state is not None:
+        state.save()
 
     print("\n✅ Done!")
-    print(f"Total 2025 gazettes: {len(docs)}")
-    if docs:
-        print(f"Newest: {docs[0].get('date')} - {docs[0].get('title', '')[:80]}")
-        print(f"Oldest: {docs[-1].get('date')} - {docs[-1].get('title', '')[:80]}")
+    print(f"Total gazettes: {total}")
+    newest = store.latest('gazettes', 1)
+    if newest:
+        print(f"Newest: {newest[0].get('date')} - {newest[0].get('title', '')[:80]}")
     
     print("\nFiles updated:")
     print("  - public/data/gazettes/catalog.json")
     print("  - public/data/gazettes/latest.json")
     print("  - public/data/all/latest.json")
+    print("  - public/data/all/search/")
     print("\nCommit these files to deploy the updates.")
 
 
@@ -10,7 +10,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from scrapers.acts import scrape_all_acts
-from scrapers.common.io import write_catalog_and_latest
+from scrapers.common.store import DocumentStore
 
 def main():
     print("Starting Acts scraping...")
@@ -21,7 +21,12 @@ def main():
     # Write to output directory
     out_dir = os.path.join("public", "data", "acts")
     
-    if write_catalog_and_latest(acts, out_dir, latest_n=100):
+    # The document store holds every source; the JSON is exported from it
+    store = DocumentStore()
+    store.seed("acts", out_dir)
+    # Upsert: acts missing from this scrape (e.g. a year that failed) stay
+    store.upsert("acts", acts)
+    if store.export("acts", out_dir, latest_n=100):
         print(f"✓ Successfully written {len(acts)} acts to {out_dir}")
         return 0
     else: